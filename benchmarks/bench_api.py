@@ -0,0 +1,399 @@
+"""
+bench_api.py
+
+Load test of the JSON read endpoints against a real database and a local
+fake Google, reporting throughput and latency percentiles per endpoint.
+
+The app is served over HTTP by a threaded Werkzeug server, so each
+measurement includes routing, the session cookie, the database queries,
+serialization and the HTTP round trip. The fake Google serves the
+Calendar API (`events().list` with paging and sync tokens, the timezone
+setting) and the OAuth token endpoint, each after `--google-latency`
+milliseconds; the app is pointed at it through `GOOGLE_CALENDAR_API_URL`
+and `GOOGLE_TOKEN_URI`.
+
+Every user is seeded with internships (a share of them due for follow-up
+today), todos, calendar events on the fake Google and an expired access
+token, so the warm-up request of each user refreshes the token and runs
+a full calendar sync. Warm-up requests are not measured; afterwards the
+calendar endpoint is served from the mirror and its cache, as it is for
+an active user.
+
+By default the database is a temporary SQLite file; set
+`BENCH_DATABASE_URL` to run against PostgreSQL instead (its tables are
+created, and the seeded rows are left behind).
+
+Results are written as JSON, named after the current commit, so runs can
+be compared between commits with `--compare`.
+
+Usage:
+    python -m benchmarks.bench_api [--users 20] [--threads 8]
+        [--duration 10] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_pool import percentile  # noqa: E402
+
+ENDPOINTS = [
+    "/api/todos",
+    "/internshipData",
+    "/api/internships/today",
+    "/api/calendar/events",
+]
+TODO_CATEGORIES = ["Today", "This Week", "This Month", "Next Month"]
+STATUSES = ["Applied", "Interviewing", "Offer", "Rejected"]
+
+
+class FakeGoogle(BaseHTTPRequestHandler):
+    """
+    Serves the Calendar API and the OAuth token endpoint after sleeping
+    `server.latency` seconds. Users are told apart by their access token.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def reply(self, payload, kind):
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.hits[kind] = self.server.hits.get(kind, 0) + 1
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[0]
+                 for name, values in parse_qs(url.query).items()}
+        if url.path.endswith("/settings/timezone"):
+            self.reply({"id": "timezone", "value": "UTC"}, "timezone")
+            return
+
+        if query.get("syncToken"):
+            self.reply({"items": [], "nextSyncToken": query["syncToken"]},
+                       "events.sync")
+            return
+        token = self.headers.get("Authorization", "").split()[-1]
+        events = self.server.events(token)
+        start = int(query.get("pageToken", 0))
+        end = start + int(query.get("maxResults", 250))
+        page = {"items": events[start:end]}
+        if end < len(events):
+            page["nextPageToken"] = str(end)
+        else:
+            page["nextSyncToken"] = f"sync-{token}"
+        self.reply(page, "events.list")
+
+    def do_POST(self):
+        form = parse_qs(self.rfile.read(
+            int(self.headers["Content-Length"])).decode())
+        refresh_token = form["refresh_token"][0]
+        self.reply({
+            "access_token": refresh_token.replace("refresh", "access"),
+            "token_type": "Bearer",
+            "expires_in": 3600,
+        }, "token")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_google(latency, events_per_user):
+    """
+    Start the fake Google on a free local port.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    now = datetime.now(timezone.utc).replace(minute=0, second=0,
+                                             microsecond=0)
+
+    def events(token):
+        # Upcoming events spread over the next 60 days, a few per day
+        return [{
+            "id": f"{token}-{i}",
+            "status": "confirmed",
+            "summary": f"Interview {i}",
+            "location": "Remote",
+            "start": {"dateTime": (now + timedelta(
+                hours=6 * i + 1)).isoformat().replace("+00:00", "Z")},
+            "end": {"dateTime": (now + timedelta(
+                hours=6 * i + 2)).isoformat().replace("+00:00", "Z")},
+        } for i in range(events_per_user)]
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGoogle)
+    server.daemon_threads = True
+    server.latency = latency
+    server.hits = {}
+    server.lock = threading.Lock()
+    server.events = events
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def seed(args):
+    """
+    Create the tables and seed `args.users` users with their data.
+
+    Returns:
+        list: `(user id, google id)` for each seeded user.
+    """
+    from sqlalchemy import insert
+    from src.app import db, GoogleCredential, Internship, Todo, User
+
+    db.create_all()
+    today = date.today()
+    expired = datetime.now(timezone.utc).replace(tzinfo=None) \
+        - timedelta(minutes=1)
+    users = []
+    for n in range(args.users):
+        google_id = f"bench-google-{n}-{int(time.time())}"
+        user = User(google_id=google_id, name=f"Bench User {n}")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(GoogleCredential(
+            google_id=google_id, access_token=f"bench-access-{n}",
+            refresh_token=f"bench-refresh-{n}", expiry=expired))
+        db.session.execute(insert(Internship), [
+            {"user_id": user.id,
+             "company_name": f"Company {i}",
+             "position_title": "Software Engineer Intern",
+             "application_status": STATUSES[i % len(STATUSES)],
+             "date_applied": today - timedelta(days=i % 180),
+             # About one in twenty is due for follow-up today
+             "follow_up_date": today + timedelta(days=i % 20),
+             "location": "San Diego, CA",
+             "notes": None if i % 2 else "Referred by a friend",
+             "salary": Decimal("5000.00")}
+            for i in range(args.internships)
+        ])
+        db.session.execute(insert(Todo), [
+            {"user_id": user.id,
+             "task_text": f"Task {i}",
+             "category": TODO_CATEGORIES[i % len(TODO_CATEGORIES)]}
+            for i in range(args.todos)
+        ])
+        db.session.commit()
+        users.append((user.id, google_id))
+    return users
+
+
+def session_cookie(app, user_id, google_id, n):
+    """
+    Sign a session cookie for a seeded user, as `/callback` would set.
+    """
+    serializer = app.session_interface.get_signing_serializer(app)
+    return serializer.dumps({
+        "user_id": user_id,
+        "id_google": google_id,
+        "access_token": f"bench-access-{n}",
+        "refresh_token": f"bench-refresh-{n}",
+        "timezone": "UTC",
+        "timezone_fetched_at": time.time(),
+    })
+
+
+def load(base_url, path, sessions, threads, duration):
+    """
+    Request `path` from `threads` workers for `duration` seconds, each
+    worker cycling through the users' sessions.
+
+    Returns:
+        dict: Request counts, throughput and latency percentiles.
+    """
+    timings, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        count = index
+        while time.perf_counter() < deadline:
+            client = sessions[count % len(sessions)]
+            count += threads
+            start = time.perf_counter()
+            response = client.get(base_url + path)
+            elapsed = (time.perf_counter() - start) * 1000
+            (timings if response.status_code == 200 else errors).append(
+                elapsed)
+
+    workers = [threading.Thread(target=worker, args=(index,))
+               for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "requests": len(timings) + len(errors),
+        "errors": len(errors),
+        "requests_per_second": round(len(timings) / wall, 1),
+        "mean_ms": round(statistics.fmean(timings), 2) if timings else 0.0,
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+    }
+
+
+def current_commit():
+    """
+    Return the checked-out commit, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+            capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Print each endpoint's change against a baseline result file.
+    """
+    print(f"\ncompared with {baseline.get('commit')}")
+    print(f"{'endpoint':>24} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for path, result in results["endpoints"].items():
+        before = baseline["endpoints"].get(path)
+        if not before:
+            continue
+
+        def change(key):
+            if not before[key]:
+                return "n/a"
+            return f"{(result[key] / before[key] - 1) * 100:+.0f}%"
+
+        print(f"{path:>24} {change('requests_per_second'):>8} "
+              f"{change('p50_ms'):>8} {change('p95_ms'):>8} "
+              f"{change('p99_ms'):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--internships", type=int, default=500,
+                        help="internships per user")
+    parser.add_argument("--todos", type=int, default=50,
+                        help="todos per user")
+    parser.add_argument("--events", type=int, default=200,
+                        help="calendar events per user")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10,
+                        help="seconds each endpoint is loaded")
+    parser.add_argument("--google-latency", type=float, default=50,
+                        help="simulated Google latency per request, in ms")
+    parser.add_argument("--output",
+                        help="result file (default: "
+                        "benchmarks/results/api-<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="result file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    google = start_fake_google(args.google_latency / 1000, args.events)
+    google_url = f"http://127.0.0.1:{google.server_port}"
+    handle, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    os.environ.update({
+        "DATABASE_URL": os.environ.get("BENCH_DATABASE_URL",
+                                       f"sqlite:///{db_path}"),
+        "FLASK_SECRET_KEY": "bench",
+        "GOOGLE_CLIENT_ID": "bench-client-id",
+        "GOOGLE_CLIENT_SECRET": "bench-secret",
+        "GOOGLE_CALENDAR_API_URL": f"{google_url}/calendar/v3/",
+        "GOOGLE_TOKEN_URI": f"{google_url}/token",
+    })
+
+    import requests
+    from sqlalchemy.engine import make_url
+    from werkzeug.serving import make_server
+    from src.app import app, db
+
+    server = None
+    try:
+        with app.app_context():
+            users = seed(args)
+            database = make_url(db.engine.url).get_backend_name()
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        sessions = []
+        for n, (user_id, google_id) in enumerate(users):
+            client = requests.Session()
+            client.cookies.set(app.config["SESSION_COOKIE_NAME"],
+                               session_cookie(app, user_id, google_id, n))
+            for path in ENDPOINTS:
+                response = client.get(base_url + path)
+                if response.status_code != 200:
+                    sys.exit(f"Warm-up of {path} failed with "
+                             f"{response.status_code}: {response.text}")
+            sessions.append(client)
+        warmup_hits = dict(google.hits)
+
+        results = {
+            "commit": current_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": database,
+            "parameters": {name: value for name, value in vars(args).items()
+                           if name not in ("output", "compare")},
+            "endpoints": {},
+        }
+        print(f"{args.users} users, {args.threads} threads, "
+              f"{args.duration:g}s per endpoint, {database}")
+        print(f"{'endpoint':>24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'errors':>6}")
+        for path in ENDPOINTS:
+            result = load(base_url, path, sessions, args.threads,
+                          args.duration)
+            results["endpoints"][path] = result
+            print(f"{path:>24} {result['requests_per_second']:>8.1f} "
+                  f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                  f"{result['p99_ms']:>8.1f} {result['errors']:>6}")
+        results["google_requests"] = {
+            "warmup": warmup_hits,
+            "measured": {kind: count - warmup_hits.get(kind, 0)
+                         for kind, count in google.hits.items()},
+        }
+    finally:
+        if server is not None:
+            server.shutdown()
+        google.shutdown()
+        os.remove(db_path)
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results",
+        f"api-{results['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
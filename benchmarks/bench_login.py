@@ -0,0 +1,207 @@
+"""
+bench_login.py
+
+Benchmark of the OAuth login callback against a local fake Google, which
+serves the token endpoint and the ID-token signing certs with a simulated
+network latency. Two modes are compared:
+
+- `cold`: every login re-reads the client configuration and verifies the
+  ID token through a fresh `CacheControl` session, as `callback()` used
+  to, so the certs are fetched again each time.
+- `cached`: the client configuration and the shared, pre-warmed cert cache
+  are reused across logins, as `callback()` does now.
+
+Calendar work done after login (priming the timezone) is stubbed out so
+only the login path itself is measured. The fake serves plain HTTP, so the
+numbers exclude the TLS handshakes the cold mode also paid for.
+
+Usage:
+    python -m benchmarks.bench_login [--logins 50] [--latency 20]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("FLASK_SECRET_KEY", "bench")
+os.environ.setdefault("GOOGLE_CLIENT_ID", "bench-client-id")
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+import cachecontrol  # noqa: E402
+import google.auth.transport.requests  # noqa: E402
+import requests  # noqa: E402
+import rsa  # noqa: E402
+from google.auth import crypt, jwt  # noqa: E402
+from google.oauth2 import id_token  # noqa: E402
+from src import app as app_module  # noqa: E402
+from src.app import app, db, load_client_config  # noqa: E402
+
+KEY_ID = "bench-key"
+
+
+class FakeGoogle(BaseHTTPRequestHandler):
+    """
+    Serves `/certs` and `/token` after sleeping `server.latency` seconds.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def reply(self, payload, headers=()):
+        time.sleep(self.server.latency)
+        self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.reply(self.server.certs,
+                   [("Cache-Control", "public, max-age=3600")])
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.path = "/token"
+        self.reply({
+            "access_token": "bench-access-token",
+            "refresh_token": "bench-refresh-token",
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "id_token": self.server.sign(),
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_google(latency):
+    """
+    Start the fake Google on a free local port.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    public_key, private_key = rsa.newkeys(2048)
+    signer = crypt.RSASigner.from_string(private_key.save_pkcs1(), KEY_ID)
+
+    def sign():
+        now = int(time.time())
+        return jwt.encode(signer, {
+            "iss": "https://accounts.google.com",
+            "aud": os.environ["GOOGLE_CLIENT_ID"],
+            "sub": "bench-user",
+            "name": "Bench User",
+            "iat": now,
+            "exp": now + 3600,
+        }).decode()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGoogle)
+    server.latency = latency
+    server.hits = {}
+    server.certs = {KEY_ID: public_key.save_pkcs1().decode()}
+    server.sign = sign
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_client_config(base_url):
+    """
+    Write a client_secret.json pointing at the fake Google.
+
+    Returns:
+        str: The path of the written file.
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".json",
+                                     delete=False) as file:
+        json.dump({"web": {
+            "client_id": os.environ["GOOGLE_CLIENT_ID"],
+            "client_secret": "bench-secret",
+            "auth_uri": f"{base_url}/auth",
+            "token_uri": f"{base_url}/token",
+        }}, file)
+    return file.name
+
+
+def login(client):
+    """
+    Run one callback and return its latency in milliseconds.
+    """
+    with client.session_transaction() as session:
+        session["state"] = "bench-state"
+    start = time.perf_counter()
+    response = client.get("/callback?state=bench-state&code=bench-code")
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 302, response.status_code
+    return elapsed
+
+
+def run(client, logins, cold):
+    """
+    Time `logins` callbacks, resetting the caches first in cold mode.
+
+    Returns:
+        list: Latencies in milliseconds.
+    """
+    load_client_config.cache_clear()
+    timings = []
+    for _ in range(logins):
+        if cold:
+            load_client_config.cache_clear()
+            app_module.token_request = google.auth.transport.requests.Request(
+                session=cachecontrol.CacheControl(requests.session()))
+        timings.append(login(client))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=20,
+                        help="simulated Google latency per request, in ms")
+    args = parser.parse_args()
+
+    server = start_fake_google(args.latency / 1000)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    config_file = write_client_config(base_url)
+    client = app.test_client()
+
+    try:
+        with app.app_context():
+            db.create_all()
+        with patch("src.app.CLIENT_SECRETS_FILE", config_file), \
+                patch("src.app.prime_user_timezone"), \
+                patch.object(id_token, "_GOOGLE_OAUTH2_CERTS_URL",
+                             f"{base_url}/certs"):
+            shared_request = app_module.token_request
+            print(f"{'mode':>7} {'median ms':>10} {'p95 ms':>8} "
+                  f"{'cert fetches':>13}")
+            for mode in ("cold", "cached"):
+                app_module.token_request = shared_request
+                if mode == "cached":
+                    app_module.warm_google_certs()
+                server.hits.clear()
+                timings = sorted(run(client, args.logins, mode == "cold"))
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                print(f"{mode:>7} {statistics.median(timings):>10.1f} "
+                      f"{p95:>8.1f} {server.hits.get('/certs', 0):>13}")
+            app_module.token_request = shared_request
+    finally:
+        server.shutdown()
+        os.remove(config_file)
+
+
+if __name__ == "__main__":
+    main()
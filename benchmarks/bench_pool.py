@@ -0,0 +1,177 @@
+"""
+bench_pool.py
+
+Load test of `GET /api/todos` with more concurrent requests than database
+connections, showing how the pool settings behave once it is exhausted.
+
+Each configuration runs in its own process, since the engine's pool is
+built from the `DB_*` environment variables when `src.app` is imported.
+Every SQL statement is delayed by `--latency` milliseconds to stand in for
+a remote database, so each request holds its connection for a realistic
+time. By default the database is a temporary SQLite file; set
+`BENCH_DATABASE_URL` to run against PostgreSQL instead.
+
+For each configuration the throughput, latency percentiles, failed
+requests and the pool's own counters (checkouts that waited, the longest
+wait, timeouts and peak overflow) are reported.
+
+Usage:
+    python -m benchmarks.bench_pool [--threads 16] [--duration 5]
+        [--latency 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# (label, pool size, max overflow, pool timeout in seconds)
+CONFIGURATIONS = [
+    ("exhausted, fail fast", 2, 0, 0.25),
+    ("exhausted, wait", 2, 0, 30),
+    ("overflow", 2, 14, 30),
+    ("sized to load", 16, 0, 30),
+]
+
+
+def percentile(values, fraction):
+    """
+    Return the value below which `fraction` of `values` fall.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_child(threads, duration, latency):
+    """
+    Load the app with the pool configured by the environment and print
+    the results as JSON.
+    """
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event
+    from src.app import app, db, Todo, User
+    from src.dbPool import pool_stats
+
+    with app.app_context():
+        db.create_all()
+        user = User(google_id="bench_google_id", name="Bench User")
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([
+            Todo(user_id=user.id, task_text=f"Task {i}", category="Today")
+            for i in range(50)
+        ])
+        db.session.commit()
+        user_id = user.id
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def simulate_latency(*args):
+            time.sleep(latency / 1000)
+
+        db.engine.pool.metrics.reset()
+        engine = db.engine
+
+    timings, failures = [], []
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = user_id
+            session["id_google"] = "bench_google_id"
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.get("/api/todos")
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code == 200:
+                timings.append(elapsed)
+            else:
+                failures.append(elapsed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    print(json.dumps({
+        "requests_per_second": len(timings) / wall,
+        "p50_ms": statistics.median(timings) if timings else 0.0,
+        "p95_ms": percentile(timings, 0.95),
+        "p99_ms": percentile(timings, 0.99),
+        "failed": len(failures),
+        "pool": pool_stats(engine),
+    }))
+
+
+def run_configuration(label, pool_size, max_overflow, timeout, args):
+    """
+    Run one configuration in a subprocess and return its results.
+    """
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    env = dict(
+        os.environ,
+        DATABASE_URL=os.environ.get("BENCH_DATABASE_URL",
+                                    f"sqlite:///{path}"),
+        FLASK_SECRET_KEY="bench",
+        DB_POOL_SIZE=str(pool_size),
+        DB_MAX_OVERFLOW=str(max_overflow),
+        DB_POOL_TIMEOUT=str(timeout),
+    )
+    try:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_pool", "--child",
+             "--threads", str(args.threads),
+             "--duration", str(args.duration),
+             "--latency", str(args.latency)],
+            cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    finally:
+        os.remove(path)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5,
+                        help="seconds each configuration is loaded")
+    parser.add_argument("--latency", type=float, default=10,
+                        help="simulated latency per SQL statement, in ms")
+    parser.add_argument("--child", action="store_true",
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.threads, args.duration, args.latency)
+        return
+
+    print(f"{args.threads} threads, {args.latency:g} ms per statement")
+    print(f"{'configuration':>22} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'p99 ms':>7} {'failed':>6} {'waits':>6} {'max wait':>8} "
+          f"{'timeouts':>8} {'overflow':>8}")
+    for label, pool_size, max_overflow, timeout in CONFIGURATIONS:
+        result = run_configuration(label, pool_size, max_overflow, timeout,
+                                   args)
+        pool = result["pool"]
+        print(f"{label:>22} {result['requests_per_second']:>7.1f} "
+              f"{result['p50_ms']:>7.1f} {result['p95_ms']:>7.1f} "
+              f"{result['p99_ms']:>7.1f} {result['failed']:>6} "
+              f"{pool['waits']:>6} {pool['max_wait_seconds']:>8.3f} "
+              f"{pool['timeouts']:>8} {pool['peak_overflow']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+bench_serialization.py
+
+Microbenchmark comparing the two ways of serializing a user's internships:
+
+- `to_dict`: load full `Internship` entities and convert each with
+  `legacy_to_dict`, a frozen copy of the `str()`-based `Internship.to_dict`
+  that `serialize_rows` replaced, then encode with the standard library's
+  `json`.
+- `projected`: select the columns as plain row tuples, convert them with
+  `serialize_rows` and encode with `json_response`'s encoder.
+
+Rows are seeded into an in-memory SQLite database so the numbers include
+the ORM hydration cost that the projected path avoids.
+
+Usage:
+    python -m benchmarks.bench_serialization [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from sqlalchemy import delete, insert  # noqa: E402
+from src.app import (  # noqa: E402
+    INTERNSHIP_FIELDS,
+    Internship,
+    app,
+    db,
+    json_response,
+    query_internships,
+    serialize_rows,
+)
+
+
+def seed(count):
+    """
+    Replace the internship table's contents with `count` rows for user 1.
+    """
+    db.session.execute(delete(Internship))
+    db.session.execute(insert(Internship), [
+        {"user_id": 1,
+         "company_name": f"Company {i}",
+         "position_title": "Software Engineer Intern",
+         "application_status": "Applied",
+         "date_applied": date(2024, 1, 1) + timedelta(days=i % 365),
+         "notes": None if i % 2 else "Referred by a friend",
+         "salary": Decimal("5000.00")}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def legacy_to_dict(internship):
+    """
+    Convert an internship to a dictionary the way `Internship.to_dict` did
+    before projected serialization, kept here as the baseline.
+    """
+    return {
+        "internshipId": str(internship.internship_id),
+        "companyName": str(internship.company_name),
+        "positionTitle": str(internship.position_title),
+        "applicationStatus": str(internship.application_status),
+        "dateApplied": str(internship.date_applied),
+        "followUpDate": str(internship.follow_up_date),
+        "applicationLink": str(internship.application_link),
+        "startDate": str(internship.start_date),
+        "contactPerson": str(internship.contact_person),
+        "contactEmail": str(internship.contact_email),
+        "referral": str(internship.referral),
+        "offerReceived": str(internship.offer_received),
+        "offerDeadline": str(internship.offer_deadline),
+        "notes": str(internship.notes),
+        "location": str(internship.location),
+        "salary": str(internship.salary),
+        "internshipDuration": str(internship.internship_duration),
+    }
+
+
+def with_to_dict():
+    internships = db.session.query(Internship).filter_by(user_id=1).all()
+    return json.dumps([legacy_to_dict(internship)
+                       for internship in internships])
+
+
+def with_projection():
+    rows = query_internships(1).all()
+    return json_response(serialize_rows(rows, INTERNSHIP_FIELDS)).get_data()
+
+
+def best_of(function, repeat):
+    """
+    Return the fastest of `repeat` runs of `function`, in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        print(f"{'rows':>8} {'to_dict ms':>12} {'projected ms':>13} "
+              f"{'speedup':>8}")
+        for size in args.sizes:
+            seed(size)
+            baseline = best_of(with_to_dict, args.repeat)
+            projected = best_of(with_projection, args.repeat)
+            print(f"{size:>8} {baseline:>12.1f} {projected:>13.1f} "
+                  f"{baseline / projected:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
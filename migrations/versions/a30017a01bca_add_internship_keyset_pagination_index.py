@@ -0,0 +1,29 @@
+"""add internship keyset pagination index
+
+Backs the `(date_applied, internship_id)` keyset pagination of
+GET /api/internships.
+
+Revision ID: a30017a01bca
+Revises: b7715c429baf
+Create Date: 2026-10-17 12:19:10.434590
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a30017a01bca'
+down_revision = 'b7715c429baf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_internship_user_applied', 'internship',
+                    ['user_id', 'date_applied', 'internship_id'],
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_internship_user_applied', table_name='internship',
+                  if_exists=True)
@@ -0,0 +1,46 @@
+"""add calendar watch channel table
+
+`calendar_watch_channel` records the Google Calendar push-notification
+channel watching each user's primary calendar; see `calendarWatch`.
+Tables created by `db.create_all()` after this revision already exist,
+hence `if_not_exists`.
+
+Revision ID: a94d17e6b2c8
+Revises: f5c0e8b3a716
+Create Date: 2026-10-17 17:28:44.203657
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a94d17e6b2c8'
+down_revision = 'f5c0e8b3a716'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'calendar_watch_channel',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.String(length=64), nullable=False),
+        sa.Column('resource_id', sa.String(length=255), nullable=False),
+        sa.Column('token', sa.String(length=64), nullable=False),
+        sa.Column('timezone', sa.String(length=64), nullable=False),
+        sa.Column('expiration', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+        sa.UniqueConstraint('channel_id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_calendar_watch_channel_expiration',
+                    'calendar_watch_channel', ['expiration'],
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_calendar_watch_channel_expiration',
+                  table_name='calendar_watch_channel', if_exists=True)
+    op.drop_table('calendar_watch_channel', if_exists=True)
@@ -0,0 +1,41 @@
+"""add internship status count table
+
+`internship_status_count` keeps each user's internship and offer counts
+per application status, maintained by every internship write; see
+`internshipStats`. Users without rows are counted on read until their
+next write, or until `flask rebuild-internship-stats` fills the table.
+Tables created by `db.create_all()` after this revision already exist,
+hence `if_not_exists`.
+
+Revision ID: b3e6f0c9d451
+Revises: a94d17e6b2c8
+Create Date: 2026-10-17 17:36:09.551732
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e6f0c9d451'
+down_revision = 'a94d17e6b2c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'internship_status_count',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('application_status', sa.String(length=50),
+                  nullable=False),
+        sa.Column('applications', sa.Integer(), nullable=False),
+        sa.Column('offers', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'application_status'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('internship_status_count', if_exists=True)
@@ -0,0 +1,38 @@
+"""add per-user composite indexes
+
+Every internship and todo query filters on user_id first, so these indexes
+lead with it. Tables created by `db.create_all()` after this revision
+already have the indexes, hence `if_not_exists`.
+
+Revision ID: b7715c429baf
+Revises:
+Create Date: 2026-10-17 12:17:03.831156
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7715c429baf'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_internship_user_follow_up', 'internship',
+                    ['user_id', 'follow_up_date'], if_not_exists=True)
+    op.create_index('ix_internship_user_status', 'internship',
+                    ['user_id', 'application_status'], if_not_exists=True)
+    op.create_index('ix_todo_user_category_created', 'todo',
+                    ['user_id', 'category', 'created_at'],
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_todo_user_category_created', table_name='todo',
+                  if_exists=True)
+    op.drop_index('ix_internship_user_status', table_name='internship',
+                  if_exists=True)
+    op.drop_index('ix_internship_user_follow_up', table_name='internship',
+                  if_exists=True)
@@ -0,0 +1,53 @@
+"""add full-text search indexes
+
+GIN indexes over the weighted tsvectors that GET /api/search matches
+against on PostgreSQL. The expressions must stay identical to
+`search.document()` for the planner to use them. SQLite databases get
+their FTS5 tables from `db.create_all()` instead.
+
+Revision ID: c4e8d2f1a9b3
+Revises: a30017a01bca
+Create Date: 2026-10-17 14:02:41.118207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8d2f1a9b3'
+down_revision = 'a30017a01bca'
+branch_labels = None
+depends_on = None
+
+
+def _vector(column, weight):
+    return (f"setweight(to_tsvector('english', coalesce({column}, '')), "
+            f"'{weight}')")
+
+
+INTERNSHIP_DOCUMENT = (
+    f"(({_vector('company_name', 'A')} || "
+    f"{_vector('position_title', 'A')}) || "
+    f"{_vector('location', 'B')}) || {_vector('notes', 'C')}"
+)
+TODO_DOCUMENT = _vector('task_text', 'A')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index('ix_internship_search', 'internship',
+                    [sa.text(f"({INTERNSHIP_DOCUMENT})")],
+                    postgresql_using='gin', if_not_exists=True)
+    op.create_index('ix_todo_search', 'todo',
+                    [sa.text(f"({TODO_DOCUMENT})")],
+                    postgresql_using='gin', if_not_exists=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_todo_search', table_name='todo', if_exists=True)
+    op.drop_index('ix_internship_search', table_name='internship',
+                  if_exists=True)
@@ -0,0 +1,55 @@
+"""add calendar mirror tables
+
+`calendar_event` mirrors each user's primary Google Calendar and
+`calendar_sync_state` records how far its incremental sync has got; see
+`calendarSync`. Tables created by `db.create_all()` after this revision
+already exist, hence `if_not_exists`.
+
+Revision ID: d81f3a6c2e47
+Revises: c4e8d2f1a9b3
+Create Date: 2026-10-17 16:20:08.402913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f3a6c2e47'
+down_revision = 'c4e8d2f1a9b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'calendar_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.String(length=1024), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=True),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'event_id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_calendar_event_user_start', 'calendar_event',
+                    ['user_id', 'start_time'], if_not_exists=True)
+    op.create_table(
+        'calendar_sync_state',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('sync_token', sa.Text(), nullable=True),
+        sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('calendar_sync_state', if_exists=True)
+    op.drop_index('ix_calendar_event_user_start',
+                  table_name='calendar_event', if_exists=True)
+    op.drop_table('calendar_event', if_exists=True)
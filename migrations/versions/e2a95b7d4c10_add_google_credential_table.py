@@ -0,0 +1,38 @@
+"""add google credential table
+
+`google_credential` holds each user's latest Google OAuth tokens so every
+worker uses and refreshes the same credentials. Tables created by
+`db.create_all()` after this revision already exist, hence
+`if_not_exists`.
+
+Revision ID: e2a95b7d4c10
+Revises: d81f3a6c2e47
+Create Date: 2026-10-17 16:41:52.670314
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a95b7d4c10'
+down_revision = 'd81f3a6c2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'google_credential',
+        sa.Column('google_id', sa.String(length=255), nullable=False),
+        sa.Column('access_token', sa.Text(), nullable=False),
+        sa.Column('refresh_token', sa.Text(), nullable=True),
+        sa.Column('expiry', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['google_id'], ['user.google_id']),
+        sa.PrimaryKeyConstraint('google_id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('google_credential', if_exists=True)
@@ -0,0 +1,38 @@
+"""add data version table
+
+`data_version` holds each user's version number per kind of data, bumped
+by every write and used to build ETags; see `dataVersions`. Tables
+created by `db.create_all()` after this revision already exist, hence
+`if_not_exists`.
+
+Revision ID: f5c0e8b3a716
+Revises: e2a95b7d4c10
+Create Date: 2026-10-17 17:03:26.915480
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c0e8b3a716'
+down_revision = 'e2a95b7d4c10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'data_version',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(length=32), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'scope'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('data_version', if_exists=True)
@@ -17,20 +17,48 @@ Attributes:
     db (SQLAlchemy): SQLAlchemy database instance.
 """
 
+import base64
+import csv
 import functools
+import io
+import json
 import os
 import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import cachecontrol
+import click
 from dotenv import load_dotenv
-from flask import Flask, abort, redirect, request, session, jsonify
-from flask import url_for, render_template
+from flask import Flask, abort, redirect, request, session, jsonify, g
+from flask import url_for, render_template, Response, stream_with_context
+from flask import copy_current_request_context
+from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
 import google.auth.transport.requests
 from google.oauth2 import id_token
 from google_auth_oauthlib.flow import Flow
 import requests
-from src.calendarGoogle import calendarGoogle
-from datetime import datetime
+from src.calendarGoogle import (
+    CREDENTIAL_QUERIES,
+    calendarGoogle,
+    prime_user_timezone,
+    todays_events_loader,
+)
+from src.calendarCredentials import credential_manager
+from src import changeFeed, dbPool, dbRouting, instrumentation, queryBudget
+from src import internshipStats, search
+from src.dbRouting import reads_from_replica
+from src.queryBudget import query_budget
+from src.dataVersions import bumps_version, conditional
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
 
 basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 load_dotenv(os.path.join(basedir, ".env"))
@@ -48,7 +76,14 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY")
 DATABASE_URL = os.environ.get("DATABASE_URL")
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db = SQLAlchemy(app)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = dbPool.engine_options(DATABASE_URL)
+app.config["SQLALCHEMY_BINDS"] = dbRouting.replica_binds()
+db = SQLAlchemy(app, session_options={"class_": dbRouting.RoutingSession})
+dbRouting.init_app(app, db)
+search.init_db(db)
+instrumentation.init_app(app)
+queryBudget.init_app(app)
+migrate = Migrate(app, db, directory=os.path.join(basedir, "migrations"))
 
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
 REDIRECT_URI = os.environ.get("REDIRECT_URI")
@@ -65,6 +100,59 @@ SCOPES = [
     "https://www.googleapis.com/auth/calendar.events",
 ]
 
+# Google's public ID-token signing certs, as fetched by
+# `id_token.verify_oauth2_token`.
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+
+# One long-lived session verifies every login's ID token. CacheControl
+# keeps Google's signing certs for as long as their Cache-Control max-age
+# allows, so logins reuse both the certs and the pooled connection.
+token_session = cachecontrol.CacheControl(requests.session())
+token_request = google.auth.transport.requests.Request(session=token_session)
+
+
+@functools.lru_cache(maxsize=None)
+def load_client_config():
+    """
+    Read the OAuth client configuration once per process.
+
+    Returns:
+        dict: The parsed contents of `client_secret.json`.
+    """
+    with open(CLIENT_SECRETS_FILE) as file:
+        return json.load(file)
+
+
+def create_flow(**kwargs):
+    """
+    Create an OAuth flow from the cached client configuration.
+
+    Returns:
+        Flow: The OAuth 2.0 flow for this application.
+    """
+    return Flow.from_client_config(
+        load_client_config(),
+        scopes=SCOPES,
+        redirect_uri=REDIRECT_URI,
+        **kwargs,
+    )
+
+
+def warm_google_certs():
+    """
+    Fetch Google's ID-token signing certs into the cache so the first
+    login does not pay for it.
+    """
+    try:
+        token_request(url=GOOGLE_CERTS_URL, method="GET")
+    except Exception:
+        app.logger.warning("Could not pre-fetch Google's OAuth certs")
+
+
+if os.path.exists(CLIENT_SECRETS_FILE):
+    load_client_config()
+    threading.Thread(target=warm_google_certs, daemon=True).start()
+
 
 class User(db.Model):
     """
@@ -75,10 +163,46 @@ class User(db.Model):
     name = db.Column(db.String(255), nullable=False)
 
 
+class DataVersion(db.Model):
+    """
+    Database model holding a user's version number for one kind of data,
+    bumped on every write and used to build ETags.
+    """
+    __tablename__ = "data_version"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"),
+                        primary_key=True)
+    scope = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+def current_user_id():
+    """
+    Resolve the logged-in user's database id, at most once per request.
+
+    The id stored in the session at login is used as-is; only sessions
+    without one fall back to a lookup by Google id.
+
+    Returns:
+        int | None: The user's id, or None if no such user exists.
+    """
+    if "user_id" not in g:
+        user_id = session.get("user_id")
+        if user_id is None:
+            user = User.query.filter_by(google_id=session["id_google"]).first()
+            user_id = user.id if user else None
+        g.user_id = user_id
+    return g.user_id
+
+
 def login_required(function):
     """
     Decorator to enforce user authentication for accessing routes.
 
+    The session's user id, when present, is made available on `flask.g`
+    so routes can call `current_user_id()` without touching the database.
+
     Args:
         function (Callable): The function being decorated.
 
@@ -90,12 +214,15 @@ def login_required(function):
     def wrapper(*args, **kwargs):
         if "id_google" not in session:
             return abort(401)
+        if "user_id" in session:
+            g.user_id = session["user_id"]
         return function(*args, **kwargs)
 
     return wrapper
 
 
 @app.route("/login")
+@query_budget(0)
 def login():
     """
     Initiate Google OAuth 2.0 login process.
@@ -105,17 +232,14 @@ def login():
     Returns:
         Response: Redirect to Google OAuth 2.0 authorization URL.
     """
-    flow = Flow.from_client_secrets_file(
-        client_secrets_file=CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI,
-    )
+    flow = create_flow()
     authorization_url, state = flow.authorization_url(access_type='offline')
     session["state"] = state
     return redirect(authorization_url)
 
 
 @app.route("/callback")
+@query_budget(8)
 def callback():
     """
     Handles Google's OAuth 2.0 callback, verifies the user,
@@ -127,19 +251,10 @@ def callback():
     if session["state"] != request.args.get("state"):
         abort(500)
 
-    flow = Flow.from_client_secrets_file(
-        client_secrets_file=CLIENT_SECRETS_FILE,
-        scopes=SCOPES,
-        redirect_uri=REDIRECT_URI,
-    )
+    flow = create_flow()
     flow.fetch_token(authorization_response=request.url)
 
     credentials = flow.credentials
-    request_session = requests.session()
-    cached_session = cachecontrol.CacheControl(request_session)
-    token_request = google.auth.transport.requests.Request(
-        session=cached_session
-        )
 
     try:
         id_info = id_token.verify_oauth2_token(
@@ -161,10 +276,13 @@ def callback():
     session["name"] = id_info.get("name")
     session["access_token"] = credentials.token
     session["refresh_token"] = credentials.refresh_token
+    credential_manager.save(session["id_google"], credentials)
+    prime_user_timezone()
     return redirect(url_for('dashboard', _external=True))
 
 
 @app.route("/logout")
+@query_budget(0)
 def logout():
     """
     Log the user out and clear the session.
@@ -177,6 +295,7 @@ def logout():
 
 
 @app.route("/")
+@query_budget(0)
 def home():
     """
     Displays the home page or redirects to the login page.
@@ -191,6 +310,7 @@ def home():
 
 
 @app.route("/privacy")
+@query_budget(0)
 def privacy_policy():
     """
     Displays the privacy policy page.
@@ -202,6 +322,7 @@ def privacy_policy():
 
 
 @app.route("/dashboard")
+@query_budget(0)
 @login_required
 def dashboard():
     """
@@ -214,6 +335,7 @@ def dashboard():
 
 
 @app.route('/calendar.html')
+@query_budget(0)
 def serve_calendar():
     """
     Serve the calendar.html template.
@@ -225,6 +347,7 @@ def serve_calendar():
 
 
 @app.route('/todoList.html')
+@query_budget(0)
 def serve_todo_list():
     """
     Serve the To-Do List HTML file.
@@ -247,7 +370,9 @@ def page_not_found(error):
 
 
 @app.route("/internshipTracker")
+@query_budget(2)
 @login_required
+@reads_from_replica
 def internshipTracker():
     """
     Displays the internship tracker for the logged-in user.
@@ -255,24 +380,25 @@ def internshipTracker():
     Returns:
         Response: Renders the InternshipTracker.html template.
     """
-    user_id = session.get("user_id")
-    internships = db.session.query(Internship).filter_by(user_id=user_id).all()
-    internship_data = [obj.to_dict() for obj in internships]
+    user_id = current_user_id()
+    internship_data = serialize_rows(query_internships(user_id).all(),
+                                     INTERNSHIP_FIELDS)
     return render_template("InternshipTracker.html",
                            internship_data=internship_data)
 
 
 @app.route('/internshipData')
+@query_budget(2)
 @login_required
+@reads_from_replica
+@conditional("internships")
 def send_data():
     """
     Fetch internship data for the logged-in user
     """
-    user_id = session.get("user_id")
-    internships = db.session.query(Internship).filter_by(user_id=user_id).all()
-    internship_data = [obj.to_dict() for obj in internships]
-    print({"data": internship_data})
-    return internship_data
+    user_id = current_user_id()
+    return json_response(serialize_rows(query_internships(user_id).all(),
+                                        INTERNSHIP_FIELDS))
 
 
 # === Internship Management ===
@@ -304,6 +430,14 @@ class Internship(db.Model):
 
     user = db.relationship("User", backref="internships")
 
+    __table_args__ = (
+        db.Index("ix_internship_user_applied", "user_id", "date_applied",
+                 "internship_id"),
+        db.Index("ix_internship_user_follow_up", "user_id", "follow_up_date"),
+        db.Index("ix_internship_user_status", "user_id",
+                 "application_status"),
+    )
+
     def to_dict(self):
         """
         Convert internship instance to a dictionary.
@@ -311,29 +445,151 @@ class Internship(db.Model):
         Returns:
             dict: A dictionary representation of the internship.
         """
-        return {
-            "internshipId": str(self.internship_id),
-            "companyName": str(self.company_name),
-            "positionTitle": str(self.position_title),
-            "applicationStatus": str(self.application_status),
-            "dateApplied": str(self.date_applied),
-            "followUpDate": str(self.follow_up_date),
-            "applicationLink": str(self.application_link),
-            "startDate": str(self.start_date),
-            "contactPerson": str(self.contact_person),
-            "contactEmail": str(self.contact_email),
-            "referral": str(self.referral),
-            "offerReceived": str(self.offer_received),
-            "offerDeadline": str(self.offer_deadline),
-            "notes": str(self.notes),
-            "location": str(self.location),
-            "salary": str(self.salary),
-            "internshipDuration": str(self.internship_duration),
-        }
+        row = tuple(getattr(self, column.key)
+                    for column in INTERNSHIP_FIELDS.values())
+        return serialize_rows([row], INTERNSHIP_FIELDS)[0]
+
+
+class InternshipStatusCount(db.Model):
+    """
+    Database model counting a user's internships with one application
+    status, and how many of them got an offer. Kept up to date by every
+    internship write; see `internshipStats`.
+    """
+    __tablename__ = "internship_status_count"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"),
+                        primary_key=True)
+    application_status = db.Column(db.String(50), primary_key=True)
+    applications = db.Column(db.Integer, nullable=False, default=0)
+    offers = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Public field names of an internship, mapped to their columns.
+INTERNSHIP_FIELDS = {
+    "internshipId": Internship.internship_id,
+    "companyName": Internship.company_name,
+    "positionTitle": Internship.position_title,
+    "applicationStatus": Internship.application_status,
+    "dateApplied": Internship.date_applied,
+    "followUpDate": Internship.follow_up_date,
+    "applicationLink": Internship.application_link,
+    "startDate": Internship.start_date,
+    "contactPerson": Internship.contact_person,
+    "contactEmail": Internship.contact_email,
+    "referral": Internship.referral,
+    "offerReceived": Internship.offer_received,
+    "offerDeadline": Internship.offer_deadline,
+    "notes": Internship.notes,
+    "location": Internship.location,
+    "salary": Internship.salary,
+    "internshipDuration": Internship.internship_duration,
+}
+
+
+def _column_converter(column):
+    """
+    Return the function turning a column's values into JSON values, or
+    None when they are already JSON-compatible.
+    """
+    if isinstance(column.type, db.Date):
+        return date.isoformat
+    if isinstance(column.type, db.Numeric):
+        return str
+    return None
+
+
+def _column_missing(column):
+    """
+    Return the JSON value of a column's nulls.
+
+    The tracker interpolates optional text and dates into its table as
+    they are, so their nulls become empty strings rather than `null`.
+    """
+    if isinstance(column.type, (db.String, db.Date)):
+        return ""
+    return None
+
+
+# Precomputed per-field converters and null values for `serialize_rows`.
+INTERNSHIP_CONVERTERS = {
+    name: (_column_converter(column), _column_missing(column))
+    for name, column in INTERNSHIP_FIELDS.items()
+}
+
+
+def serialize_rows(rows, fields, offset=0):
+    """
+    Serialize projected internship rows to dictionaries.
+
+    Each row is a tuple whose values, starting at `offset`, line up with
+    `fields`. Dates become ISO strings, decimals become strings, and nulls
+    become empty strings for text and date fields and stay null otherwise;
+    other values are passed through untouched.
+
+    Args:
+        rows (Iterable[tuple]): Rows returned by a column-projected query.
+        fields (Iterable[str]): Public field names, in column order.
+        offset (int): Number of leading row values to skip.
+
+    Returns:
+        list: One dictionary per row.
+    """
+    fields = tuple(fields)
+    converters = [(index, *INTERNSHIP_CONVERTERS[name])
+                  for index, name in enumerate(fields, offset)
+                  if INTERNSHIP_CONVERTERS[name] != (None, None)]
+    result = []
+    for row in rows:
+        values = list(row[offset:])
+        for index, convert, missing in converters:
+            value = row[index]
+            if value is None:
+                values[index - offset] = missing
+            elif convert is not None:
+                values[index - offset] = convert(value)
+        result.append(dict(zip(fields, values)))
+    return result
+
+
+def json_response(payload, status=200):
+    """
+    Build a JSON response, using orjson when it is installed.
+
+    Args:
+        payload: JSON-compatible data.
+        status (int): HTTP status code.
+
+    Returns:
+        Response: The JSON response.
+    """
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(",", ":"))
+    return Response(body, status=status, mimetype="application/json")
+
+
+def query_internships(user_id, fields=INTERNSHIP_FIELDS):
+    """
+    Start a column-projected query over a user's internships.
+
+    Args:
+        user_id (int): The owner of the internships.
+        fields (Iterable[str]): Public field names to select.
+
+    Returns:
+        Query: The query, selecting only the requested columns.
+    """
+    return db.session.query(
+        *[INTERNSHIP_FIELDS[name] for name in fields]
+    ).filter_by(user_id=user_id)
 
 
 @app.route("/api/internships", methods=["POST"])
+@query_budget(6 + internshipStats.STATUS_QUERIES)
 @login_required
+@bumps_version("internships")
 def add_internship():
     """
     API endpoint to add a new internship entry to the PostgreSQL table.
@@ -343,7 +599,7 @@ def add_internship():
     Returns:
         Response: JSON response indicating success or failure.
     """
-    user_id = session.get("user_id")
+    user_id = current_user_id()
     if not user_id:
         return jsonify({"error": "User not logged in"}), 401
 
@@ -376,7 +632,12 @@ def add_internship():
             internship_duration=data.get("internship_duration"),
         )
         db.session.add(new_internship)
+        internshipStats.record(user_id, after=internshipStats.state(
+            new_internship.application_status,
+            new_internship.offer_received))
         db.session.commit()
+        changeFeed.publish(user_id, "internships", "created",
+                           new_internship.to_dict)
 
         return jsonify({"message": "Internship added successfully",
                         "internship_id": new_internship.internship_id}), 201
@@ -386,6 +647,9 @@ def add_internship():
 
 
 @app.route('/api/internships/<int:internship_id>', methods=['PUT'])
+@query_budget(7 + 2 * internshipStats.STATUS_QUERIES)
+@login_required
+@bumps_version("internships")
 def update_internship(internship_id):
     """
     Update an internship by its ID.
@@ -396,12 +660,19 @@ def update_internship(internship_id):
     Returns:
         Response: JSON response indicating success or failure.
     """
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
     data = request.json
-    internship = Internship.query.get(internship_id)
+    internship = Internship.query.filter_by(internship_id=internship_id,
+                                            user_id=user_id).first()
 
     if not internship:
         return jsonify({"error": "Internship not found"}), 404
 
+    before = internshipStats.state(internship.application_status,
+                                   internship.offer_received)
     for key, value in data.items():
         if hasattr(internship, key):
             if key in ['date_applied', 'follow_up_date',
@@ -413,7 +684,13 @@ def update_internship(internship_id):
                 setattr(internship, key, value)
 
     try:
+        after = internshipStats.state(internship.application_status,
+                                      internship.offer_received)
+        if after != before:
+            internshipStats.record(user_id, before, after)
         db.session.commit()
+        changeFeed.publish(user_id, "internships", "updated",
+                           internship.to_dict)
         return jsonify({"message": "Internship updated successfully!"}), 200
     except Exception as e:
         db.session.rollback()
@@ -421,7 +698,9 @@ def update_internship(internship_id):
 
 
 @app.route('/api/internships/<int:internship_id>', methods=['DELETE'])
+@query_budget(6 + internshipStats.STATUS_QUERIES)
 @login_required
+@bumps_version("internships")
 def delete_internship(internship_id):
     """
     Delete an internship entry by its ID.
@@ -432,7 +711,7 @@ def delete_internship(internship_id):
     Returns:
         Response: JSON response indicating success or failure.
     """
-    user_id = session.get("user_id")
+    user_id = current_user_id()
     if not user_id:
         return jsonify({"error": "User not logged in"}), 401
 
@@ -444,7 +723,11 @@ def delete_internship(internship_id):
 
     try:
         db.session.delete(internship)
+        internshipStats.record(user_id, before=internshipStats.state(
+            internship.application_status, internship.offer_received))
         db.session.commit()
+        changeFeed.publish(user_id, "internships", "deleted",
+                           {"internshipId": internship_id})
         return jsonify({"message": "Internship deleted successfully!"}), 200
     except Exception as e:
         db.session.rollback()
@@ -453,8 +736,27 @@ def delete_internship(internship_id):
             ), 500
 
 
+def todays_internships(user_id):
+    """
+    Read a user's internships with a follow-up date of today.
+
+    Args:
+        user_id (int): The owner of the internships.
+
+    Returns:
+        list: Serialized internships.
+    """
+    today = datetime.now().date()
+    rows = query_internships(user_id).filter(
+        Internship.follow_up_date == today).all()
+    return serialize_rows(rows, INTERNSHIP_FIELDS)
+
+
 @app.route('/api/internships/today', methods=['GET'])
+@query_budget(2)
 @login_required
+@reads_from_replica
+@conditional("internships", daily=True)
 def get_todays_internships():
     """
     Fetch internships with follow-up dates matching today's date.
@@ -463,21 +765,537 @@ def get_todays_internships():
         Response: JSON containing internships with today's follow-up date.
     """
     try:
-        user_id = session.get("user_id")
+        user_id = current_user_id()
         if not user_id:
             return jsonify({"error": "User not logged in"}), 401
 
-        today = datetime.now().date()
-        internships = db.session.query(Internship).filter_by(
-            user_id=user_id).filter(Internship.follow_up_date == today).all()
-
-        internships_data = [internship.to_dict() for internship in internships]
-        return jsonify(internships_data), 200
+        return json_response(todays_internships(user_id))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/internships/stats", methods=["GET"])
+@query_budget(5)
+@login_required
+@reads_from_replica
+@conditional("internships", daily=True)
+def get_internship_stats():
+    """
+    Summarize the logged-in user's application pipeline.
+
+    Counts by status and the offer rate come from the user's stored status
+    counts; applications per week and upcoming deadlines are aggregated in
+    SQL. Clients no longer need every internship to draw these.
+
+    Query Parameters:
+        weeks (int): Weeks of applications to count, ending with the
+            current one, at most 52 (default 12).
+        days (int): Days ahead to list deadlines for, at most 365
+            (default 14).
+
+    Returns:
+        Response: JSON with `total`, `byStatus`, `offers`, `offerRate`,
+        `applicationsPerWeek` and `upcomingDeadlines`.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
+    try:
+        weeks = min(max(int(request.args.get("weeks", 12)), 1), 52)
+        days = min(max(int(request.args.get("days", 14)), 0), 365)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(internshipStats.pipeline_stats(
+        user_id, datetime.now().date(), weeks=weeks, days=days))
+
+
+@app.cli.command("rebuild-internship-stats")
+def rebuild_internship_stats():
+    """
+    Recount every user's internship status counts, e.g. after upgrading
+    so stats are read from the counts without waiting for users' writes.
+    """
+    written = internshipStats.rebuild()
+    db.session.commit()
+    click.echo(f"Rebuilt {written} internship status counts")
+
+
+def encode_cursor(date_applied, internship_id):
+    """
+    Encode the sort key of the last row on a page as an opaque cursor.
+    """
+    key = [date_applied.isoformat() if date_applied else None, internship_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        applied, internship_id = json.loads(base64.urlsafe_b64decode(cursor))
+        applied = date.fromisoformat(applied) if applied else None
+        return applied, int(internship_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def internship_segments(query, cursor=None):
+    """
+    Split a listing of internships into the queries that page through it.
+
+    Internships with an application date come first, newest first, then
+    those without one. Each segment resumes after the cursor with a range
+    predicate on `ix_internship_user_applied` and is ordered as a backward
+    scan of it, so a page seeks straight to the cursor however deep it is.
+
+    Args:
+        query: The user's filtered internships, a `Query` or `Select`.
+        cursor (tuple | None): The decoded cursor of the previous page.
+
+    Returns:
+        list: The ordered queries of the segments left, in page order.
+    """
+    last_applied, last_id = cursor or (None, None)
+    segments = []
+    if cursor is None or last_applied is not None:
+        dated = query.filter(Internship.date_applied.isnot(None))
+        if cursor:
+            dated = dated.filter(
+                db.tuple_(Internship.date_applied, Internship.internship_id)
+                < (last_applied, last_id))
+        segments.append(dated.order_by(Internship.date_applied.desc(),
+                                       Internship.internship_id.desc()))
+    undated = query.filter(Internship.date_applied.is_(None))
+    if cursor and last_applied is None:
+        undated = undated.filter(Internship.internship_id < last_id)
+    segments.append(undated.order_by(Internship.internship_id.desc()))
+    return segments
+
+
+@app.route("/api/internships", methods=["GET"])
+@query_budget(3)
+@login_required
+@reads_from_replica
+@conditional("internships")
+def list_internships():
+    """
+    List the logged-in user's internships one page at a time.
+
+    Internships are ordered newest application first, undated ones last,
+    and paginated with a keyset cursor on `(date_applied, internship_id)`,
+    so every page costs at most two indexed range scans however deep the
+    client pages.
+
+    Query Parameters:
+        limit (int): Page size, at most 200 (default 50).
+        cursor (str): `nextCursor` from the previous page.
+        status (str): Application status to match; may be repeated.
+        company (str): Company name prefix.
+        applied_after (str): Earliest application date (YYYY-MM-DD).
+        applied_before (str): Latest application date (YYYY-MM-DD).
+        fields (str): Comma-separated field names to return.
+
+    Returns:
+        Response: JSON with the page's `data` and the `nextCursor`.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
+    args = request.args
+    fields = list(INTERNSHIP_FIELDS)
+    if args.get("fields"):
+        fields = [name.strip() for name in args["fields"].split(",")]
+        unknown = [name for name in fields if name not in INTERNSHIP_FIELDS]
+        if unknown:
+            return jsonify(
+                {"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    try:
+        limit = min(max(int(args.get("limit", 50)), 1), 200)
+        applied_after = args.get("applied_after")
+        applied_before = args.get("applied_before")
+        applied_after = applied_after and date.fromisoformat(applied_after)
+        applied_before = applied_before and date.fromisoformat(applied_before)
+        cursor = args.get("cursor")
+        cursor = cursor and decode_cursor(cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    columns = [Internship.date_applied, Internship.internship_id]
+    columns += [INTERNSHIP_FIELDS[name] for name in fields]
+    query = db.session.query(*columns).filter(Internship.user_id == user_id)
+
+    if args.getlist("status"):
+        query = query.filter(
+            Internship.application_status.in_(args.getlist("status")))
+    if args.get("company"):
+        query = query.filter(Internship.company_name.startswith(
+            args["company"], autoescape=True))
+    if applied_after:
+        query = query.filter(Internship.date_applied >= applied_after)
+    if applied_before:
+        query = query.filter(Internship.date_applied <= applied_before)
+
+    rows = []
+    for segment in internship_segments(query, cursor):
+        rows += segment.limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+
+    return json_response({"data": serialize_rows(rows, fields, offset=2),
+                          "nextCursor": next_cursor})
+
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+MAX_IMPORT_ERRORS = 100
+TRUE_VALUES = {"true", "1", "yes", "y"}
+FALSE_VALUES = {"false", "0", "no", "n"}
+
+# Accept both the exported (camelCase) and the column (snake_case) names.
+IMPORT_COLUMNS = {
+    name: column for name, column in INTERNSHIP_FIELDS.items()
+    if name != "internshipId"
+}
+IMPORT_COLUMNS.update(
+    {column.key: column for column in list(IMPORT_COLUMNS.values())})
+
+
+def _parse_import_value(column, value):
+    """
+    Convert one imported value to the Python type of its column.
+
+    Raises:
+        ValueError: If the value does not fit the column.
+    """
+    if isinstance(column.type, db.Date):
+        return date.fromisoformat(str(value))
+    if isinstance(column.type, db.Boolean):
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text not in TRUE_VALUES | FALSE_VALUES:
+            raise ValueError(f"expected a boolean, got {value!r}")
+        return text in TRUE_VALUES
+    if isinstance(column.type, db.Numeric):
+        try:
+            return Decimal(str(value))
+        except ArithmeticError as e:
+            raise ValueError(f"expected a number, got {value!r}") from e
+    value = str(value)
+    length = getattr(column.type, "length", None)
+    if length and len(value) > length:
+        raise ValueError(f"longer than {length} characters")
+    return value
+
+
+def parse_internship_record(record, user_id):
+    """
+    Validate one imported record and convert it to insert parameters.
+
+    Args:
+        record (dict): The record, keyed by field or column name.
+        user_id (int): The owner of the imported internship.
+
+    Returns:
+        dict: Column values ready for an `insert()`.
+
+    Raises:
+        ValueError: If the record is invalid.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+
+    values = {"user_id": user_id, "application_status": "Applied",
+              "referral": False, "offer_received": False}
+    for name, value in record.items():
+        column = IMPORT_COLUMNS.get(name)
+        if column is None or value is None or value == "":
+            continue
+        try:
+            values[column.key] = _parse_import_value(column, value)
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from e
+
+    for required in ("company_name", "position_title"):
+        if not values.get(required):
+            raise ValueError(f"{required} is required")
+    return values
+
+
+def _read_import_records(stream, import_format):
+    """
+    Yield `(line_number, record)` pairs from a CSV or NDJSON stream.
+
+    Undecodable NDJSON lines are yielded as `ValueError` instances so they
+    are reported like any other invalid row.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if import_format == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON: {e}")
+
+
+def _insert_import_batch(user_id, batch, failed):
+    """
+    Insert a batch of parsed rows in one transaction, together with the
+    owner's updated status counts.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    queryBudget.allow(1)
+    try:
+        rows = [values for _, values in batch]
+        db.session.execute(db.insert(Internship), rows)
+        internshipStats.record_inserted(user_id, rows)
+        db.session.commit()
+        return len(batch)
+    except Exception as e:
+        db.session.rollback()
+        failed.extend((line, f"Failed to insert: {e}") for line, _ in batch)
+        return 0
+
+
+def _import_format(default=None):
+    """
+    Work out whether a request is for CSV or NDJSON.
+    """
+    requested = request.args.get("format")
+    if requested:
+        return requested.lower()
+    if "csv" in (request.mimetype or ""):
+        return "csv"
+    if "ndjson" in (request.mimetype or ""):
+        return "ndjson"
+    return default
+
+
+@app.route("/api/internships/import", methods=["POST"])
+@query_budget(4)
+@login_required
+@bumps_version("internships")
+def import_internships():
+    """
+    Bulk import internships from a CSV or NDJSON request body.
+
+    The body is read as a stream and validated row by row. Valid rows are
+    inserted in batches of `IMPORT_BATCH_SIZE`, one transaction per batch,
+    so memory use does not grow with the size of the upload. Invalid rows
+    are skipped and reported.
+
+    Query Parameters:
+        format (str): `csv` or `ndjson`; defaults to the Content-Type.
+
+    Returns:
+        Response: JSON with the number of rows imported and failed, and
+        the first `MAX_IMPORT_ERRORS` errors with their line numbers.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
+    import_format = _import_format()
+    if import_format not in ("csv", "ndjson"):
+        return jsonify({"error": "Send CSV or NDJSON"}), 415
+
+    imported = 0
+    failed = []
+    batch = []
+    for line, record in _read_import_records(request.stream, import_format):
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            batch.append((line, parse_internship_record(record, user_id)))
+        except ValueError as e:
+            failed.append((line, str(e)))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            imported += _insert_import_batch(user_id, batch, failed)
+            batch = []
+    if batch:
+        imported += _insert_import_batch(user_id, batch, failed)
+    if imported:
+        changeFeed.publish(user_id, "internships", "reload")
+
+    return jsonify({
+        "imported": imported,
+        "failed": len(failed),
+        "errors": [{"line": line, "error": error}
+                   for line, error in failed[:MAX_IMPORT_ERRORS]],
+    }), 200
+
+
+def _export_chunks(user_id, export_format):
+    """
+    Yield the user's internships as CSV or NDJSON text, a batch at a time.
+    """
+    fields = list(INTERNSHIP_FIELDS)
+    rows = query_internships(user_id).order_by(Internship.internship_id) \
+        .yield_per(EXPORT_BATCH_SIZE)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    if export_format == "csv":
+        writer.writeheader()
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) < EXPORT_BATCH_SIZE:
+            continue
+        yield _format_export_batch(batch, fields, export_format,
+                                   writer, buffer)
+        batch = []
+    yield _format_export_batch(batch, fields, export_format, writer, buffer)
+
+
+def _format_export_batch(batch, fields, export_format, writer, buffer):
+    """
+    Return one batch of export rows as CSV or NDJSON text.
+
+    CSV rows are written through `writer` into `buffer`, which is emptied
+    again so it only ever holds one batch.
+    """
+    records = serialize_rows(batch, fields)
+    if export_format == "ndjson":
+        return "".join(json.dumps(record) + "\n" for record in records)
+    writer.writerows(records)
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
+
+@app.route("/api/internships/export", methods=["GET"])
+@query_budget(1)
+@login_required
+@reads_from_replica
+def export_internships():
+    """
+    Stream the logged-in user's internships as CSV or NDJSON.
+
+    Rows are fetched `EXPORT_BATCH_SIZE` at a time and written to the
+    response as they arrive, so memory stays flat however many rows the
+    user has.
+
+    Query Parameters:
+        format (str): `csv` (default) or `ndjson`.
+
+    Returns:
+        Response: The streamed export.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
+    export_format = (request.args.get("format") or "csv").lower()
+    if export_format not in ("csv", "ndjson"):
+        return jsonify({"error": "Format must be csv or ndjson"}), 400
+
+    mimetype = "text/csv" if export_format == "csv" \
+        else "application/x-ndjson"
+    return Response(
+        stream_with_context(_export_chunks(user_id, export_format)),
+        mimetype=mimetype,
+        headers={"Content-Disposition":
+                 f"attachment; filename=internships.{export_format}"},
+    )
+
+
+# === Calendar Mirror ===
+class CalendarEvent(db.Model):
+    """
+    Database model mirroring an event on a user's primary Google Calendar.
+
+    Start and end times are stored as naive UTC datetimes for indexed
+    range queries; the event resource itself is kept verbatim in `data`.
+    """
+    __tablename__ = "calendar_event"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    event_id = db.Column(db.String(1024), nullable=False)
+    start_time = db.Column(db.DateTime)
+    end_time = db.Column(db.DateTime)
+    data = db.Column(db.JSON, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "event_id"),
+        db.Index("ix_calendar_event_user_start", "user_id", "start_time"),
+    )
+
+
+class CalendarSyncState(db.Model):
+    """
+    Database model tracking incremental sync progress for a user's
+    primary Google Calendar.
+    """
+    __tablename__ = "calendar_sync_state"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"),
+                        primary_key=True)
+    sync_token = db.Column(db.Text)
+    last_synced_at = db.Column(db.DateTime)
+
+
+class CalendarWatchChannel(db.Model):
+    """
+    Database model recording the Google Calendar push-notification
+    channel watching a user's primary calendar.
+    """
+    __tablename__ = "calendar_watch_channel"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"),
+                        primary_key=True)
+    channel_id = db.Column(db.String(64), nullable=False, unique=True)
+    resource_id = db.Column(db.String(255), nullable=False)
+    token = db.Column(db.String(64), nullable=False)
+    timezone = db.Column(db.String(64), nullable=False, default="UTC")
+    expiration = db.Column(db.DateTime, nullable=False, index=True)
+
+    user = db.relationship("User")
+
+
+class GoogleCredential(db.Model):
+    """
+    Database model holding a user's latest Google OAuth tokens, so every
+    worker uses and refreshes the same credentials.
+    """
+    __tablename__ = "google_credential"
+
+    google_id = db.Column(db.String(255), db.ForeignKey("user.google_id"),
+                          primary_key=True)
+    access_token = db.Column(db.Text, nullable=False)
+    refresh_token = db.Column(db.Text)
+    expiry = db.Column(db.DateTime)
+
+
 # === Todo List Management ===
+TODO_CATEGORIES = ["Today", "This Week", "This Month", "Next Month"]
+
+
 class Todo(db.Model):
     """
     Database model representing a to-do list entry.
@@ -492,9 +1310,34 @@ class Todo(db.Model):
 
     user = db.relationship('User', backref='todos')
 
+    __table_args__ = (
+        db.Index("ix_todo_user_category_created", "user_id", "category",
+                 "created_at"),
+    )
+
+
+def user_todos(user_id):
+    """
+    Read all of a user's todos.
+
+    Args:
+        user_id (int): The owner of the todos.
+
+    Returns:
+        list: Todos as `{"id", "category", "task"}` dictionaries.
+    """
+    todos = Todo.query.filter_by(user_id=user_id).all()
+    return [
+        {"id": todo.id, "category": todo.category, "task": todo.task_text}
+        for todo in todos
+    ]
+
 
 @app.route("/api/todos", methods=["GET"])
+@query_budget(2)
 @login_required
+@reads_from_replica
+@conditional("todos")
 def get_todos():
     """
     Fetch all todos for the logged-in user.
@@ -502,21 +1345,17 @@ def get_todos():
     Returns:
         Response: JSON containing the user's todos.
     """
-    user = User.query.filter_by(google_id=session["id_google"]).first()
-    if not user:
+    user_id = current_user_id()
+    if not user_id:
         return {"error": "User not found"}, 404
 
-    todos = Todo.query.filter_by(user_id=user.id).all()
-    return {
-        "todos": [
-            {"id": todo.id, "category": todo.category, "task": todo.task_text}
-            for todo in todos
-        ]
-    }
+    return {"todos": user_todos(user_id)}
 
 
 @app.route("/api/todos", methods=["POST"])
+@query_budget(6)
 @login_required
+@bumps_version("todos")
 def add_todo():
     """
     Add a new todo for the logged-in user.
@@ -528,16 +1367,15 @@ def add_todo():
     if not data or not data.get("category") or not data.get("task"):
         return {"error": "Invalid data"}, 400
 
-    valid_categories = ["Today", "This Week", "This Month", "Next Month"]
     category = data["category"].strip()
-    if category not in valid_categories:
+    if category not in TODO_CATEGORIES:
         return {"error": f"Invalid category: {category}"}, 400
 
-    user = User.query.filter_by(google_id=session["id_google"]).first()
-    if not user:
+    user_id = current_user_id()
+    if not user_id:
         return {"error": "User not found"}, 404
 
-    new_todo = Todo(user_id=user.id, category=category, task_text=data["task"])
+    new_todo = Todo(user_id=user_id, category=category, task_text=data["task"])
     try:
         db.session.add(new_todo)
         db.session.commit()
@@ -545,14 +1383,18 @@ def add_todo():
         db.session.rollback()
         return {"error": f"Failed to add todo: {str(e)}"}, 500
 
-    return {
+    todo = {
         "id": new_todo.id,
         "category": new_todo.category,
         "task": new_todo.task_text}
+    changeFeed.publish(user_id, "todos", "created", todo)
+    return todo
 
 
 @app.route("/api/todos/<int:todo_id>", methods=["DELETE"])
+@query_budget(6)
 @login_required
+@bumps_version("todos")
 def delete_todo(todo_id):
     """
     Delete a todo by ID for the logged-in user.
@@ -560,11 +1402,11 @@ def delete_todo(todo_id):
     Returns:
         Response: JSON indicating success or error.
     """
-    user = User.query.filter_by(google_id=session["id_google"]).first()
-    if not user:
+    user_id = current_user_id()
+    if not user_id:
         return {"error": "User not found"}, 404
 
-    todo = Todo.query.filter_by(id=todo_id, user_id=user.id).first()
+    todo = Todo.query.filter_by(id=todo_id, user_id=user_id).first()
     if not todo:
         return {"error": "Todo not found"}, 404
 
@@ -575,11 +1417,14 @@ def delete_todo(todo_id):
         db.session.rollback()
         return {"error": f"Failed to delete todo: {str(e)}"}, 500
 
+    changeFeed.publish(user_id, "todos", "deleted", {"id": todo_id})
     return {"message": "Todo deleted"}
 
 
 @app.route("/api/todos/<int:todo_id>/category", methods=["PATCH"])
+@query_budget(7)
 @login_required
+@bumps_version("todos")
 def update_todo_category(todo_id):
     """
     Update the category of a todo by ID for the logged-in user.
@@ -587,28 +1432,396 @@ def update_todo_category(todo_id):
     Returns:
         Response: JSON indicating success or error.
     """
-    user = User.query.filter_by(google_id=session["id_google"]).first()
-    if not user:
+    user_id = current_user_id()
+    if not user_id:
         return {"error": "User not found"}, 404
 
-    todo = Todo.query.filter_by(id=todo_id, user_id=user.id).first()
+    todo = Todo.query.filter_by(id=todo_id, user_id=user_id).first()
     if not todo:
         return {"error": "Todo not found"}, 404
 
     data = request.json
     new_category = data.get("category")
-    if new_category not in ["Today", "This Week", "This Month", "Next Month"]:
+    if new_category not in TODO_CATEGORIES:
         return {"error": f"Invalid category: {new_category}"}, 400
 
     try:
         todo.category = new_category
         db.session.commit()
+        changeFeed.publish(user_id, "todos", "updated", {
+            "id": todo.id, "category": todo.category,
+            "task": todo.task_text})
         return {"message": "Category updated successfully"}
     except Exception as e:
         db.session.rollback()
         return {"error": f"Failed to update category: {str(e)}"}, 500
 
 
+def _parse_todo_operation(operation):
+    """
+    Validate one operation of a todo batch.
+
+    Returns:
+        dict: The normalized operation.
+
+    Raises:
+        ValueError: If the operation is invalid.
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be an object")
+
+    op = operation.get("op")
+    if op == "create":
+        category = (operation.get("category") or "").strip()
+        if category not in TODO_CATEGORIES:
+            raise ValueError(f"Invalid category: {category}")
+        if not operation.get("task"):
+            raise ValueError("Task is required")
+        return {"op": op, "category": category, "task": operation["task"]}
+
+    if op in ("move", "delete"):
+        ids = operation.get("ids")
+        if ids is None and "id" in operation:
+            ids = [operation["id"]]
+        if (not isinstance(ids, list) or not ids
+                or not all(isinstance(i, int) for i in ids)):
+            raise ValueError("ids must be a non-empty list of integers")
+        if op == "delete":
+            return {"op": op, "ids": ids}
+        category = operation.get("category")
+        if category not in TODO_CATEGORIES:
+            raise ValueError(f"Invalid category: {category}")
+        return {"op": op, "ids": ids, "category": category}
+
+    raise ValueError(f"Unknown operation: {op}")
+
+
+@app.route("/api/todos/batch", methods=["POST"])
+@query_budget(4)
+@login_required
+@bumps_version("todos")
+def batch_todos():
+    """
+    Apply several todo operations in a single request and transaction.
+
+    Accepts `{"operations": [...]}`, where each operation is one of:
+    - `{"op": "create", "category": ..., "task": ...}`
+    - `{"op": "move", "ids": [...], "category": ...}`
+    - `{"op": "delete", "ids": [...]}`
+
+    Moves and deletes are applied with one set-based statement each,
+    scoped to the logged-in user. If any operation is invalid nothing is
+    applied.
+
+    Returns:
+        Response: JSON with one result per operation, in request order.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return {"error": "User not found"}, 404
+
+    data = request.json
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return {"error": "Invalid data"}, 400
+
+    parsed, errors = [], []
+    for index, operation in enumerate(operations):
+        try:
+            parsed.append(_parse_todo_operation(operation))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        return {"error": "Invalid operations", "results": errors}, 400
+
+    # Every operation costs at most one statement: a move or delete is
+    # set-based, and each created todo is one INSERT
+    queryBudget.allow(len(parsed))
+    results = []
+    try:
+        created = [
+            Todo(user_id=user_id, category=operation["category"],
+                 task_text=operation["task"])
+            for operation in parsed if operation["op"] == "create"
+        ]
+        db.session.add_all(created)
+        db.session.flush()
+        created = iter(created)
+
+        for operation in parsed:
+            if operation["op"] == "create":
+                todo = next(created)
+                results.append({"op": "create", "id": todo.id,
+                                "category": todo.category,
+                                "task": todo.task_text})
+                continue
+
+            owned = db.and_(Todo.id.in_(operation["ids"]),
+                            Todo.user_id == user_id)
+            if operation["op"] == "move":
+                statement = db.update(Todo).where(owned) \
+                    .values(category=operation["category"])
+            else:
+                statement = db.delete(Todo).where(owned)
+            count = db.session.execute(
+                statement.execution_options(synchronize_session=False)
+            ).rowcount
+            results.append({"op": operation["op"], "count": count})
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return {"error": f"Failed to apply batch: {str(e)}"}, 500
+
+    changeFeed.publish(user_id, "todos", "reload")
+    return {"results": results}
+
+
+# === Search ===
+SEARCH_KINDS = ("internship", "todo")
+
+# Inverted indexes for full-text search on PostgreSQL; SQLite uses the FTS5
+# tables created by `search.init_db`
+db.Index("ix_internship_search",
+         search.document(Internship, search.INTERNSHIP_COLUMNS),
+         postgresql_using="gin").ddl_if(dialect="postgresql")
+db.Index("ix_todo_search", search.document(Todo, search.TODO_COLUMNS),
+         postgresql_using="gin").ddl_if(dialect="postgresql")
+
+
+def search_items(hits):
+    """
+    Load the internships and todos behind search hits, with one query per
+    kind.
+
+    Args:
+        hits (list): `(kind, id, rank)` rows from `search.search`.
+
+    Returns:
+        list: Hits as `{"kind", "id", "rank", "item"}` dictionaries, in
+        order; rows deleted since the search are left out.
+    """
+    ids = {kind: [item_id for hit_kind, item_id, _ in hits
+                  if hit_kind == kind]
+           for kind in SEARCH_KINDS}
+    items = {}
+    if ids["internship"]:
+        rows = db.session.query(*INTERNSHIP_FIELDS.values()).filter(
+            Internship.internship_id.in_(ids["internship"]))
+        items.update((("internship", item["internshipId"]), item)
+                     for item in serialize_rows(rows, INTERNSHIP_FIELDS))
+    if ids["todo"]:
+        for todo in Todo.query.filter(Todo.id.in_(ids["todo"])):
+            items["todo", todo.id] = {"id": todo.id,
+                                      "category": todo.category,
+                                      "task": todo.task_text}
+    return [
+        {"kind": kind, "id": item_id, "rank": rank,
+         "item": items[kind, item_id]}
+        for kind, item_id, rank in hits if (kind, item_id) in items
+    ]
+
+
+@app.route("/api/search", methods=["GET"])
+@query_budget(4)
+@login_required
+@reads_from_replica
+@conditional("internships", "todos")
+def search_data():
+    """
+    Search the logged-in user's internships and todos.
+
+    Internships are matched on company, position, location and notes, and
+    todos on their text. Every word of the query must match the start of
+    a word in the row. Results are ranked best first, company and position
+    matches above location and notes.
+
+    Query Parameters:
+        q (str): The search query.
+        type (str): `internship` or `todo`; may be repeated (default both).
+        limit (int): Page size, at most 100 (default 20).
+        offset (int): Number of results to skip (default 0).
+
+    Returns:
+        Response: JSON with the page's `results` and the `nextOffset`.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
+    args = request.args
+    query = args.get("q", "")
+    if not search.terms(query):
+        return jsonify({"error": "A search query is required"}), 400
+    kinds = args.getlist("type") or SEARCH_KINDS
+    unknown = [kind for kind in kinds if kind not in SEARCH_KINDS]
+    if unknown:
+        return jsonify({"error": f"Unknown types: {', '.join(unknown)}"}), 400
+
+    try:
+        limit = min(max(int(args.get("limit", 20)), 1), 100)
+        offset = max(int(args.get("offset", 0)), 0)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    hits, more = search.search(user_id, query, kinds, limit, offset)
+    return json_response({
+        "results": search_items(hits),
+        "nextOffset": offset + limit if more else None,
+    })
+
+
+# === Dashboard ===
+DASHBOARD_WORKERS = int(os.environ.get("DASHBOARD_WORKERS", 8))
+DASHBOARD_TIMEOUT = float(os.environ.get("DASHBOARD_TIMEOUT", 10))
+
+dashboard_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS,
+                                        thread_name_prefix="dashboard")
+
+
+def _timed(loader):
+    """
+    Wrap a section loader so it also reports how long it took.
+    """
+    @functools.wraps(loader)
+    def wrapper():
+        start = time.perf_counter()
+        try:
+            return loader(), None, time.perf_counter() - start
+        except Exception as e:
+            return None, str(e), time.perf_counter() - start
+
+    return wrapper
+
+
+@app.route("/api/dashboard", methods=["GET"])
+@query_budget(CREDENTIAL_QUERIES + 13)
+@login_required
+@conditional("calendar", "internships", "todos", daily=True)
+def dashboard_data():
+    """
+    Fetch everything the dashboard shows in one request.
+
+    Today's calendar events, today's internship follow-ups and the user's
+    todos are loaded in parallel, so the response takes as long as the
+    slowest section rather than all three. A failing or slow section is
+    returned as null with its error; the others are still returned.
+
+    Loaders run on `dashboard_executor` threads, where the session must
+    not be modified, so everything they need from it is resolved first.
+
+    Returns:
+        Response: JSON with `events`, `internships`, `todos`, per-section
+        `timings` in milliseconds and `errors` for failed sections.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return {"error": "User not found"}, 404
+
+    sections = {
+        "events": todays_events_loader(),
+        "internships": functools.partial(todays_internships, user_id),
+        "todos": functools.partial(user_todos, user_id),
+    }
+    futures = {
+        name: dashboard_executor.submit(
+            copy_current_request_context(_timed(loader)))
+        for name, loader in sections.items()
+    }
+
+    payload = {"timings": {}, "errors": {}}
+    deadline = time.perf_counter() + DASHBOARD_TIMEOUT
+    for name, future in futures.items():
+        try:
+            data, error, elapsed = future.result(
+                timeout=max(deadline - time.perf_counter(), 0))
+        except FuturesTimeoutError:
+            data, error, elapsed = None, "Timed out", DASHBOARD_TIMEOUT
+        payload[name] = data
+        payload["timings"][name] = round(elapsed * 1000, 1)
+        if error is not None:
+            payload["errors"][name] = error
+    return json_response(payload)
+
+
+# === Change Feed ===
+def _format_event(change):
+    """
+    Format a change as a Server-Sent Events message, or None as a
+    keep-alive comment.
+    """
+    if change is None:
+        return ": keep-alive\n\n"
+    message = f"event: change\ndata: {json.dumps(change, default=str)}\n\n"
+    if "id" in change:
+        message = f"id: {change['id']}\n" + message
+    return message
+
+
+@app.route("/api/changes/stream", methods=["GET"])
+@query_budget(1)
+@login_required
+def change_stream():
+    """
+    Stream changes to the logged-in user's todos, internships and calendar
+    events as Server-Sent Events.
+
+    Each `change` event carries `{"id", "type", "op", "data"}`, where `op`
+    is `created`, `updated`, `deleted` or `reload`. A reconnecting client
+    sends `Last-Event-ID` (or `?lastEventId=`) and first receives the
+    changes it missed, or a `reload` of type `all` if they are no longer
+    kept. A keep-alive comment is sent while there are no changes.
+
+    Every open stream holds a worker for as long as it is open, so this
+    endpoint needs a threaded or asynchronous worker class; under
+    synchronous workers each open page takes a whole worker.
+
+    Returns:
+        Response: The `text/event-stream` response.
+    """
+    user_id = current_user_id()
+    if not user_id:
+        return {"error": "User not found"}, 404
+
+    last_id = request.headers.get("Last-Event-ID") \
+        or request.args.get("lastEventId")
+    try:
+        last_id = int(last_id) if last_id is not None else None
+    except ValueError:
+        last_id = None
+
+    # The stream outlives the request context; it only needs the user id
+    changes = changeFeed.broker.listen(
+        user_id, last_id, heartbeat=changeFeed.CHANGE_FEED_HEARTBEAT)
+    events = (_format_event(change) for change in changes)
+    return Response(events, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache",
+                             "X-Accel-Buffering": "no"})
+
+
+# === Metrics ===
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+
+@app.route("/metrics", methods=["GET"])
+@query_budget(0)
+def metrics():
+    """
+    Expose per-route request metrics and the database pools' state in
+    Prometheus' text format.
+
+    When `METRICS_TOKEN` is set, scrapers must send it as a bearer token.
+
+    Returns:
+        Response: The metrics, or 401 without the configured token.
+    """
+    if METRICS_TOKEN and request.headers.get("Authorization") \
+            != f"Bearer {METRICS_TOKEN}":
+        return abort(401)
+    return Response(instrumentation.render_metrics(db.engines),
+                    mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
@@ -0,0 +1,250 @@
+"""
+calendarCache.py
+
+This module provides a read-through cache for Google Calendar reads so the
+dashboard's hot paths do not need a Google round trip on every page load.
+
+Entries are keyed by user and time window and expire after a short TTL.
+Writes invalidate a user's entries by atomically incrementing a per-user
+generation number that is part of every key, so no key scanning is
+required. Entries under old generations are never read again and are left
+to expire.
+
+The storage backend is pluggable:
+- `memory` (default): an in-process dictionary.
+- `local`: the shared-store backend over an in-process stand-in store.
+- `redis`: the shared-store backend over a Redis server at
+  `CALENDAR_CACHE_URL` (requires the `redis` package).
+
+Attributes:
+    event_cache (EventCache): The process-wide calendar event cache.
+"""
+
+import json
+import os
+import threading
+import time
+
+CALENDAR_CACHE_BACKEND = os.environ.get("CALENDAR_CACHE_BACKEND", "memory")
+CALENDAR_CACHE_TTL = int(os.environ.get("CALENDAR_CACHE_TTL", 60))
+
+
+class InProcessBackend:
+    """
+    Thread-safe in-process key/value store with per-key expiry.
+
+    Expired entries are swept on `set` once the earliest expiry has
+    passed, so keys that are never read again do not accumulate.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+        self._next_sweep = None
+
+    def get(self, key):
+        """
+        Return the value stored under `key`, or None if absent or expired.
+        """
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store `value` under `key`, expiring after `ttl` seconds if given.
+        """
+        now = time.monotonic()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            if self._next_sweep is not None and self._next_sweep <= now:
+                self._sweep(now)
+            self._values[key] = (value, expires_at)
+            if expires_at is not None and (
+                    self._next_sweep is None
+                    or expires_at < self._next_sweep):
+                self._next_sweep = expires_at
+
+    def incr(self, key):
+        """
+        Atomically increment the integer stored under `key`.
+
+        Returns:
+            int: The new value, counting from 0 if `key` is absent.
+        """
+        with self._lock:
+            value, expires_at = self._values.get(key, (0, None))
+            self._values[key] = (value + 1, expires_at)
+            return value + 1
+
+    def delete(self, key):
+        """
+        Remove `key` from the store.
+        """
+        with self._lock:
+            self._values.pop(key, None)
+
+    def _sweep(self, now):
+        # Drop expired entries; the caller holds the lock
+        self._values = {
+            key: entry for key, entry in self._values.items()
+            if entry[1] is None or entry[1] > now}
+        self._next_sweep = min(
+            (entry[1] for entry in self._values.values()
+             if entry[1] is not None), default=None)
+
+
+class LocalStore:
+    """
+    In-process stand-in for a shared store such as Redis.
+
+    Implements the subset of the redis-py client interface used by
+    `SharedStoreBackend` and stores values as bytes, like the real thing.
+    """
+
+    def __init__(self):
+        self._backend = InProcessBackend()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the bytes stored under `key`, or None.
+        """
+        return self._backend.get(key)
+
+    def set(self, key, value, ex=None):
+        """
+        Store `value` under `key`, expiring after `ex` seconds if given.
+        """
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        with self._lock:
+            self._backend.set(key, value, ex)
+
+    def incr(self, key):
+        """
+        Atomically increment the integer stored under `key`.
+        """
+        with self._lock:
+            value = int(self._backend.get(key) or 0) + 1
+            self._backend.set(key, str(value).encode("utf-8"))
+            return value
+
+    def delete(self, key):
+        """
+        Remove `key` from the store.
+        """
+        self._backend.delete(key)
+
+
+class SharedStoreBackend:
+    """
+    Backend storing JSON-encoded values in a shared store.
+
+    Args:
+        client: A redis-py compatible client exposing `get`, `set(ex=)`,
+            `incr` and `delete`.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def get(self, key):
+        raw = self._client.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, json.dumps(value), ex=ttl)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+def create_backend(name):
+    """
+    Create a cache backend by name.
+
+    Args:
+        name (str): One of `memory`, `local` or `redis`.
+
+    Returns:
+        The cache backend.
+
+    Raises:
+        ValueError: If the backend name is not recognised.
+    """
+    if name == "memory":
+        return InProcessBackend()
+    if name == "local":
+        return SharedStoreBackend(LocalStore())
+    if name == "redis":
+        import redis
+
+        return SharedStoreBackend(
+            redis.Redis.from_url(os.environ.get("CALENDAR_CACHE_URL")))
+    raise ValueError(f"Unknown calendar cache backend: {name}")
+
+
+class EventCache:
+    """
+    Read-through cache of calendar reads keyed by user and time window.
+
+    Args:
+        backend: The storage backend.
+        ttl (int): Seconds before a cached entry expires.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _generation(self, user_key):
+        return self.backend.get(f"calendar:{user_key}:generation") or 0
+
+    def get_or_load(self, user_key, window, loader):
+        """
+        Return the cached value for a user's window, loading it on a miss.
+
+        Args:
+            user_key (str): Identifies the user, e.g. their Google id.
+            window (str): Identifies the time window being read.
+            loader (Callable): Produces the value on a cache miss.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        key = (f"calendar:{user_key}:{self._generation(user_key)}"
+               f":{window}")
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self, user_key):
+        """
+        Invalidate every cached window for a user.
+
+        Args:
+            user_key (str): Identifies the user, e.g. their Google id.
+        """
+        self.backend.incr(f"calendar:{user_key}:generation")
+
+
+event_cache = EventCache(create_backend(CALENDAR_CACHE_BACKEND),
+                         CALENDAR_CACHE_TTL)
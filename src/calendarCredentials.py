@@ -0,0 +1,270 @@
+"""
+calendarCredentials.py
+
+This module owns users' Google OAuth credentials once they have logged in.
+
+Tokens are persisted in the `google_credential` table, so every worker sees
+the latest access token rather than the copy in one browser's cookie, and
+kept in a small in-process cache so most requests never touch the table.
+
+Refreshes are:
+
+- Proactive: once a token is within `PROACTIVE_MARGIN` of expiring, it is
+  refreshed in a background thread while the current token keeps being
+  served.
+- Coalesced: concurrent refreshes for the same user share one in-flight
+  call, and a token another worker already refreshed is picked up from the
+  table instead of being refreshed again.
+- Pooled: token requests reuse the calendar gateway's keep-alive session.
+
+Models are imported lazily because `app.py` imports the calendar blueprint
+before the models are defined.
+
+Attributes:
+    REFRESH_MARGIN (int): Seconds before expiry a request refreshes inline.
+    PROACTIVE_MARGIN (int): Seconds before expiry a background refresh
+        starts.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+import cachetools
+from flask import current_app
+from google.oauth2.credentials import Credentials
+import google.auth.transport.requests
+from src import calendarGateway
+
+REFRESH_MARGIN = int(os.environ.get("CALENDAR_REFRESH_MARGIN", 60))
+PROACTIVE_MARGIN = int(os.environ.get("CALENDAR_PROACTIVE_REFRESH", 300))
+CREDENTIAL_CACHE_SIZE = int(os.environ.get("CALENDAR_CREDENTIAL_CACHE_SIZE",
+                                           1024))
+CREDENTIAL_CACHE_TTL = int(os.environ.get("CALENDAR_CREDENTIAL_CACHE_TTL",
+                                          3600))
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+CALENDAR_SCOPES = [
+    "https://www.googleapis.com/auth/calendar",
+    "https://www.googleapis.com/auth/calendar.events",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def _models():
+    from src.app import db, GoogleCredential
+
+    return db, GoogleCredential
+
+
+def _utcnow():
+    # google-auth compares naive UTC expiry times
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def seconds_left(credentials):
+    """
+    Return how long a credential's access token remains valid.
+
+    Returns:
+        float | None: Seconds until expiry, or None if it is unknown.
+    """
+    if credentials.expiry is None:
+        return None
+    return (credentials.expiry - _utcnow()).total_seconds()
+
+
+class CredentialManager:
+    """
+    Loads, caches, persists and refreshes users' Google credentials.
+    """
+
+    def __init__(self, http_session, refresh_margin=REFRESH_MARGIN,
+                 proactive_margin=PROACTIVE_MARGIN, max_workers=2):
+        self.refresh_margin = refresh_margin
+        self.proactive_margin = proactive_margin
+        self._request = google.auth.transport.requests.Request(
+            session=http_session)
+        self._cache = cachetools.TTLCache(maxsize=CREDENTIAL_CACHE_SIZE,
+                                          ttl=CREDENTIAL_CACHE_TTL)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="token-refresh")
+
+    @staticmethod
+    def build(token, refresh_token, expiry=None):
+        """
+        Build Google credentials for the Calendar scopes.
+
+        Tokens are refreshed at `GOOGLE_TOKEN_URI` when it is set, so a
+        local stand-in for Google can be used.
+
+        Returns:
+            Credentials: The user's Google credentials.
+        """
+        return Credentials(
+            token=token,
+            refresh_token=refresh_token,
+            token_uri=os.environ.get("GOOGLE_TOKEN_URI", TOKEN_URI),
+            client_id=os.environ.get("GOOGLE_CLIENT_ID"),
+            client_secret=os.environ.get("GOOGLE_CLIENT_SECRET"),
+            scopes=CALENDAR_SCOPES,
+            expiry=expiry,
+        )
+
+    def load(self, google_id):
+        """
+        Read a user's stored credentials from the database.
+
+        Returns:
+            Credentials | None: The stored credentials, if any.
+        """
+        db, GoogleCredential = _models()
+        row = db.session.get(GoogleCredential, google_id)
+        if row is None:
+            return None
+        return self.build(row.access_token, row.refresh_token, row.expiry)
+
+    def save(self, google_id, credentials):
+        """
+        Persist a user's credentials and make them the cached copy.
+
+        Args:
+            google_id (str): The user's Google id.
+            credentials (Credentials): The credentials to store.
+        """
+        db, GoogleCredential = _models()
+        row = db.session.get(GoogleCredential, google_id)
+        if row is None:
+            row = GoogleCredential(google_id=google_id)
+            db.session.add(row)
+        row.access_token = credentials.token
+        if credentials.refresh_token:
+            row.refresh_token = credentials.refresh_token
+        row.expiry = credentials.expiry
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.remember(google_id, credentials)
+
+    def remember(self, google_id, credentials):
+        """
+        Cache credentials in this process without persisting them.
+        """
+        with self._lock:
+            self._cache[google_id] = credentials
+
+    def forget(self, google_id):
+        """
+        Drop a user's credentials from this process's cache.
+        """
+        with self._lock:
+            self._cache.pop(google_id, None)
+
+    def get(self, google_id, token, refresh_token):
+        """
+        Return valid credentials for a user.
+
+        Cached credentials are used when present, then stored ones, and
+        finally the tokens the caller holds. A token about to expire is
+        refreshed inline; one merely nearing expiry is refreshed in the
+        background while it keeps being served.
+
+        Args:
+            google_id (str): The user's Google id.
+            token (str): The access token held by the caller.
+            refresh_token (str): The refresh token held by the caller.
+
+        Returns:
+            Credentials: The user's Google credentials.
+        """
+        with self._lock:
+            credentials = self._cache.get(google_id)
+        if credentials is None:
+            credentials = (self.load(google_id)
+                           or self.build(token, refresh_token))
+            self.remember(google_id, credentials)
+
+        remaining = seconds_left(credentials)
+        if remaining is None:
+            return credentials
+        if remaining <= self.refresh_margin:
+            return self.refresh(google_id, credentials)
+        if remaining <= self.proactive_margin:
+            self.schedule_refresh(google_id, credentials)
+        return credentials
+
+    def refresh(self, google_id, credentials):
+        """
+        Refresh a user's credentials, sharing the call with any refresh
+        already in flight for the same user.
+
+        Returns:
+            Credentials: The refreshed credentials.
+        """
+        with self._lock:
+            future = self._inflight.get(google_id)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[google_id] = future
+        if not owner:
+            return future.result()
+
+        try:
+            refreshed = self._refresh(google_id, credentials)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(refreshed)
+            return refreshed
+        finally:
+            with self._lock:
+                self._inflight.pop(google_id, None)
+
+    def _refresh(self, google_id, credentials):
+        stored = self.load(google_id)
+        if (stored is not None and stored.token != credentials.token
+                and seconds_left(stored) is not None
+                and seconds_left(stored) > self.refresh_margin):
+            # Another worker refreshed it first
+            self.remember(google_id, stored)
+            return stored
+        refresh_token = credentials.refresh_token or (
+            stored.refresh_token if stored is not None else None)
+        refreshed = self.build(credentials.token, refresh_token,
+                               credentials.expiry)
+        refreshed.refresh(self._request)
+        self.save(google_id, refreshed)
+        return refreshed
+
+    def schedule_refresh(self, google_id, credentials):
+        """
+        Refresh a user's credentials in the background unless a refresh
+        is already in flight.
+
+        Returns:
+            Future | None: The background task, if one was started.
+        """
+        with self._lock:
+            if google_id in self._inflight:
+                return None
+        app = current_app._get_current_object()
+        return self._executor.submit(self._background_refresh, app,
+                                     google_id, credentials)
+
+    def _background_refresh(self, app, google_id, credentials):
+        with app.app_context():
+            try:
+                return self.refresh(google_id, credentials)
+            except Exception:
+                logger.exception("Background token refresh failed")
+
+
+credential_manager = CredentialManager(calendarGateway.http_session)
@@ -0,0 +1,202 @@
+"""
+calendarGateway.py
+
+This module is the outbound gateway every Google Calendar API call goes
+through. It replaces the fresh `httplib2` connection each service would
+otherwise open with:
+
+- A process-wide `requests.Session` whose urllib3 pool keeps connections to
+  Google alive and reuses them across users and requests.
+- Connect and read timeouts on every call, so a slow Google response fails
+  fast instead of holding a worker for the full round trip.
+- A global semaphore bounding the calls in flight from this process, and a
+  per-user semaphore so one user cannot take every slot. Waiting for a
+  slot is itself bounded by `QUEUE_TIMEOUT`.
+- Retries with exponential backoff on 429, 5xx and connection errors, using
+  the Google client's own `num_retries` handling. Only idempotent methods
+  are retried by default: a retried insert that had in fact reached Google
+  would create a duplicate event, so callers must opt in to retrying
+  anything else by passing `num_retries`.
+
+Attributes:
+    CONNECT_TIMEOUT (float): Seconds allowed to open a connection.
+    READ_TIMEOUT (float): Seconds allowed between bytes of a response.
+    POOL_SIZE (int): Keep-alive connections kept open to Google.
+    MAX_CONCURRENCY (int): Calls in flight across the process.
+    USER_CONCURRENCY (int): Calls in flight for a single user.
+    QUEUE_TIMEOUT (float): Seconds a call waits for a free slot.
+    RETRIES (int): Retries for 429, 5xx and connection errors.
+    IDEMPOTENT_METHODS (frozenset): HTTP methods retried by default.
+"""
+
+import os
+import socket
+import threading
+import weakref
+import httplib2
+import requests
+from requests.adapters import HTTPAdapter
+from googleapiclient.http import HttpRequest
+from src import instrumentation
+
+CONNECT_TIMEOUT = float(os.environ.get("CALENDAR_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("CALENDAR_READ_TIMEOUT", 10))
+POOL_SIZE = int(os.environ.get("CALENDAR_POOL_SIZE", 20))
+MAX_CONCURRENCY = int(os.environ.get("CALENDAR_MAX_CONCURRENCY", 20))
+USER_CONCURRENCY = int(os.environ.get("CALENDAR_USER_CONCURRENCY", 4))
+QUEUE_TIMEOUT = float(os.environ.get("CALENDAR_QUEUE_TIMEOUT", 5))
+RETRIES = int(os.environ.get("CALENDAR_RETRIES", 2))
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+
+class GatewayBusy(Exception):
+    """
+    Raised when no call slot frees up within `QUEUE_TIMEOUT`.
+    """
+
+
+def create_session(pool_size=POOL_SIZE):
+    """
+    Create a `requests.Session` with a keep-alive pool sized for the
+    gateway.
+
+    Args:
+        pool_size (int): Connections kept open per host.
+
+    Returns:
+        requests.Session: The pooled session.
+    """
+    http_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    http_session.mount("https://", adapter)
+    http_session.mount("http://", adapter)
+    return http_session
+
+
+class Limiter:
+    """
+    Global and per-key concurrency limits for outbound calls.
+
+    Per-key semaphores are held in a weak dictionary, so a user's
+    semaphore only lives while one of their calls holds it.
+    """
+
+    def __init__(self, max_concurrency, per_key, timeout):
+        self._global = threading.BoundedSemaphore(max_concurrency)
+        self._per_key = per_key
+        self._timeout = timeout
+        self._keys = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def _key_semaphore(self, key):
+        with self._lock:
+            semaphore = self._keys.get(key)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self._per_key)
+                self._keys[key] = semaphore
+            return semaphore
+
+    def acquire(self, key):
+        """
+        Take a per-key slot and then a global slot.
+
+        Args:
+            key (str): The user the call is made for.
+
+        Returns:
+            threading.BoundedSemaphore: The per-key semaphore, to be passed
+            to `release`.
+
+        Raises:
+            GatewayBusy: If either slot is not free within the timeout.
+        """
+        semaphore = self._key_semaphore(key)
+        if not semaphore.acquire(timeout=self._timeout):
+            raise GatewayBusy("Too many Google Calendar calls for this user")
+        if not self._global.acquire(timeout=self._timeout):
+            semaphore.release()
+            raise GatewayBusy("Too many Google Calendar calls in flight")
+        return semaphore
+
+    def release(self, semaphore):
+        """
+        Give back the slots taken by `acquire`.
+        """
+        self._global.release()
+        semaphore.release()
+
+
+class GatewayHttp:
+    """
+    An `httplib2.Http` stand-in that sends requests through the shared
+    pooled session under the gateway's limits.
+
+    Google's client only calls `request()`, so this is all it needs.
+    """
+
+    def __init__(self, key, http_session, limiter,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        self.key = key
+        self.http_session = http_session
+        self.limiter = limiter
+        self.timeout = timeout
+
+    def request(self, uri, method="GET", body=None, headers=None,
+                redirections=None, connection_type=None):
+        """
+        Send one request and return it in `httplib2`'s shape.
+
+        Timeouts and connection failures are re-raised as the socket
+        errors Google's client retries on.
+
+        Returns:
+            tuple: `(httplib2.Response, bytes)`.
+        """
+        semaphore = self.limiter.acquire(self.key)
+        try:
+            response = self.http_session.request(
+                method, uri, data=body, headers=headers,
+                timeout=self.timeout)
+        except requests.Timeout as e:
+            raise socket.timeout(str(e)) from e
+        except requests.ConnectionError as e:
+            raise ConnectionError(str(e)) from e
+        finally:
+            self.limiter.release(semaphore)
+
+        # requests has already decoded the body
+        info = {key.lower(): value for key, value in response.headers.items()
+                if key.lower() not in ("content-encoding", "content-length")}
+        info["status"] = response.status_code
+        return httplib2.Response(info), response.content
+
+
+class RetryingHttpRequest(HttpRequest):
+    """
+    `HttpRequest` whose `execute()` retries idempotent methods with
+    backoff by default and is timed as Google work of the current request.
+    """
+
+    def execute(self, http=None, num_retries=None):
+        if num_retries is None:
+            num_retries = (RETRIES if self.method.upper() in
+                           IDEMPOTENT_METHODS else 0)
+        with instrumentation.timed("google", self.methodId):
+            return super().execute(http=http, num_retries=num_retries)
+
+
+http_session = create_session()
+limiter = Limiter(MAX_CONCURRENCY, USER_CONCURRENCY, QUEUE_TIMEOUT)
+
+
+def gateway_http(key):
+    """
+    Return an HTTP transport for one user's Calendar service.
+
+    Args:
+        key (str): The user's Google id.
+
+    Returns:
+        GatewayHttp: A transport sharing the process-wide pool and limits.
+    """
+    return GatewayHttp(key, http_session, limiter)
@@ -10,19 +10,225 @@ Attributes:
     Google Calendar operations.
 """
 
+import functools
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cachetools
+import click
 from flask import Blueprint, request, session, jsonify, abort
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-import google.auth.transport.requests
+from flask import current_app
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+import google_auth_httplib2
+from src.calendarCache import event_cache
+from src.calendarCredentials import credential_manager
+from src import calendarGateway, calendarSync, calendarWatch, changeFeed
+from src import dataVersions, instrumentation, queryBudget
 from datetime import datetime, timedelta, timezone
 
 calendarGoogle = Blueprint('calendarGoogle', __name__)
 
+SERVICE_CACHE_SIZE = int(os.environ.get("CALENDAR_SERVICE_CACHE_SIZE", 256))
+SERVICE_CACHE_TTL = int(os.environ.get("CALENDAR_SERVICE_CACHE_TTL", 300))
 
-def get_user_timezone(service):
+
+@functools.lru_cache(maxsize=None)
+def get_discovery_document():
+    """
+    Load and parse the Calendar v3 discovery document once per process.
+
+    Returns:
+        dict: The parsed discovery document.
+    """
+    return json.loads(discovery_cache.get_static_doc("calendar", "v3"))
+
+
+class ServiceCache:
+    """
+    Bounded, thread-safe LRU/TTL cache of per-user Calendar services.
+
+    Entries are keyed on the user's Google id and remember the session
+    access token they were built from, so a token change in the session
+    is treated as a miss.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._entries = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, token):
+        """
+        Return the cached (credentials, service) pair for a user.
+
+        Args:
+            key (str): The user's Google id.
+            token (str): The access token currently held in the session.
+
+        Returns:
+            tuple | None: The cached pair, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != token:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, token, credentials, service):
+        """
+        Store a service built for the given user and session token.
+        """
+        with self._lock:
+            self._entries[key] = (token, credentials, service)
+
+    def invalidate(self, key):
+        """
+        Drop the cached service for a user, if any.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Drop every cached service and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Return the cache's hit/miss counters and current size.
+
+        Returns:
+            dict: Counters describing cache effectiveness.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self._entries.maxsize,
+            }
+
+
+service_cache = ServiceCache(SERVICE_CACHE_SIZE, SERVICE_CACHE_TTL)
+
+# SQL statements `get_calendar_service` may run to load and refresh the
+# user's credentials, added to the query budget of routes that call it
+CREDENTIAL_QUERIES = 4
+
+TIMEZONE_TTL = int(os.environ.get("CALENDAR_TIMEZONE_TTL", 3600))
+
+# Timezones refreshed in the background, keyed on Google id. The cookie
+# session cannot be written outside a request, so fresher values land
+# here and are copied into the session on the user's next request.
+_timezones = {}
+_timezone_refreshes = set()
+_timezone_lock = threading.Lock()
+_timezone_executor = ThreadPoolExecutor(max_workers=2,
+                                        thread_name_prefix="timezone")
+
+
+def build_service(credentials, google_id=None):
+    """
+    Build a Calendar API client from the cached discovery document.
+
+    The client sends its calls through `calendarGateway`, which pools
+    connections, bounds concurrency per user and retries with backoff.
+    `GOOGLE_CALENDAR_API_URL`, when set, replaces the API's base URL
+    (e.g. `http://localhost:8081/calendar/v3/`) so a local stand-in for
+    Google can be used.
+
+    Args:
+        credentials (Credentials): The user's Google credentials.
+        google_id (str): The user's Google id, used for per-user limits.
+
+    Returns:
+        Resource: Google Calendar API service.
+    """
+    http = google_auth_httplib2.AuthorizedHttp(
+        credentials, http=calendarGateway.gateway_http(google_id))
+    client_options = None
+    if os.environ.get("GOOGLE_CALENDAR_API_URL"):
+        client_options = {
+            "api_endpoint": os.environ["GOOGLE_CALENDAR_API_URL"]}
+    with instrumentation.timed("build"):
+        return build_from_document(
+            get_discovery_document(), http=http,
+            requestBuilder=calendarGateway.RetryingHttpRequest,
+            client_options=client_options)
+
+
+def session_credentials():
+    """
+    Build Google credentials from the tokens held in the session.
+
+    Returns:
+        Credentials: The user's Google credentials.
+    """
+    return credential_manager.build(session.get('access_token'),
+                                    session.get('refresh_token'))
+
+
+def get_calendar_service():
+    """
+    Return the logged-in user's Google Calendar API service instance.
+
+    Credentials come from `credential_manager`, which refreshes them ahead
+    of expiry and shares refreshed tokens between workers. Services are
+    reused across requests through `service_cache` and rebuilt whenever
+    the access token changes.
+
+    Returns:
+        Resource: Google Calendar API service.
+    """
+    if 'access_token' not in session or 'refresh_token' not in session:
+        abort(401)
+
+    credentials, service = service_for(session.get('id_google'),
+                                       session['access_token'],
+                                       session['refresh_token'])
+    if credentials.token != session['access_token']:
+        session['access_token'] = credentials.token
+        session['refresh_token'] = credentials.refresh_token
+    return service
+
+
+def service_for(google_id, access_token, refresh_token):
     """
-    Fetch the user's primary calendar timezone.
+    Return a user's current credentials and Calendar API service without
+    touching the session.
+
+    Args:
+        google_id (str): The user's Google id.
+        access_token (str): The access token the caller last saw.
+        refresh_token (str): The refresh token the caller last saw.
+
+    Returns:
+        tuple: The current `Credentials` and the service.
+    """
+    credentials = credential_manager.get(google_id, access_token,
+                                         refresh_token)
+    cached = service_cache.get(google_id, credentials.token)
+    if cached is not None:
+        return credentials, cached[1]
+
+    service = build_service(credentials, google_id)
+    service_cache.put(google_id, credentials.token, credentials, service)
+    return credentials, service
+
+
+def fetch_user_timezone(service):
+    """
+    Fetch the user's primary calendar timezone from Google.
 
     Args:
         service: Google Calendar API service instance.
@@ -37,39 +243,177 @@ def get_user_timezone(service):
         return "UTC"
 
 
-def get_calendar_service():
+def store_user_timezone(user_timezone):
+    """
+    Record the user's timezone in the session along with when it was
+    fetched.
+
+    Args:
+        user_timezone (str): The user's timezone.
     """
-    Create and return a Google Calendar API service instance.
+    session['timezone'] = user_timezone
+    session['timezone_fetched_at'] = time.time()
+
+
+def prime_user_timezone():
+    """
+    Resolve the logged-in user's timezone and store it in the session.
+
+    Called once at login so calendar requests do not need to ask
+    Google for it.
+    """
+    store_user_timezone(fetch_user_timezone(get_calendar_service()))
+
+
+def _refresh_timezone(google_id, credentials):
+    """
+    Background task fetching a user's timezone into `_timezones`.
+    """
+    try:
+        user_timezone = fetch_user_timezone(
+            build_service(credentials, google_id))
+        with _timezone_lock:
+            _timezones[google_id] = (user_timezone, time.time())
+    finally:
+        with _timezone_lock:
+            _timezone_refreshes.discard(google_id)
+
+
+def schedule_timezone_refresh():
+    """
+    Queue a background refresh of the logged-in user's timezone unless
+    one is already in flight.
+    """
+    google_id = session.get('id_google')
+    with _timezone_lock:
+        if google_id in _timezone_refreshes:
+            return
+        _timezone_refreshes.add(google_id)
+    _timezone_executor.submit(_refresh_timezone, google_id,
+                              session_credentials())
+
+
+def get_user_timezone(service):
+    """
+    Return the user's primary calendar timezone.
+
+    The timezone is read from the session, which is populated at login.
+    Once it is older than `TIMEZONE_TTL` the stale value keeps being
+    served while a background refresh fetches a new one.
+
+    Args:
+        service: Google Calendar API service instance.
 
     Returns:
-        Resource: Google Calendar API service.
+        str: The user's timezone as a string.
     """
-    if 'access_token' not in session or 'refresh_token' not in session:
-        abort(401)
+    user_timezone = session_timezone()
+    if user_timezone is None:
+        user_timezone = fetch_user_timezone(service)
+        store_user_timezone(user_timezone)
+    return user_timezone
 
-    credentials = Credentials(
-        token=session.get('access_token'),
-        refresh_token=session.get('refresh_token'),
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=os.environ.get("GOOGLE_CLIENT_ID"),
-        client_secret=os.environ.get("GOOGLE_CLIENT_SECRET"),
-        scopes=[
-            "https://www.googleapis.com/auth/calendar",
-            "https://www.googleapis.com/auth/calendar.events",
-        ],
-    )
-
-    if credentials.expired:
-        credentials.refresh(google.auth.transport.requests.Request())
-        # Update session tokens
-        session['access_token'] = credentials.token
-        session['refresh_token'] = credentials.refresh_token
 
-    service = build('calendar', 'v3', credentials=credentials)
-    return service
+def session_timezone():
+    """
+    Return the user's timezone from the session, or None if it has not
+    been fetched yet.
+
+    A timezone refreshed in the background is copied into the session
+    first, and a refresh is scheduled once the value is older than
+    `TIMEZONE_TTL`.
+
+    Returns:
+        str | None: The user's timezone.
+    """
+    with _timezone_lock:
+        refreshed = _timezones.get(session.get('id_google'))
+    if refreshed and refreshed[1] > session.get('timezone_fetched_at', 0):
+        session['timezone'], session['timezone_fetched_at'] = refreshed
+
+    if 'timezone' not in session:
+        return None
+    if time.time() - session['timezone_fetched_at'] > TIMEZONE_TTL:
+        schedule_timezone_refresh()
+    return session['timezone']
+
+
+def record_sync(user_id):
+    """
+    Bump a user's calendar version after a sync changed their mirror and
+    tell their open clients to reload it.
+    """
+    dataVersions.bump_version(user_id, 'calendar')
+    calendarSync.commit()
+    changeFeed.publish(user_id, 'calendar', 'reload')
+
+
+def sync_user_events():
+    """
+    Bring the logged-in user's local event mirror up to date with Google
+    Calendar if it is stale.
+
+    Mirrors kept fresh by push notifications are only polled every
+    `calendarWatch.WATCHED_SYNC_INTERVAL`. When notifications are
+    configured, the user's watch channel is opened or renewed here.
+    """
+    _sync_user_events(session['user_id'], get_calendar_service,
+                      get_user_timezone, lambda: session.get('timezone'))
+
+
+def _sync_user_events(user_id, get_service, get_timezone, watch_timezone):
+    # `sync_user_events` for explicit values rather than the session;
+    # `watch_timezone` returns the timezone a new watch channel records
+    channel = calendarWatch.get_channel(user_id)
+    interval = None
+    if calendarWatch.is_active(channel):
+        interval = calendarWatch.WATCHED_SYNC_INTERVAL
+    if calendarSync.sync_if_stale(get_service, user_id, get_timezone,
+                                  interval):
+        record_sync(user_id)
+    if calendarWatch.enabled() and calendarWatch.needs_renewal(channel):
+        calendarWatch.ensure_watch(get_service, user_id,
+                                   watch_timezone() or 'UTC')
+
+
+def fetch_upcoming_events():
+    """
+    Read the user's next upcoming events from the local mirror.
+
+    Returns:
+        list: Event resources as returned by Google.
+    """
+    sync_user_events()
+    return calendarSync.events_between(
+        session['user_id'], start=datetime.now(timezone.utc), limit=10)
+
+
+def record_event_changes(events, user_timezone="UTC"):
+    """
+    Write changes made through this API into the local mirror, bump the
+    user's calendar version, invalidate their cached reads and notify
+    their open clients.
+
+    Args:
+        events (list): Event resources; cancelled events are removed.
+        user_timezone (str): The user's calendar timezone.
+    """
+    calendarSync.apply_events(session['user_id'], events, user_timezone)
+    dataVersions.bump_version(session['user_id'], 'calendar')
+    calendarSync.commit()
+    event_cache.invalidate(session['id_google'])
+    for event in events:
+        if event.get('status') == 'cancelled':
+            changeFeed.publish(session['user_id'], 'calendar', 'deleted',
+                               {'id': event['id']})
+        else:
+            changeFeed.publish(session['user_id'], 'calendar', 'updated',
+                               event)
 
 
 @calendarGoogle.route('/api/calendar/events', methods=['GET'])
+@queryBudget.query_budget(CREDENTIAL_QUERIES + 6)
+@dataVersions.conditional('calendar')
 def get_events():
     """
     Fetch Google Calendar events.
@@ -78,21 +422,43 @@ def get_events():
         Response: JSON response with event details.
     """
     try:
-        service = get_calendar_service()
-        user_timezone = get_user_timezone(service)
-        now = datetime.now(timezone.utc).isoformat()
-        events_result = service.events().list(
-            calendarId='primary', timeMin=now,
-            maxResults=10, singleEvents=True,
-            orderBy='startTime', timeZone=user_timezone).execute()
-        events = events_result.get('items', [])
+        events = event_cache.get_or_load(
+            session['id_google'], 'upcoming', fetch_upcoming_events)
 
         return jsonify(events), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def build_event_body(event_data, user_timezone):
+    """
+    Build a new event resource from the fields a client sends.
+
+    Args:
+        event_data (dict): Client-supplied `summary`, `location`,
+            `description`, `start`, `end` and optional `timeZone`.
+        user_timezone (str): Timezone used when none is given.
+
+    Returns:
+        dict: The event resource to insert.
+    """
+    return {
+        'summary': event_data.get('summary', 'No Title'),
+        'location': event_data.get('location', ''),
+        'description': event_data.get('description', ''),
+        'start': {
+            'dateTime': event_data.get('start'),
+            'timeZone': event_data.get('timeZone', user_timezone),
+        },
+        'end': {
+            'dateTime': event_data.get('end'),
+            'timeZone': event_data.get('timeZone', user_timezone),
+        }
+    }
+
+
 @calendarGoogle.route('/api/calendar/events', methods=['POST'])
+@queryBudget.query_budget(CREDENTIAL_QUERIES + 4)
 def create_event():
     """
     Create a new Google Calendar event.
@@ -106,28 +472,14 @@ def create_event():
         service = get_calendar_service()
         user_timezone = get_user_timezone(service)
 
-        start = event_data.get('start')
-        end = event_data.get('end')
-
-        if not start or not end:
+        if not event_data.get('start') or not event_data.get('end'):
             return jsonify({"error": "Start and End time are required"}), 400
 
-        event = {
-            'summary': event_data.get('summary', 'No Title'),
-            'location': event_data.get('location', ''),
-            'description': event_data.get('description', ''),
-            'start': {
-                'dateTime': start,
-                'timeZone': event_data.get('timeZone', user_timezone),
-            },
-            'end': {
-                'dateTime': end,
-                'timeZone': event_data.get('timeZone', user_timezone),
-            }
-        }
+        event = build_event_body(event_data, user_timezone)
 
         created_event = service.events().insert(
             calendarId='primary', body=event).execute()
+        record_event_changes([created_event], user_timezone)
 
         return jsonify(created_event), 201
 
@@ -136,6 +488,7 @@ def create_event():
 
 
 @calendarGoogle.route('/api/calendar/events/<event_id>', methods=['PUT'])
+@queryBudget.query_budget(CREDENTIAL_QUERIES + 4)
 def update_event(event_id):
     """
     Update an existing Google Calendar event.
@@ -175,12 +528,14 @@ def update_event(event_id):
         updated_event = service.events().update(calendarId='primary',
                                                 eventId=event_id,
                                                 body=event).execute()
+        record_event_changes([updated_event], user_timezone)
         return jsonify(updated_event), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @calendarGoogle.route('/api/calendar/events/<event_id>', methods=['DELETE'])
+@queryBudget.query_budget(CREDENTIAL_QUERIES + 4)
 def delete_event(event_id):
     """
     Delete an existing Google Calendar event.
@@ -195,13 +550,84 @@ def delete_event(event_id):
         service = get_calendar_service()
         service.events().delete(
             calendarId='primary', eventId=event_id).execute()
+        record_event_changes([{'id': event_id, 'status': 'cancelled'}])
 
         return jsonify({"message": "Event deleted successfully."}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def fetch_todays_events():
+    """
+    Read the current day's events from the local mirror.
+
+    Returns:
+        list: Event resources as returned by Google.
+    """
+    sync_user_events()
+    return _todays_mirrored_events(session['user_id'])
+
+
+def _todays_mirrored_events(user_id):
+    # The current day's events in a user's mirror, without syncing it
+    now = datetime.now().astimezone().replace(hour=0, minute=0,
+                                              second=0, microsecond=0)
+    end_of_day = now + timedelta(hours=23, minutes=59, seconds=59)
+    return calendarSync.events_between(user_id, start=now, end=end_of_day)
+
+
+def cached_todays_events():
+    """
+    Read the user's events for today through the per-user event cache.
+
+    Returns:
+        list: Event resources as returned by Google.
+    """
+    today = datetime.now().astimezone().date().isoformat()
+    return event_cache.get_or_load(session['id_google'], f'today:{today}',
+                                   fetch_todays_events)
+
+
+def todays_events_loader():
+    """
+    Return a function reading the user's events for today like
+    `cached_todays_events`, for running off the request thread.
+
+    Everything it needs from the session is read here, on the request
+    thread, and the returned function never reads or writes the session.
+    Tokens it refreshes are still shared through `credential_manager`,
+    and reach the session on the user's next request.
+
+    Returns:
+        Callable: Returns a list of event resources as returned by Google.
+    """
+    user_id = session['user_id']
+    google_id = session['id_google']
+    access_token = session.get('access_token')
+    refresh_token = session.get('refresh_token')
+    user_timezone = session_timezone()
+    today = datetime.now().astimezone().date().isoformat()
+
+    def get_service():
+        if access_token is None or refresh_token is None:
+            abort(401)
+        return service_for(google_id, access_token, refresh_token)[1]
+
+    def get_timezone(service):
+        return user_timezone or fetch_user_timezone(service)
+
+    def fetch():
+        _sync_user_events(user_id, get_service, get_timezone,
+                          lambda: user_timezone)
+        return _todays_mirrored_events(user_id)
+
+    return lambda: event_cache.get_or_load(google_id, f'today:{today}',
+                                           fetch)
+
+
 @calendarGoogle.route('/api/calendar/events/today', methods=['GET'])
+@queryBudget.query_budget(CREDENTIAL_QUERIES + 6)
+@dataVersions.conditional('calendar', daily=True)
 def get_todays_events():
     """
     Fetch Google Calendar events for the current day in the user's time zone.
@@ -210,25 +636,203 @@ def get_todays_events():
         Response: JSON response with event details.
     """
     try:
+        return jsonify(cached_todays_events()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Google rejects batch requests with more than 50 calls.
+BATCH_LIMIT = 50
+
+
+def _batch_request(service, operation, user_timezone):
+    """
+    Turn one batch operation into a Calendar API request.
+
+    Raises:
+        ValueError: If the operation is invalid.
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be an object")
+
+    op = operation.get('op')
+    events = service.events()
+    if op == 'create':
+        if not operation.get('start') or not operation.get('end'):
+            raise ValueError("Start and End time are required")
+        return events.insert(calendarId='primary',
+                             body=build_event_body(operation, user_timezone))
+
+    if not operation.get('id'):
+        raise ValueError("Event id is required")
+    if op == 'delete':
+        return events.delete(calendarId='primary', eventId=operation['id'])
+    if op == 'update':
+        body = {key: operation[key]
+                for key in ('summary', 'location', 'description')
+                if key in operation}
+        for key in ('start', 'end'):
+            if operation.get(key):
+                body[key] = {
+                    'dateTime': operation[key].replace('Z', ''),
+                    'timeZone': operation.get('timeZone', user_timezone),
+                }
+        return events.patch(calendarId='primary', eventId=operation['id'],
+                            body=body)
+    raise ValueError(f"Unknown operation: {op}")
+
+
+@calendarGoogle.route('/api/calendar/events/batch', methods=['POST'])
+@queryBudget.query_budget(CREDENTIAL_QUERIES + 4)
+def batch_events():
+    """
+    Create, update and delete many Google Calendar events at once.
+
+    Accepts `{"operations": [...]}`, where each operation is one of:
+    - `{"op": "create", "summary", "start", "end", ...}`
+    - `{"op": "update", "id", ...fields to change}`
+    - `{"op": "delete", "id"}`
+
+    Operations are sent through Google's batch endpoint, split into
+    chunks of `BATCH_LIMIT`. Updates are sent as patches so they need no
+    prior read.
+
+    Returns:
+        Response: JSON with one result per operation, in request order.
+    """
+    try:
+        data = request.json
+        operations = data.get('operations') if isinstance(data, dict) \
+            else None
+        if not isinstance(operations, list) or not operations:
+            return jsonify({"error": "Invalid data"}), 400
+
         service = get_calendar_service()
         user_timezone = get_user_timezone(service)
-        now = datetime.now().astimezone().replace(hour=0, minute=0,
-                                                  second=0, microsecond=0)
-        end_of_day = now + timedelta(hours=23, minutes=59, seconds=59)
-
-        time_min = now.isoformat()
-        time_max = end_of_day.isoformat()
-
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime',
-            timeZone=user_timezone
-        ).execute()
-
-        events = events_result.get('items', [])
-        return jsonify(events), 200
+
+        results = [None] * len(operations)
+        changed = []
+
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            if exception is not None:
+                results[index] = {
+                    "status": "error",
+                    "code": getattr(exception, 'status_code', None),
+                    "error": str(exception),
+                }
+                return
+            if operations[index]['op'] == 'delete':
+                changed.append({'id': operations[index]['id'],
+                                'status': 'cancelled'})
+                results[index] = {"status": "ok"}
+            else:
+                changed.append(response)
+                results[index] = {"status": "ok", "event": response}
+
+        pending = []
+        for index, operation in enumerate(operations):
+            try:
+                pending.append(
+                    (index, _batch_request(service, operation,
+                                           user_timezone)))
+            except ValueError as e:
+                results[index] = {"status": "error", "code": 400,
+                                  "error": str(e)}
+
+        for start in range(0, len(pending), BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=on_response)
+            for index, api_request in pending[start:start + BATCH_LIMIT]:
+                batch.add(api_request, request_id=str(index))
+            with instrumentation.timed("google", "calendar.batch"):
+                batch.execute()
+
+        if changed:
+            record_event_changes(changed, user_timezone)
+        return jsonify({"results": results}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+def stored_calendar_service(google_id):
+    """
+    Build a Calendar API service from a user's stored credentials, for
+    work done outside their requests.
+
+    Returns:
+        Resource | None: The service, or None if no credentials are stored.
+    """
+    stored = credential_manager.load(google_id)
+    if stored is None:
+        return None
+    credentials = credential_manager.get(google_id, stored.token,
+                                         stored.refresh_token)
+    return build_service(credentials, google_id)
+
+
+def sync_watched_user(user_id):
+    """
+    Incrementally sync a user's mirror after Google reported a change.
+
+    Args:
+        user_id (int): The user whose calendar changed.
+
+    Returns:
+        int: The number of events changed.
+    """
+    channel = calendarWatch.get_channel(user_id)
+    google_id = channel.user.google_id if channel is not None else None
+    service = google_id and stored_calendar_service(google_id)
+    if not service:
+        return 0
+    changed = calendarSync.sync_events(service, user_id, channel.timezone)
+    if changed:
+        record_sync(user_id)
+        event_cache.invalidate(google_id)
+    return changed
+
+
+@calendarGoogle.route('/api/calendar/notifications', methods=['POST'])
+@queryBudget.query_budget(1)
+def receive_notification():
+    """
+    Receive a Google Calendar push notification.
+
+    Notifications are matched to a watch channel by their channel id,
+    resource id and token. Each one queues an incremental sync of the
+    channel's user, coalesced with any sync already queued. The initial
+    `sync` message is treated the same way, which catches changes made
+    while the channel was being opened.
+
+    Returns:
+        Response: Empty; 204 when accepted, 404 for unknown channels.
+    """
+    channel = calendarWatch.verify_notification(
+        request.headers.get('X-Goog-Channel-ID'),
+        request.headers.get('X-Goog-Resource-ID'),
+        request.headers.get('X-Goog-Channel-Token'))
+    if channel is None:
+        return '', 404
+    calendarWatch.sync_queue.schedule(channel.user_id, sync_watched_user)
+    return '', 204
+
+
+@calendarGoogle.cli.command('renew-watches')
+def renew_watches():
+    """
+    Renew every watch channel close to expiry. Run on a schedule, e.g.
+    daily, so channels of inactive users do not lapse.
+    """
+    renewed = 0
+    for channel in calendarWatch.channels_to_renew():
+        service = stored_calendar_service(channel.user.google_id)
+        if service is None:
+            continue
+        try:
+            calendarWatch.watch_events(service, channel.user_id,
+                                       channel.timezone)
+            renewed += 1
+        except Exception:
+            current_app.logger.exception(
+                "Failed to renew calendar channel %s", channel.channel_id)
+    click.echo(f"Renewed {renewed} calendar watch channels")
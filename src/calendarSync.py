@@ -0,0 +1,359 @@
+"""
+calendarSync.py
+
+This module keeps a local mirror of each user's primary Google Calendar in
+the `calendar_event` table so calendar reads become indexed SQL queries
+instead of Google round trips.
+
+The first sync for a user pages through a full `events().list`. Every later
+sync passes the stored `nextSyncToken` so Google only returns what changed.
+When Google answers 410 Gone the token has expired, so the mirror is wiped
+and a full sync runs again.
+
+Syncs of one user's mirror never run concurrently within a process,
+whether a request or a push notification started them; see `sync_locks`.
+Across processes, each sync holds a row lock on the user's sync state
+until it commits; see `lock_state`.
+
+Models are imported lazily because `app.py` imports the calendar blueprint
+before the models are defined.
+
+Attributes:
+    SYNC_INTERVAL (int): Seconds a mirror is served before it is re-synced.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, time, timezone
+from googleapiclient.errors import HttpError
+from sqlalchemy.exc import IntegrityError
+from src import queryBudget
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9: all-day events are anchored to UTC
+    ZoneInfo = None
+
+SYNC_INTERVAL = int(os.environ.get("CALENDAR_SYNC_INTERVAL", 60))
+SYNC_PAGE_SIZE = 250
+
+
+def _models():
+    from src.app import db, CalendarEvent, CalendarSyncState
+
+    return db, CalendarEvent, CalendarSyncState
+
+
+class UserLocks:
+    """
+    Per-user reentrant locks, created on first use and dropped once
+    nobody holds or waits for them, so there is never more than one per
+    user currently syncing.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, user_id):
+        """
+        Hold a user's lock for the duration of a `with` block.
+
+        Args:
+            user_id (int): The user whose lock is held.
+        """
+        with self._lock:
+            entry = self._locks.setdefault(user_id, [threading.RLock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[user_id]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._locks)
+
+
+sync_locks = UserLocks()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_utc(value):
+    """
+    Convert an aware datetime to the naive UTC form stored in the mirror.
+    """
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _zone(*names):
+    # The first of `names` that is a known timezone, falling back to UTC
+    if ZoneInfo is not None:
+        for name in names:
+            if not name:
+                continue
+            try:
+                return ZoneInfo(name)
+            except (KeyError, ValueError):
+                pass
+    return timezone.utc
+
+
+def parse_event_time(when, user_timezone):
+    """
+    Convert a Google `start`/`end` object to a naive UTC datetime.
+
+    Args:
+        when (dict): The event's `start` or `end` field.
+        user_timezone (str): Timezone used for all-day events without a
+            known timezone of their own; UTC if it is unknown too.
+
+    Returns:
+        datetime | None: The time in UTC, or None if it is missing.
+    """
+    if not when:
+        return None
+    if when.get("dateTime"):
+        # fromisoformat() only accepts a "Z" suffix from Python 3.11
+        value = when["dateTime"].replace("Z", "+00:00")
+        return to_utc(datetime.fromisoformat(value))
+    if when.get("date"):
+        day = datetime.strptime(when["date"], "%Y-%m-%d").date()
+        tz = _zone(when.get("timeZone"), user_timezone)
+        return to_utc(datetime.combine(day, time.min, tzinfo=tz))
+    return None
+
+
+def apply_events(user_id, items, user_timezone="UTC"):
+    """
+    Upsert or delete mirrored events from a list of event resources.
+
+    Cancelled events are removed; everything else is inserted or updated.
+    The caller is responsible for committing. Each event may cost one
+    statement when flushed, so the current request's query budget is
+    raised by that much plus the lookup of existing events.
+
+    Args:
+        user_id (int): The owner of the events.
+        items (list): Event resources as returned by Google.
+        user_timezone (str): Timezone used for all-day events.
+
+    Returns:
+        int: The number of events changed.
+    """
+    db, CalendarEvent, _ = _models()
+    if not items:
+        return 0
+    queryBudget.allow(len(items) + 1)
+
+    ids = [item["id"] for item in items]
+    existing = {
+        event.event_id: event
+        for event in CalendarEvent.query.filter(
+            CalendarEvent.user_id == user_id,
+            CalendarEvent.event_id.in_(ids))
+    }
+
+    for item in items:
+        event = existing.get(item["id"])
+        if item.get("status") == "cancelled":
+            if event is not None:
+                db.session.delete(event)
+            continue
+        if event is None:
+            event = CalendarEvent(user_id=user_id, event_id=item["id"])
+            db.session.add(event)
+            existing[item["id"]] = event
+        event.start_time = parse_event_time(item.get("start"), user_timezone)
+        event.end_time = parse_event_time(item.get("end"), user_timezone)
+        event.data = item
+    return len(items)
+
+
+def commit():
+    """
+    Commit pending mirror changes, rolling back on failure.
+    """
+    db, _, _ = _models()
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def lock_state(user_id):
+    """
+    Return a user's sync state, creating it if needed, locked until the
+    session commits or rolls back.
+
+    The row lock serializes syncs of one user across processes, where
+    `sync_locks` cannot. When two processes create the first state at
+    once, the loser's insert fails and it waits on the winner's row
+    instead.
+
+    Args:
+        user_id (int): The user whose sync state is locked.
+
+    Returns:
+        CalendarSyncState: The freshly read state.
+    """
+    db, _, CalendarSyncState = _models()
+    query = CalendarSyncState.query.filter_by(user_id=user_id) \
+        .with_for_update().populate_existing()
+    state = query.one_or_none()
+    if state is not None:
+        return state
+
+    # A savepoint, its insert and release, and the locked re-read
+    queryBudget.allow(4)
+    try:
+        with db.session.begin_nested():
+            db.session.add(CalendarSyncState(user_id=user_id))
+    except IntegrityError:
+        pass  # Another process created it first
+    return query.one()
+
+
+def _run_sync(service, user_id, sync_token, user_timezone):
+    """
+    Page through `events().list`, applying each page to the mirror.
+
+    Returns:
+        tuple: The number of events changed and the new sync token.
+    """
+    changed = 0
+    page_token = None
+    while True:
+        params = {
+            "calendarId": "primary",
+            "singleEvents": True,
+            "maxResults": SYNC_PAGE_SIZE,
+            "timeZone": user_timezone,
+        }
+        if sync_token:
+            params["syncToken"] = sync_token
+        if page_token:
+            params["pageToken"] = page_token
+
+        result = service.events().list(**params).execute()
+        changed += apply_events(user_id, result.get("items", []),
+                                user_timezone)
+
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return changed, result.get("nextSyncToken")
+
+
+def sync_events(service, user_id, user_timezone="UTC"):
+    """
+    Bring a user's mirror up to date with Google Calendar.
+
+    Runs an incremental sync when a sync token is stored and a full sync
+    otherwise, falling back to a full sync when Google reports the token
+    as expired (410 Gone). The user's lock in `sync_locks` and the row
+    lock from `lock_state` are held throughout.
+
+    Args:
+        service: Google Calendar API service instance.
+        user_id (int): The user whose calendar is synced.
+        user_timezone (str): The user's calendar timezone.
+
+    Returns:
+        int: The number of events changed.
+    """
+    db, CalendarEvent, _ = _models()
+    with sync_locks.hold(user_id):
+        try:
+            # Another thread or process may have synced while this one
+            # waited
+            state = lock_state(user_id)
+            try:
+                changed, next_token = _run_sync(
+                    service, user_id, state.sync_token, user_timezone)
+            except HttpError as e:
+                if e.status_code != 410 or not state.sync_token:
+                    raise
+                CalendarEvent.query.filter_by(user_id=user_id).delete()
+                changed, next_token = _run_sync(service, user_id, None,
+                                                user_timezone)
+
+            state.sync_token = next_token
+            state.last_synced_at = _utcnow()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    return changed
+
+
+def sync_if_stale(get_service, user_id, get_timezone, interval=None):
+    """
+    Sync a user's mirror if it has never been synced or is older than
+    `interval`.
+
+    Args:
+        get_service (Callable): Returns a Calendar API service instance.
+        user_id (int): The user whose calendar is synced.
+        get_timezone (Callable): Returns the user's timezone for a service.
+        interval (int | None): Maximum age of the mirror in seconds;
+            defaults to `SYNC_INTERVAL`.
+
+    Returns:
+        int: The number of events changed; 0 if the mirror was fresh.
+    """
+    db, _, CalendarSyncState = _models()
+    if interval is None:
+        interval = SYNC_INTERVAL
+    if _is_fresh(db.session.get(CalendarSyncState, user_id), interval):
+        return 0
+    with sync_locks.hold(user_id):
+        # A sync that held the lock meanwhile may have refreshed the
+        # mirror; its state is re-read here and again by sync_events
+        queryBudget.allow(2)
+        state = db.session.get(CalendarSyncState, user_id,
+                               populate_existing=True)
+        if _is_fresh(state, interval):
+            return 0
+        service = get_service()
+        return sync_events(service, user_id, get_timezone(service))
+
+
+def _is_fresh(state, interval):
+    return (state is not None and state.last_synced_at is not None
+            and (_utcnow() - state.last_synced_at).total_seconds()
+            < interval)
+
+
+def events_between(user_id, start=None, end=None, limit=None):
+    """
+    Read mirrored events overlapping a time range, ordered by start time.
+
+    Args:
+        user_id (int): The owner of the events.
+        start (datetime | None): Only events ending after this aware time.
+        end (datetime | None): Only events starting before this aware time.
+        limit (int | None): Maximum number of events to return.
+
+    Returns:
+        list: Event resources as returned by Google.
+    """
+    _, CalendarEvent, _ = _models()
+    query = CalendarEvent.query.filter(CalendarEvent.user_id == user_id)
+    if start is not None:
+        query = query.filter(CalendarEvent.end_time > to_utc(start))
+    if end is not None:
+        query = query.filter(CalendarEvent.start_time < to_utc(end))
+    query = query.order_by(CalendarEvent.start_time, CalendarEvent.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [event.data for event in query]
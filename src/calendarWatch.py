@@ -0,0 +1,256 @@
+"""
+calendarWatch.py
+
+This module keeps the local calendar mirror fresh from Google Calendar push
+notifications instead of polling.
+
+When `CALENDAR_WEBHOOK_URL` is set, each user gets an `events().watch`
+channel on their primary calendar, recorded in the `calendar_watch_channel`
+table. Google then POSTs to the webhook whenever something changes, and
+only then is an incremental sync queued. Channels expire, so they are
+renewed once they are within `WATCH_RENEW_MARGIN` of expiry, either when
+the user is active or from the `renew-watches` CLI command run on a
+schedule.
+
+While a user's channel is active their mirror is only re-synced by polling
+every `WATCHED_SYNC_INTERVAL`, as a safety net for lost notifications.
+
+Models are imported lazily because `app.py` imports the calendar blueprint
+before the models are defined.
+
+Attributes:
+    WEBHOOK_URL (str | None): Public HTTPS address Google notifies.
+    WATCH_TTL (int): Channel lifetime requested from Google, in seconds.
+    WATCH_RENEW_MARGIN (int): Seconds before expiry a channel is renewed.
+    WATCHED_SYNC_INTERVAL (int): Polling interval for watched mirrors.
+"""
+
+import hmac
+import logging
+import os
+import secrets
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from src import calendarSync
+
+WEBHOOK_URL = os.environ.get("CALENDAR_WEBHOOK_URL")
+WATCH_TTL = int(os.environ.get("CALENDAR_WATCH_TTL", 7 * 24 * 3600))
+WATCH_RENEW_MARGIN = int(os.environ.get("CALENDAR_WATCH_RENEW_MARGIN",
+                                        24 * 3600))
+WATCHED_SYNC_INTERVAL = int(os.environ.get("CALENDAR_WATCHED_SYNC_INTERVAL",
+                                           3600))
+SYNC_WORKERS = int(os.environ.get("CALENDAR_WATCH_SYNC_WORKERS", 4))
+
+logger = logging.getLogger(__name__)
+
+
+def _models():
+    from src.app import db, CalendarWatchChannel
+
+    return db, CalendarWatchChannel
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enabled():
+    """
+    Return whether push notifications are configured.
+    """
+    return bool(WEBHOOK_URL)
+
+
+def get_channel(user_id):
+    """
+    Return a user's watch channel, or None if they have none.
+    """
+    db, CalendarWatchChannel = _models()
+    return db.session.get(CalendarWatchChannel, user_id)
+
+
+def is_active(channel):
+    """
+    Return whether a channel is still delivering notifications.
+    """
+    return (channel is not None and channel.expiration is not None
+            and channel.expiration > _utcnow())
+
+
+def needs_renewal(channel):
+    """
+    Return whether a channel is missing or within the renewal margin.
+    """
+    return (not is_active(channel) or channel.expiration - _utcnow()
+            <= timedelta(seconds=WATCH_RENEW_MARGIN))
+
+
+def stop_channel(service, channel):
+    """
+    Ask Google to stop a channel. Failures are only logged, since an
+    unstopped channel simply expires.
+    """
+    try:
+        service.channels().stop(body={
+            "id": channel.channel_id,
+            "resourceId": channel.resource_id,
+        }).execute()
+    except Exception:
+        logger.warning("Failed to stop calendar channel %s",
+                       channel.channel_id, exc_info=True)
+
+
+def watch_events(service, user_id, user_timezone="UTC"):
+    """
+    Open a new watch channel on a user's primary calendar, replacing and
+    stopping their previous one.
+
+    Args:
+        service: Google Calendar API service instance.
+        user_id (int): The user whose calendar is watched.
+        user_timezone (str): Timezone used when syncing on notifications.
+
+    Returns:
+        CalendarWatchChannel: The new channel.
+    """
+    db, CalendarWatchChannel = _models()
+    channel_id = str(uuid.uuid4())
+    token = secrets.token_urlsafe(32)
+    result = service.events().watch(calendarId="primary", body={
+        "id": channel_id,
+        "type": "web_hook",
+        "address": WEBHOOK_URL,
+        "token": token,
+        "params": {"ttl": str(WATCH_TTL)},
+    }).execute()
+    # Google reports the expiration in milliseconds since the epoch
+    expiration = datetime.fromtimestamp(
+        int(result["expiration"]) / 1000, timezone.utc).replace(tzinfo=None)
+
+    previous = db.session.get(CalendarWatchChannel, user_id)
+    if previous is not None:
+        stop_channel(service, previous)
+        db.session.delete(previous)
+        db.session.flush()
+    channel = CalendarWatchChannel(
+        user_id=user_id, channel_id=channel_id,
+        resource_id=result["resourceId"], token=token,
+        timezone=user_timezone, expiration=expiration)
+    db.session.add(channel)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return channel
+
+
+def ensure_watch(get_service, user_id, user_timezone="UTC"):
+    """
+    Open or renew a user's channel if push notifications are configured
+    and the current one is missing or about to expire. Failures are only
+    logged, since polling keeps the mirror fresh meanwhile.
+
+    Args:
+        get_service (Callable): Returns a Calendar API service instance.
+        user_id (int): The user whose calendar is watched.
+        user_timezone (str): Timezone used when syncing on notifications.
+
+    Returns:
+        CalendarWatchChannel | None: The user's channel, if any.
+    """
+    channel = get_channel(user_id)
+    if not enabled() or not needs_renewal(channel):
+        return channel
+    try:
+        return watch_events(get_service(), user_id, user_timezone)
+    except Exception:
+        logger.exception("Failed to watch calendar for user %s", user_id)
+        return channel
+
+
+def channels_to_renew():
+    """
+    Return every channel within the renewal margin of expiry.
+    """
+    _, CalendarWatchChannel = _models()
+    cutoff = _utcnow() + timedelta(seconds=WATCH_RENEW_MARGIN)
+    return CalendarWatchChannel.query.filter(
+        CalendarWatchChannel.expiration <= cutoff).all()
+
+
+def verify_notification(channel_id, resource_id, token):
+    """
+    Find the channel a notification belongs to, checking that it carries
+    the token the channel was opened with.
+
+    Args:
+        channel_id (str): The `X-Goog-Channel-ID` header.
+        resource_id (str): The `X-Goog-Resource-ID` header.
+        token (str): The `X-Goog-Channel-Token` header.
+
+    Returns:
+        CalendarWatchChannel | None: The channel, or None if the
+        notification is unknown or forged.
+    """
+    if not channel_id:
+        return None
+    _, CalendarWatchChannel = _models()
+    channel = CalendarWatchChannel.query.filter_by(
+        channel_id=channel_id).first()
+    if (channel is None or channel.resource_id != resource_id
+            or not hmac.compare_digest(channel.token, token or "")):
+        return None
+    return channel
+
+
+class SyncQueue:
+    """
+    Runs per-user syncs in the background, coalescing bursts of
+    notifications for the same user into a single queued sync.
+
+    Syncs for one user never run concurrently, with each other or with a
+    request syncing the same mirror: all of them hold the user's lock in
+    `calendarSync.sync_locks`. A notification arriving during a sync
+    queues exactly one more.
+
+    Args:
+        max_workers (int): Threads running syncs.
+    """
+
+    def __init__(self, max_workers=SYNC_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="calendar-sync")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, user_id, sync):
+        """
+        Queue `sync(user_id)` unless one is already queued for the user.
+
+        Returns:
+            Future | None: The background task, if one was queued.
+        """
+        with self._lock:
+            if user_id in self._pending:
+                return None
+            self._pending.add(user_id)
+        app = current_app._get_current_object()
+        return self._executor.submit(self._run, app, user_id, sync)
+
+    def _run(self, app, user_id, sync):
+        with calendarSync.sync_locks.hold(user_id):
+            with self._lock:
+                self._pending.discard(user_id)
+            with app.app_context():
+                try:
+                    return sync(user_id)
+                except Exception:
+                    logger.exception("Calendar sync failed for user %s",
+                                     user_id)
+
+
+sync_queue = SyncQueue()
@@ -0,0 +1,292 @@
+"""
+changeFeed.py
+
+This module publishes per-user change notifications so the frontend can
+apply small diffs instead of refetching whole lists after every write.
+
+Writes publish a change such as `{"type": "todos", "op": "created",
+"data": {...}}` to the user's channel. `/api/changes/stream` delivers them
+as Server-Sent Events. Every change gets an increasing id, and the most
+recent `CHANGE_FEED_HISTORY` changes are kept, so a reconnecting client
+that sends `Last-Event-ID` is sent what it missed. A client that missed
+more than that is told to reload instead.
+
+The broker is pluggable, like the calendar cache:
+- `local` (default): an in-process stand-in for Redis. Changes only reach
+  clients connected to the same process.
+- `redis`: a Redis server at `CHANGE_FEED_URL` (requires the `redis`
+  package), which fans changes out across workers.
+
+Attributes:
+    broker (Broker): The process-wide change broker.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict, deque
+
+CHANGE_FEED_BACKEND = os.environ.get("CHANGE_FEED_BACKEND", "local")
+CHANGE_FEED_HISTORY = int(os.environ.get("CHANGE_FEED_HISTORY", 100))
+CHANGE_FEED_HEARTBEAT = int(os.environ.get("CHANGE_FEED_HEARTBEAT", 15))
+
+logger = logging.getLogger(__name__)
+
+
+class LocalPubSub:
+    """
+    In-process stand-in for a Redis server.
+
+    Implements the subset of the redis-py client interface used by
+    `Broker`: counters, capped lists and publish/subscribe.
+    """
+
+    def __init__(self):
+        self._counters = defaultdict(int)
+        self._lists = defaultdict(deque)
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def incr(self, key):
+        """
+        Increment the counter at `key` and return its new value.
+        """
+        with self._lock:
+            self._counters[key] += 1
+            return self._counters[key]
+
+    def rpush(self, key, value):
+        """
+        Append `value` to the list at `key`.
+        """
+        with self._lock:
+            self._lists[key].append(value.encode("utf-8"))
+
+    def ltrim(self, key, start, end):
+        """
+        Keep only the last `-start` values of the list at `key`.
+
+        Only the `ltrim(key, -n, -1)` form used by `Broker` is supported.
+        """
+        with self._lock:
+            values = self._lists[key]
+            while len(values) > -start:
+                values.popleft()
+
+    def lrange(self, key, start, end):
+        """
+        Return every value of the list at `key`, oldest first.
+        """
+        with self._lock:
+            return list(self._lists[key])
+
+    def expire(self, key, seconds):
+        """
+        Accept and ignore an expiry; lists here are already capped.
+        """
+
+    def publish(self, channel, message):
+        """
+        Deliver `message` to the channel's subscribers.
+
+        Returns:
+            int: The number of subscribers it was delivered to.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers[channel])
+        for subscriber in subscribers:
+            subscriber.put({"type": "message",
+                            "data": message.encode("utf-8")})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        """
+        Return a new, unsubscribed `LocalSubscription`.
+        """
+        return LocalSubscription(self)
+
+
+class LocalSubscription:
+    """
+    Subscription handle returned by `LocalPubSub.pubsub()`.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._channels = []
+        self._messages = queue.Queue()
+
+    def subscribe(self, channel):
+        """
+        Start receiving messages published to `channel`.
+        """
+        with self._store._lock:
+            self._store._subscribers[channel].add(self._messages)
+        self._channels.append(channel)
+
+    def get_message(self, timeout=0):
+        """
+        Return the next message, or None after `timeout` seconds.
+        """
+        try:
+            return self._messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """
+        Unsubscribe from every channel.
+        """
+        with self._store._lock:
+            for channel in self._channels:
+                self._store._subscribers[channel].discard(self._messages)
+        self._channels = []
+
+
+class Broker:
+    """
+    Publishes and replays per-user changes over a Redis-compatible client.
+
+    Args:
+        client: A redis-py compatible client.
+        history (int): Changes kept per user for resuming clients.
+    """
+
+    def __init__(self, client, history=CHANGE_FEED_HISTORY):
+        self.client = client
+        self.history = history
+
+    def publish(self, user_id, change):
+        """
+        Publish a change to a user's channel.
+
+        Args:
+            user_id (int): The user whose data changed.
+            change (dict): `type`, `op` and optional `data` of the change.
+
+        Returns:
+            dict: The change with its assigned `id`.
+        """
+        channel = f"changes:{user_id}"
+        change = dict(change, id=self.client.incr(f"{channel}:id"))
+        message = json.dumps(change, default=str)
+        self.client.rpush(f"{channel}:history", message)
+        self.client.ltrim(f"{channel}:history", -self.history, -1)
+        self.client.expire(f"{channel}:history", 24 * 3600)
+        self.client.publish(channel, message)
+        return change
+
+    def replay(self, user_id, last_id):
+        """
+        Return the changes a user missed since `last_id`.
+
+        Returns:
+            list | None: The missed changes, oldest first, or None if some
+            are no longer kept and the client must reload.
+        """
+        history = [json.loads(message) for message in self.client.lrange(
+            f"changes:{user_id}:history", 0, -1)]
+        if not history:
+            return [] if last_id == 0 else None
+        if last_id > history[-1]["id"]:
+            # The ids were reset, e.g. by restarting the local broker
+            return None
+        missed = [change for change in history if change["id"] > last_id]
+        if missed and missed[0]["id"] != last_id + 1:
+            return None
+        return missed
+
+    def listen(self, user_id, last_id=None, heartbeat=CHANGE_FEED_HEARTBEAT):
+        """
+        Yield a user's changes as they are published.
+
+        Missed changes since `last_id` are yielded first. A `reload` change
+        is yielded instead when they can no longer be replayed. None is
+        yielded every `heartbeat` seconds without changes, so callers can
+        keep the connection alive.
+
+        Args:
+            user_id (int): The user to listen for.
+            last_id (int | None): The last change id the client has seen.
+            heartbeat (float): Seconds between idle yields.
+        """
+        subscription = self.client.pubsub(ignore_subscribe_messages=True)
+        # Subscribe before replaying so nothing published in between is lost
+        subscription.subscribe(f"changes:{user_id}")
+        try:
+            if last_id is not None:
+                missed = self.replay(user_id, last_id)
+                if missed is None:
+                    last_id = None
+                    yield {"type": "all", "op": "reload", "data": None}
+                for change in missed or ():
+                    last_id = change["id"]
+                    yield change
+            while True:
+                message = subscription.get_message(timeout=heartbeat)
+                if message is None or message.get("type") != "message":
+                    yield None
+                    continue
+                change = json.loads(message["data"])
+                if last_id is not None and change["id"] <= last_id:
+                    continue
+                last_id = change["id"]
+                yield change
+        finally:
+            subscription.close()
+
+
+def create_broker(name):
+    """
+    Create a change broker by name.
+
+    Args:
+        name (str): One of `local` or `redis`.
+
+    Returns:
+        Broker: The change broker.
+
+    Raises:
+        ValueError: If the backend name is not recognised.
+    """
+    if name == "local":
+        return Broker(LocalPubSub())
+    if name == "redis":
+        import redis
+
+        return Broker(redis.Redis.from_url(os.environ.get("CHANGE_FEED_URL")))
+    raise ValueError(f"Unknown change feed backend: {name}")
+
+
+broker = create_broker(CHANGE_FEED_BACKEND)
+
+
+def publish(user_id, change_type, op, data=None):
+    """
+    Publish a change to a user's data.
+
+    Called after the write is committed, so failures are logged rather
+    than raised: clients missing a change is better than failing a write
+    that already happened.
+
+    Args:
+        user_id (int): The user whose data changed.
+        change_type (str): `todos`, `internships` or `calendar`.
+        op (str): `created`, `updated`, `deleted` or `reload`.
+        data (dict | Callable | None): The changed item, or a function
+            returning it; just its id for deletes.
+
+    Returns:
+        dict | None: The published change, or None if publishing failed.
+    """
+    try:
+        if callable(data):
+            data = data()
+        return broker.publish(user_id, {"type": change_type, "op": op,
+                                        "data": data})
+    except Exception:
+        logger.exception("Failed to publish %s change for user %s",
+                         change_type, user_id)
+        return None
@@ -0,0 +1,204 @@
+"""
+dataVersions.py
+
+This module adds conditional GET support to the JSON read endpoints.
+
+Every user has a version number per kind of data (`todos`, `internships`,
+`calendar`) in the `data_version` table. Writes bump the version of what
+they touched, and read endpoints build their ETag from the versions they
+depend on. A request whose `If-None-Match` matches is answered with 304
+from that single primary-key read, without running the endpoint's query
+or serializing anything.
+
+Versions live in the database rather than in a process-local store so a
+write handled by one worker is seen by every other worker's ETags. Write
+endpoints bump them within the transaction that commits the write, so no
+reader can see the new data under the old version.
+
+Models are imported lazily because `app.py` imports the calendar blueprint
+before the models are defined.
+"""
+
+import functools
+import time
+from datetime import date, datetime, timezone
+from flask import g, has_request_context, make_response, request, session
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src import calendarSync, queryBudget
+
+
+def _models():
+    from src.app import db, DataVersion
+
+    return db, DataVersion
+
+
+def _current_user_id():
+    # The request's user as routes resolve it; None when nobody is logged in
+    from src.app import current_user_id
+
+    if "user_id" not in session and "id_google" not in session:
+        return None
+    return current_user_id()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def get_versions(user_id, scopes):
+    """
+    Read a user's current versions.
+
+    Args:
+        user_id (int): The user the data belongs to.
+        scopes (Iterable[str]): The kinds of data to read versions for.
+
+    Returns:
+        dict: Version per scope; scopes never written are at version 0.
+    """
+    db, DataVersion = _models()
+    rows = db.session.query(DataVersion.scope, DataVersion.version).filter(
+        DataVersion.user_id == user_id, DataVersion.scope.in_(scopes))
+    versions = dict.fromkeys(scopes, 0)
+    versions.update(dict(rows))
+    return versions
+
+
+def bump_version(user_id, scope):
+    """
+    Increment a user's version for one kind of data.
+
+    The change joins the caller's transaction, so bumping before the
+    caller's commit makes the write and the new version atomic.
+
+    Args:
+        user_id (int): The user the data belongs to.
+        scope (str): The kind of data that changed.
+    """
+    db, DataVersion = _models()
+    values = {"version": DataVersion.version + 1, "updated_at": _utcnow()}
+    statement = update(DataVersion).where(
+        DataVersion.user_id == user_id, DataVersion.scope == scope)
+    if db.session.execute(statement.values(**values)).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(DataVersion(user_id=user_id, scope=scope,
+                                       version=1, updated_at=_utcnow()))
+    except IntegrityError:
+        # Another request created the row first
+        db.session.execute(statement.values(**values))
+
+
+def make_etag(user_id, scopes, daily=False):
+    """
+    Build the ETag for a response depending on some of a user's data.
+
+    Args:
+        user_id (int): The user the response is for.
+        scopes (Iterable[str]): The kinds of data the response contains.
+        daily (bool): Whether the response also depends on today's date.
+
+    Returns:
+        str: The entity tag, without quotes.
+    """
+    versions = get_versions(user_id, scopes)
+    parts = [f"{scope}.{versions[scope]}" for scope in scopes]
+    if "calendar" in scopes:
+        # Google-side changes only reach the mirror when it is re-synced,
+        # which happens at most once per sync interval.
+        parts.append(str(int(time.time() // calendarSync.SYNC_INTERVAL)))
+    if daily:
+        parts.append(date.today().isoformat())
+    return "-".join(parts)
+
+
+def conditional(*scopes, daily=False):
+    """
+    Decorate a JSON read endpoint with ETag-based conditional GET.
+
+    Args:
+        scopes (str): The kinds of data the endpoint returns.
+        daily (bool): Whether the response also depends on today's date.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = _current_user_id()
+            if user_id is None:
+                return view(*args, **kwargs)
+
+            etag = make_etag(user_id, scopes, daily)
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def bumps_version(scope):
+    """
+    Decorate a write endpoint so the user's version for `scope` is bumped
+    in every transaction the endpoint commits.
+
+    The bump joins the endpoint's own transaction just before its commit,
+    so the write and the new version become visible together, and a
+    request that commits nothing, such as one rejected with a 4xx, bumps
+    nothing. An endpoint committing in batches bumps once per batch.
+
+    Args:
+        scope (str): The kind of data the endpoint writes.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = _current_user_id()
+            if user_id is None:
+                return view(*args, **kwargs)
+
+            pending = g.setdefault("version_bumps", [])
+            pending.append((user_id, scope))
+            try:
+                return view(*args, **kwargs)
+            finally:
+                pending.remove((user_id, scope))
+
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_before_commit(committing):
+    # Bump the versions of the running `bumps_version` endpoints as part
+    # of the request session's transaction; savepoints are left alone
+    db, _ = _models()
+    if (not has_request_context() or committing is not db.session()
+            or committing.in_nested_transaction()):
+        return
+    pending = g.get("version_bumps")
+    if not pending:
+        return
+    if g.get("versions_bumped"):
+        # The endpoint's budget covers one bump; later commits pay here
+        queryBudget.allow(len(pending))
+    g.versions_bumped = True
+    for user_id, scope in pending:
+        bump_version(user_id, scope)
@@ -0,0 +1,205 @@
+"""
+dbPool.py
+
+This module configures the SQLAlchemy engine's connection pool from the
+environment and records how the pool is used.
+
+Settings (read after `load_dotenv`, so they can live in `.env`):
+
+- `DB_POOL_SIZE`: Connections kept open (default 5).
+- `DB_MAX_OVERFLOW`: Extra connections opened under load (default 10).
+- `DB_POOL_TIMEOUT`: Seconds a request waits for a connection before
+  failing (default 10), so an exhausted pool fails fast instead of
+  stalling workers.
+- `DB_POOL_RECYCLE`: Seconds after which a connection is replaced
+  (default 1800), below typical server and proxy idle timeouts.
+- `DB_POOL_PRE_PING`: Test connections on checkout (default true), so
+  connections broken by a database failover are replaced transparently
+  instead of failing requests.
+- `DB_STATEMENT_TIMEOUT_MS`: Server-side statement timeout on PostgreSQL
+  (default 30000; 0 disables it).
+
+In-memory SQLite databases use a single shared connection, so the pool
+settings only apply to other databases.
+"""
+
+import logging
+import os
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+class PoolMetrics:
+    """
+    Thread-safe counters describing connection pool usage.
+
+    A checkout "waits" when no idle connection is available and no more
+    overflow connections may be opened, so it has to wait for another
+    request to return one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Zero every counter.
+        """
+        with self._lock:
+            self.checkouts = 0
+            self.waits = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.timeouts = 0
+            self.peak_overflow = 0
+
+    def record_checkout(self, waited, elapsed, overflow):
+        """
+        Record a successful checkout.
+
+        Args:
+            waited (bool): Whether the pool was exhausted.
+            elapsed (float): Seconds the checkout took.
+            overflow (int): Overflow connections open after the checkout.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.peak_overflow = max(self.peak_overflow, overflow)
+            if waited:
+                self.waits += 1
+                self.wait_seconds += elapsed
+                self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+    def record_timeout(self, elapsed):
+        """
+        Record a checkout that gave up after `elapsed` seconds.
+        """
+        with self._lock:
+            self.timeouts += 1
+            self.waits += 1
+            self.wait_seconds += elapsed
+            self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+
+    def snapshot(self):
+        """
+        Return the counters as a dictionary.
+        """
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "max_wait_seconds": round(self.max_wait_seconds, 6),
+                "timeouts": self.timeouts,
+                "peak_overflow": self.peak_overflow,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    `QueuePool` that records checkouts, waits, overflow and timeouts in
+    `metrics`.
+    """
+
+    def __init__(self, *args, metrics=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics or PoolMetrics()
+
+    def recreate(self):
+        # The pool is recreated on dispose(); keep counting in one place
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        exhausted = (self.checkedin() == 0 and self._max_overflow > -1
+                     and self.overflow() >= self._max_overflow)
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            elapsed = time.perf_counter() - start
+            self.metrics.record_timeout(elapsed)
+            logger.error("Timed out after %.2fs waiting for a database "
+                         "connection: %s", elapsed, self.status())
+            raise
+        self.metrics.record_checkout(exhausted, time.perf_counter() - start,
+                                     max(self.overflow(), 0))
+        return connection
+
+
+def _env(environ, name, default, convert=int):
+    value = environ.get(name)
+    if value is None or value == "":
+        return default
+    if convert is bool:
+        return value.strip().lower() in TRUE_VALUES
+    return convert(value)
+
+
+def engine_options(database_url, environ=os.environ):
+    """
+    Build `SQLALCHEMY_ENGINE_OPTIONS` from the environment.
+
+    Args:
+        database_url (str | None): The database the engine connects to.
+        environ (Mapping): Where settings are read from.
+
+    Returns:
+        dict: Keyword arguments for `create_engine`.
+    """
+    if not database_url:
+        return {}
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "",
+                                                               ":memory:"):
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": _env(environ, "DB_POOL_SIZE", 5),
+        "max_overflow": _env(environ, "DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env(environ, "DB_POOL_TIMEOUT", 10, float),
+        "pool_recycle": _env(environ, "DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _env(environ, "DB_POOL_PRE_PING", True, bool),
+    }
+    statement_timeout = _env(environ, "DB_STATEMENT_TIMEOUT_MS", 30000)
+    if url.get_backend_name() == "postgresql" and statement_timeout:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+def pool_stats(engine):
+    """
+    Describe an engine's pool: its current state and, for an
+    `InstrumentedQueuePool`, its usage counters.
+
+    Args:
+        engine (Engine): The engine to inspect.
+
+    Returns:
+        dict: Pool statistics.
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,159 @@
+"""
+dbRouting.py
+
+This module sends the queries of read-only endpoints to read replicas.
+
+Replicas are Flask-SQLAlchemy binds named `replica_0`, `replica_1`, ...
+built from `DATABASE_REPLICA_URLS`. `RoutingSession` keeps every write on
+the primary and only routes a `SELECT` to a replica when:
+
+- The request's view is marked with `@reads_from_replica`, so endpoints
+  that write (including GETs that sync the calendar mirror) never read
+  rows they are about to update from a lagging replica.
+- The session has not written anything yet; after its first write it
+  stays on the primary so it reads its own uncommitted changes.
+- The user has not written recently. A successful mutating request
+  stores a deadline in the session cookie, and until it passes the
+  user's reads go to the primary, so they see their own writes despite
+  replication lag.
+
+Settings (read after `load_dotenv`, so they can live in `.env`):
+
+- `DATABASE_REPLICA_URLS`: Comma-separated replica URLs (default none,
+  which sends everything to the primary).
+- `DB_READ_YOUR_WRITES_SECONDS`: How long a user's reads stay on the
+  primary after a write (default 5); keep it above the replicas' lag.
+"""
+
+import os
+import random
+import time
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from src import dbPool
+
+REPLICA_PREFIX = "replica_"
+READ_YOUR_WRITES_SECONDS = float(
+    os.environ.get("DB_READ_YOUR_WRITES_SECONDS", 5))
+PRIMARY_UNTIL_KEY = "db_primary_until"
+SAFE_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+def replica_binds(environ=os.environ):
+    """
+    Build the replica entries of `SQLALCHEMY_BINDS` from the environment.
+
+    Args:
+        environ (Mapping): Where settings are read from.
+
+    Returns:
+        dict: Engine options per replica bind key.
+    """
+    urls = [url.strip() for url in
+            environ.get("DATABASE_REPLICA_URLS", "").split(",")
+            if url.strip()]
+    return {
+        f"{REPLICA_PREFIX}{index}": dict(dbPool.engine_options(url, environ),
+                                         url=url)
+        for index, url in enumerate(urls)
+    }
+
+
+def replica_keys(engines):
+    """
+    Return the bind keys of the configured replicas.
+    """
+    return sorted(key for key in engines
+                  if key and key.startswith(REPLICA_PREFIX))
+
+
+def reads_from_replica(view):
+    """
+    Decorator marking a view whose queries may be served by a replica.
+
+    Only mark views that never write, since a replica can lag behind
+    the primary.
+
+    Args:
+        view (Callable): The view function.
+
+    Returns:
+        Callable: The same view, marked.
+    """
+    view.reads_from_replica = True
+    return view
+
+
+def wrote_recently():
+    """
+    Return whether the current user is inside their read-your-writes
+    window.
+    """
+    return session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+
+def replica_allowed():
+    """
+    Return whether the current request may read from a replica.
+    """
+    if not has_request_context() or request.method not in SAFE_METHODS:
+        return False
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, "reads_from_replica", False):
+        return False
+    return not wrote_recently()
+
+
+class RoutingSession(Session):
+    """
+    Session that serves eligible reads from a replica and everything
+    else from the bind Flask-SQLAlchemy would normally choose.
+
+    One replica is picked at random per session, so a request sees a
+    single consistent snapshot.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._pinned_to_primary = False
+        self._replica = None
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind,
+                                   **kwargs)
+        engines = self._db.engines
+        if (self._pinned_to_primary or bind is not None
+                or primary is not engines.get(None)):
+            return primary
+        if not isinstance(clause, Select) or self._flushing or \
+                self.new or self.dirty or self.deleted:
+            self._pinned_to_primary = True
+            return primary
+
+        if self._replica is None:
+            keys = replica_keys(engines)
+            if not keys or not replica_allowed():
+                self._pinned_to_primary = True
+                return primary
+            self._replica = random.choice(keys)
+        return engines[self._replica]
+
+
+def init_app(app, db):
+    """
+    Start a user's read-your-writes window after each successful
+    mutating request, when replicas are configured.
+
+    Args:
+        app (Flask): The application.
+        db (SQLAlchemy): Its database extension.
+    """
+
+    @app.after_request
+    def remember_write(response):
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and replica_keys(db.engines)):
+            session[PRIMARY_UNTIL_KEY] = time.time() + \
+                READ_YOUR_WRITES_SECONDS
+        return response
@@ -0,0 +1,370 @@
+"""
+instrumentation.py
+
+This module measures where each request spends its time.
+
+While a request is handled, its SQL statements (through SQLAlchemy engine
+events, on every bind), its Google Calendar API calls (around
+`execute()`) and the time spent building Calendar clients are counted
+and timed. Dashboard sections loaded on worker threads share their
+request's counters.
+
+Each response then gets:
+
+- A `Server-Timing` header, so the breakdown shows in the browser's
+  network panel.
+- One JSON log line on the `src.instrumentation` logger at INFO level.
+- Observations in per-route Prometheus histograms, served together with
+  the connection pools' state by `/metrics`.
+
+Streamed responses are measured up to the point their body starts.
+Metrics are kept per process, so every worker has to be scraped.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src import dbPool
+
+logger = logging.getLogger(__name__)
+
+ENVIRON_KEY = "firestack.request_stats"
+KINDS = {"db": "queries", "google": "calls", "build": "clients"}
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                    10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Values from `dbPool.pool_stats` that only ever grow
+POOL_COUNTERS = {"checkouts", "waits", "wait_seconds", "timeouts"}
+
+
+class RequestStats:
+    """
+    Thread-safe counts and timings of one request's work, by kind: `db`
+    statements, `google` API calls and Calendar client `build`s.
+
+    How often each SQL statement was executed is kept in `statements`,
+    so repeated statements can be spotted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.seconds = dict.fromkeys(KINDS, 0.0)
+        self.google_methods = {}
+        self.statements = StatementCounter()
+
+    def record(self, kind, elapsed, method=None, statement=None):
+        """
+        Record one unit of work.
+
+        Args:
+            kind (str): `db`, `google` or `build`.
+            elapsed (float): Seconds it took.
+            method (str | None): For Google calls, the API method id.
+            statement (str | None): For SQL, the statement executed.
+        """
+        with self._lock:
+            self.counts[kind] += 1
+            self.seconds[kind] += elapsed
+            if statement is not None:
+                self.statements[statement] += 1
+            if method is not None:
+                calls, seconds = self.google_methods.get(method, (0, 0.0))
+                self.google_methods[method] = (calls + 1, seconds + elapsed)
+
+    def server_timing(self, duration):
+        """
+        Format the breakdown as a `Server-Timing` header value.
+
+        Args:
+            duration (float): Seconds the whole request took.
+
+        Returns:
+            str: The header value.
+        """
+        with self._lock:
+            metrics = [
+                f'{kind};dur={self.seconds[kind] * 1000:.1f};'
+                f'desc="{self.counts[kind]} {unit}"'
+                for kind, unit in KINDS.items() if self.counts[kind]
+            ]
+        metrics.append(f"total;dur={duration * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def log_record(self):
+        """
+        Return the counters as a dictionary for the request log.
+        """
+        with self._lock:
+            record = {}
+            for kind in KINDS:
+                record[f"{kind}_count"] = self.counts[kind]
+                record[f"{kind}_ms"] = round(self.seconds[kind] * 1000, 2)
+            record["google_methods"] = {
+                method: {"calls": calls, "ms": round(seconds * 1000, 2)}
+                for method, (calls, seconds) in self.google_methods.items()
+            }
+        return record
+
+
+def current_stats():
+    """
+    Return the current request's stats, or None outside a request.
+    """
+    if not has_request_context():
+        return None
+    return request.environ.get(ENVIRON_KEY)
+
+
+@contextmanager
+def timed(kind, method=None):
+    """
+    Time the enclosed block as work of `kind` for the current request.
+
+    Args:
+        kind (str): `google` for a Google API call, `build` for building
+            a Calendar client.
+        method (str | None): For Google calls, the API method id.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            stats.record(kind, time.perf_counter() - start, method)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if context is not None:
+        context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = getattr(context, "_instrumentation_start", None)
+    stats = current_stats()
+    if start is not None and stats is not None:
+        stats.record("db", time.perf_counter() - start,
+                     statement=statement)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"') \
+        .replace("\n", "\\n")
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + "}"
+
+
+class Counter:
+    """
+    A Prometheus counter with labels.
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + 1
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def collect(self):
+        """
+        Return the counter in Prometheus' text format.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}"
+                             f"{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    A Prometheus histogram with labels.
+    """
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        # labels -> [count per bucket, observations, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            entry = self._values.setdefault(
+                labels, [[0] * len(self.buckets), 0, 0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def count(self, *labels):
+        """
+        Return how many values were observed for `labels`.
+        """
+        with self._lock:
+            return self._values.get(labels, [None, 0])[1]
+
+    def collect(self):
+        """
+        Return the histogram in Prometheus' text format.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (buckets, count, total) in sorted(
+                    self._values.items()):
+                names = self.labelnames
+                for bound, bucket in zip(self.buckets + ("+Inf",),
+                                         buckets + [count]):
+                    lines.append(f"{self.name}_bucket"
+                                 f"{_labels(names, labels, le=bound)}"
+                                 f" {bucket}")
+                lines.append(f"{self.name}_sum"
+                             f"{_labels(names, labels)} {total}")
+                lines.append(f"{self.name}_count"
+                             f"{_labels(names, labels)} {count}")
+        return lines
+
+
+ROUTE_LABELS = ("route", "method")
+REQUESTS = Counter("firestack_requests_total",
+                   "Requests handled, by route, method and status.",
+                   ROUTE_LABELS + ("status",))
+REQUEST_SECONDS = Histogram("firestack_request_duration_seconds",
+                            "Time spent handling requests.",
+                            DURATION_BUCKETS, ROUTE_LABELS)
+DB_QUERIES = Histogram("firestack_request_db_queries",
+                       "SQL statements executed per request.",
+                       QUERY_BUCKETS, ROUTE_LABELS)
+DB_SECONDS = Histogram("firestack_request_db_seconds",
+                       "Time spent in SQL statements per request.",
+                       DURATION_BUCKETS, ROUTE_LABELS)
+GOOGLE_SECONDS = Histogram("firestack_request_google_seconds",
+                           "Time spent in Google API calls per request.",
+                           DURATION_BUCKETS, ROUTE_LABELS)
+METRICS = [REQUESTS, REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, GOOGLE_SECONDS]
+
+
+def pool_metrics(engines):
+    """
+    Describe each engine's connection pool in Prometheus' text format.
+
+    Args:
+        engines (Mapping): Engines by bind key; the default bind's key is
+            None.
+
+    Returns:
+        list: Exposition lines.
+    """
+    samples = {}
+    for key, engine in sorted(engines.items(),
+                              key=lambda item: item[0] or ""):
+        bind = key or "primary"
+        for name, value in dbPool.pool_stats(engine).items():
+            if isinstance(value, (int, float)) and \
+                    not isinstance(value, bool):
+                samples.setdefault(name, []).append((bind, value))
+
+    lines = []
+    for name, values in samples.items():
+        metric = f"firestack_db_pool_{name}"
+        if name in POOL_COUNTERS:
+            metric += "_total"
+        lines.append(f"# TYPE {metric} "
+                     f"{'counter' if name in POOL_COUNTERS else 'gauge'}")
+        lines.extend(f"{metric}{_labels(('bind',), (bind,))} {value}"
+                     for bind, value in values)
+    return lines
+
+
+def render_metrics(engines):
+    """
+    Render every metric in Prometheus' text format.
+
+    Args:
+        engines (Mapping): Engines whose pools are described.
+
+    Returns:
+        str: The exposition document.
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.collect())
+    lines.extend(pool_metrics(engines))
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    """
+    Instrument every engine and every request of `app`.
+
+    Args:
+        app (Flask): The application.
+    """
+    if not event.contains(Engine, "before_cursor_execute",
+                          _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_request_stats():
+        request.environ[ENVIRON_KEY] = RequestStats()
+
+    @app.after_request
+    def report_request_stats(response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats.start
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        labels = (route, request.method)
+
+        response.headers["Server-Timing"] = stats.server_timing(duration)
+        REQUESTS.inc(*labels, response.status_code)
+        REQUEST_SECONDS.observe(duration, *labels)
+        DB_QUERIES.observe(stats.counts["db"], *labels)
+        DB_SECONDS.observe(stats.seconds["db"], *labels)
+        GOOGLE_SECONDS.observe(stats.seconds["google"], *labels)
+
+        if logger.isEnabledFor(logging.INFO):
+            record = {
+                "method": request.method,
+                "path": request.path,
+                "route": route,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 2),
+            }
+            record.update(stats.log_record())
+            logger.info(json.dumps(record))
+        return response
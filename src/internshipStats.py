@@ -0,0 +1,299 @@
+"""
+internshipStats.py
+
+This module computes the application-pipeline statistics served by
+`/api/internships/stats`.
+
+Counts per application status, and how many of those applications got an
+offer, are kept per user in the `internship_status_count` table. Every
+write to `internship` adjusts them in the same transaction, so reading
+them costs one query however many internships a user has. Applications
+per week and upcoming deadlines are aggregated from `internship` through
+its per-user indexes.
+
+Users whose internships predate the table have no counts yet. Their
+statistics are counted from `internship` on read, and their first write
+recounts all their statuses, so their stats are complete without running
+`flask rebuild-internship-stats`, which recounts everyone at once.
+
+Models are imported lazily because `app.py` imports this module before
+the models are defined.
+"""
+
+from collections import Counter
+from datetime import timedelta
+from sqlalchemy import case, func, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from src import queryBudget
+
+# The status the tracker form submits for an offer
+OFFER_STATUS = "Offered"
+
+# Most SQL statements adjusting the counts of one status takes: when its
+# row is missing, a check for the user's other rows, a savepoint, a
+# recount (deleting, counting and inserting for a user without any) and
+# its release follow the update
+STATUS_QUERIES = 7
+
+
+def _models():
+    from src.app import db, Internship, InternshipStatusCount
+
+    return db, Internship, InternshipStatusCount
+
+
+def _is_offer(internship):
+    # Boolean expression for an internship row that counts as an offer
+    return (internship.offer_received.is_(True)
+            | (internship.application_status == OFFER_STATUS))
+
+
+def state(status, offer_received):
+    """
+    Describe what an internship contributes to its owner's counts.
+
+    Args:
+        status (str): Its application status.
+        offer_received (bool | None): Its offer flag.
+
+    Returns:
+        tuple: `(status, offered)`.
+    """
+    return status, bool(offer_received) or status == OFFER_STATUS
+
+
+def record(user_id, before=None, after=None):
+    """
+    Adjust a user's counts for one internship written in the current
+    transaction.
+
+    Args:
+        user_id (int): The owner of the internship.
+        before (tuple | None): Its `state()` before the write; None when
+            it was created.
+        after (tuple | None): Its `state()` after the write; None when it
+            was deleted.
+    """
+    changes = Counter()
+    if before is not None:
+        changes[before] -= 1
+    if after is not None:
+        changes[after] += 1
+    apply_changes(user_id, changes)
+
+
+def record_inserted(user_id, rows):
+    """
+    Adjust a user's counts for internships bulk inserted in the current
+    transaction.
+
+    Args:
+        user_id (int): The owner of the internships.
+        rows (Iterable[dict]): Their column values.
+    """
+    changes = Counter(
+        state(row["application_status"], row.get("offer_received"))
+        for row in rows)
+    statuses = {status for status, _ in changes}
+    queryBudget.allow(STATUS_QUERIES * len(statuses))
+    apply_changes(user_id, changes)
+
+
+def apply_changes(user_id, changes):
+    """
+    Apply changes to a user's counts, joining the caller's transaction.
+
+    Args:
+        user_id (int): The user whose counts change.
+        changes (Counter): Change in internships per `state()`.
+    """
+    db, _, InternshipStatusCount = _models()
+    by_status = {}
+    for (status, offered), change in changes.items():
+        applications, offers = by_status.get(status, (0, 0))
+        by_status[status] = (applications + change,
+                             offers + (change if offered else 0))
+
+    db.session.flush()
+    for status, (applications, offers) in by_status.items():
+        if not applications and not offers:
+            continue
+        statement = update(InternshipStatusCount).where(
+            InternshipStatusCount.user_id == user_id,
+            InternshipStatusCount.application_status == status,
+        ).values(
+            applications=InternshipStatusCount.applications + applications,
+            offers=InternshipStatusCount.offers + offers,
+        )
+        if db.session.execute(statement).rowcount:
+            continue
+        backfill = not _has_counts(user_id)
+        try:
+            with db.session.begin_nested():
+                if backfill:
+                    # The user's internships predate the counts: count
+                    # all of them, this transaction's writes included
+                    rebuild(user_id)
+                else:
+                    db.session.add(count_status(user_id, status))
+        except IntegrityError:
+            # Another request created the row first
+            db.session.execute(statement)
+            continue
+        if backfill:
+            return
+
+
+def _has_counts(user_id):
+    # Whether any of the user's statuses has been counted
+    db, _, InternshipStatusCount = _models()
+    return db.session.query(
+        db.session.query(InternshipStatusCount)
+        .filter_by(user_id=user_id).exists()).scalar()
+
+
+def count_status(user_id, status):
+    """
+    Count a user's internships with one status from `internship`.
+
+    Returns:
+        InternshipStatusCount: An unsaved row holding the counts.
+    """
+    db, Internship, InternshipStatusCount = _models()
+    applications, offers = db.session.query(
+        func.count(),
+        func.coalesce(func.sum(case((_is_offer(Internship), 1), else_=0)),
+                      0),
+    ).filter(Internship.user_id == user_id,
+             Internship.application_status == status).one()
+    return InternshipStatusCount(user_id=user_id, application_status=status,
+                                 applications=applications, offers=offers)
+
+
+def rebuild(user_id=None):
+    """
+    Recount the stored counts from `internship` with one `GROUP BY`.
+
+    Args:
+        user_id (int | None): The user to recount; everyone when None.
+
+    Returns:
+        int: The number of status rows written.
+    """
+    db, Internship, InternshipStatusCount = _models()
+    query = _count_query(user_id)
+    existing = db.session.query(InternshipStatusCount)
+    if user_id is not None:
+        existing = existing.filter_by(user_id=user_id)
+
+    existing.delete(synchronize_session=False)
+    rows = [
+        {"user_id": owner, "application_status": status,
+         "applications": applications, "offers": offers}
+        for owner, status, applications, offers in query
+    ]
+    if rows:
+        db.session.execute(db.insert(InternshipStatusCount), rows)
+    return len(rows)
+
+
+def _count_query(user_id=None):
+    # Counts per user and status from `internship`, with one GROUP BY
+    db, Internship, _ = _models()
+    query = db.session.query(
+        Internship.user_id,
+        Internship.application_status,
+        func.count(),
+        func.sum(case((_is_offer(Internship), 1), else_=0)),
+    ).group_by(Internship.user_id, Internship.application_status)
+    if user_id is not None:
+        query = query.filter(Internship.user_id == user_id)
+    return query
+
+
+def week_start(day):
+    """
+    Return the Monday of the week `day` falls in.
+    """
+    return day - timedelta(days=day.weekday())
+
+
+def pipeline_stats(user_id, today, weeks=12, days=14, limit=10):
+    """
+    Compute a user's application-pipeline statistics.
+
+    Args:
+        user_id (int): The owner of the internships.
+        today (date): The day the statistics are computed for.
+        weeks (int): How many weeks of applications to count, ending with
+            the current one.
+        days (int): How many days ahead deadlines are listed.
+        limit (int): Maximum number of deadlines listed.
+
+    Returns:
+        dict: `total`, `byStatus`, `offers`, `offerRate`,
+        `applicationsPerWeek` and `upcomingDeadlines`.
+    """
+    db, Internship, InternshipStatusCount = _models()
+
+    counts = db.session.query(
+        InternshipStatusCount.application_status,
+        InternshipStatusCount.applications,
+        InternshipStatusCount.offers,
+    ).filter(InternshipStatusCount.user_id == user_id).all()
+    if not counts:
+        # Nothing counted yet: count from `internship` until the first write
+        counts = [row[1:] for row in _count_query(user_id)]
+
+    by_status = {}
+    offers = 0
+    for status, applications, offered in counts:
+        if applications:
+            by_status[status] = applications
+            offers += offered
+    total = sum(by_status.values())
+
+    first_week = week_start(today) - timedelta(weeks=weeks - 1)
+    per_week = dict.fromkeys(
+        (first_week + timedelta(weeks=week) for week in range(weeks)), 0)
+    for applied, applications in db.session.query(
+            Internship.date_applied, func.count(),
+    ).filter(Internship.user_id == user_id,
+             Internship.date_applied >= first_week,
+             Internship.date_applied <= today,
+             ).group_by(Internship.date_applied):
+        per_week[week_start(applied)] += applications
+
+    horizon = today + timedelta(days=days)
+    deadlines = union_all(*(
+        select(Internship.internship_id, Internship.company_name,
+               Internship.position_title, literal(kind).label("kind"),
+               column.label("due"))
+        .where(Internship.user_id == user_id, column >= today,
+               column <= horizon)
+        for kind, column in (("followUp", Internship.follow_up_date),
+                             ("offerDeadline", Internship.offer_deadline))
+    )).subquery()
+    upcoming = db.session.execute(
+        select(deadlines)
+        .order_by(deadlines.c.due, deadlines.c.internship_id)
+        .limit(limit))
+
+    return {
+        "total": total,
+        "byStatus": by_status,
+        "offers": offers,
+        "offerRate": round(offers / total, 4) if total else None,
+        "applicationsPerWeek": [
+            {"weekStart": week.isoformat(), "count": count}
+            for week, count in per_week.items()
+        ],
+        "upcomingDeadlines": [
+            {"internshipId": row.internship_id,
+             "companyName": row.company_name,
+             "positionTitle": row.position_title,
+             "kind": row.kind,
+             "date": row.due.isoformat()}
+            for row in upcoming
+        ],
+    }
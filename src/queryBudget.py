@@ -0,0 +1,190 @@
+"""
+queryBudget.py
+
+This module declares how many SQL statements each route may execute and
+checks every request against its route's budget.
+
+A budget is the most statements the route needs on any of its paths, and
+it must not grow with the number of rows a user has, so a change that
+adds a query per row (an N+1 pattern, such as serializing a lazy
+relationship in a loop) goes over it. Work that is legitimately batched,
+like bulk imports, raises the current request's budget with `allow()`.
+
+Statements are counted by `instrumentation`. After each request:
+
+- Going over the budget logs a warning, or raises `QueryBudgetExceeded`
+  when `QUERY_BUDGET_ENFORCE` is set in the app's config, as the budget
+  tests do.
+- In debug mode, statements executed more than once are logged.
+
+`assert_max_queries` checks code outside a request the same way.
+
+Streamed response bodies run after the check, so their queries are not
+counted.
+"""
+
+import functools
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src import instrumentation
+
+logger = logging.getLogger(__name__)
+
+ALLOWANCE_KEY = "firestack.query_allowance"
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when code executes more SQL statements than it is allowed.
+    """
+
+    def __init__(self, where, limit, statements):
+        self.where = where
+        self.limit = limit
+        self.statements = statements
+        executed = sum(statements.values())
+        lines = [f"{where} executed {executed} SQL statements, "
+                 f"budget is {limit}:"]
+        lines.extend(f"  {count}x {statement}"
+                     for statement, count in statements.most_common())
+        super().__init__("\n".join(lines))
+
+
+def query_budget(limit):
+    """
+    Decorator declaring the most SQL statements a view may execute.
+
+    Args:
+        limit (int): The statement budget of one request.
+
+    Returns:
+        Callable: A decorator marking the view with its budget.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+def allow(statements):
+    """
+    Raise the current request's budget, for work that is done in batches.
+
+    Args:
+        statements (int): Additional statements allowed.
+    """
+    if has_request_context():
+        request.environ[ALLOWANCE_KEY] = \
+            request.environ.get(ALLOWANCE_KEY, 0) + statements
+
+
+def request_budget():
+    """
+    Return the current request's statement budget, or None if its view
+    declares none.
+    """
+    view = current_app.view_functions.get(request.endpoint)
+    limit = getattr(view, "query_budget", None)
+    if limit is None:
+        return None
+    return limit + request.environ.get(ALLOWANCE_KEY, 0)
+
+
+def duplicates(statements):
+    """
+    Return the statements executed more than once, with their counts.
+    """
+    return {statement: count for statement, count in statements.items()
+            if count > 1}
+
+
+@contextmanager
+def count_queries():
+    """
+    Collect the SQL statements executed inside the block, on any engine
+    and any thread.
+
+    Yields:
+        collections.Counter: Executions per statement, filled as they run.
+    """
+    statements = Counter()
+
+    def record(conn, cursor, statement, *args):
+        statements[statement] += 1
+
+    event.listen(Engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "after_cursor_execute", record)
+
+
+@contextmanager
+def assert_max_queries(limit, where="block"):
+    """
+    Fail if the block executes more than `limit` SQL statements.
+
+    Args:
+        limit (int): The statement budget.
+        where (str): How the block is named in the failure message.
+
+    Raises:
+        QueryBudgetExceeded: If the block goes over `limit`.
+    """
+    with count_queries() as statements:
+        yield statements
+    if sum(statements.values()) > limit:
+        raise QueryBudgetExceeded(where, limit, statements)
+
+
+def within_budget(limit):
+    """
+    Decorator form of `assert_max_queries`, for test methods and helpers.
+
+    Args:
+        limit (int): The statement budget of each call.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with assert_max_queries(limit, function.__qualname__):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def init_app(app):
+    """
+    Check every request of `app` against its route's budget.
+
+    Args:
+        app (Flask): The application.
+    """
+
+    @app.after_request
+    def check_query_budget(response):
+        stats = instrumentation.current_stats()
+        if stats is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else request.path
+        where = f"{request.method} {route}"
+
+        if app.debug:
+            for statement, count in duplicates(stats.statements).items():
+                logger.warning("%s executed the same statement %d times: %s",
+                               where, count, statement)
+
+        limit = request_budget()
+        if limit is not None and stats.counts["db"] > limit:
+            error = QueryBudgetExceeded(where, limit, stats.statements)
+            if app.config.get("QUERY_BUDGET_ENFORCE"):
+                raise error
+            logger.warning("%s", error)
+        return response
@@ -0,0 +1,204 @@
+"""
+search.py
+
+This module provides ranked full-text search over a user's internships and
+todos.
+
+Searched text lives in inverted indexes the database keeps up to date on
+every write, bulk imports and set-based batch operations included:
+
+- On PostgreSQL, `GIN` expression indexes over weighted `tsvector`s of the
+  searched columns, declared in `app.py`. Queries repeat the indexed
+  expression exactly so the planner uses them.
+- On SQLite, which is used locally and in tests, FTS5 tables whose content
+  is read from `internship` and `todo`, kept in sync by triggers. They are
+  created together with the other tables.
+
+A query is split into words, and every word must match as a prefix of an
+indexed (stemmed) word. Matches from both kinds are ranked together, best
+first.
+
+Models are imported lazily because `app.py` imports this module before
+the models are defined.
+
+Attributes:
+    SEARCH_CONFIG (str): PostgreSQL text search configuration.
+    INTERNSHIP_COLUMNS (tuple): Searched internship columns with their
+        weights.
+    TODO_COLUMNS (tuple): Searched todo columns with their weights.
+"""
+
+import re
+from sqlalchemy import DDL, column, event, func, literal, literal_column
+from sqlalchemy import select, table, text, union_all
+
+SEARCH_CONFIG = "english"
+MAX_TERMS = 10
+
+# Columns and PostgreSQL weights; company and title matter most
+INTERNSHIP_COLUMNS = (("company_name", "A"), ("position_title", "A"),
+                      ("location", "B"), ("notes", "C"))
+TODO_COLUMNS = (("task_text", "A"),)
+
+# Relative weight of each weight class, as `ts_rank` uses by default
+WEIGHT_VALUES = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+# FTS5 tables: searched table, its primary key and its columns
+FTS_TABLES = {
+    "internship_fts": ("internship", "internship_id", INTERNSHIP_COLUMNS),
+    "todo_fts": ("todo", "id", TODO_COLUMNS),
+}
+
+
+def _models():
+    from src.app import db, Internship, Todo
+
+    return db, Internship, Todo
+
+
+def terms(query):
+    """
+    Split a search query into lowercase words.
+
+    Args:
+        query (str): The query as typed.
+
+    Returns:
+        list: At most `MAX_TERMS` words.
+    """
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def document(model, columns):
+    """
+    Build the weighted `tsvector` of a model's searched columns.
+
+    The GIN indexes are declared on this exact expression.
+
+    Args:
+        model: The mapped class searched.
+        columns (tuple): `(column name, weight)` pairs.
+
+    Returns:
+        ColumnElement: The `tsvector` expression.
+    """
+    # Constants are written as text() so the index is inferred to belong
+    # to the model's table, and render as literals in DDL and queries
+    config = text(f"'{SEARCH_CONFIG}'")
+    vector = None
+    for name, weight in columns:
+        part = func.setweight(
+            func.to_tsvector(config, func.coalesce(getattr(model, name),
+                                                   text("''"))),
+            text(f"'{weight}'"))
+        vector = part if vector is None else vector.op("||")(part)
+    return vector
+
+
+def _postgresql_hits(kind, model, key, columns, user_id, words):
+    vector = document(model, columns)
+    query = func.to_tsquery(text(f"'{SEARCH_CONFIG}'"),
+                            " & ".join(f"{word}:*" for word in words))
+    return select(literal(kind).label("kind"), key.label("id"),
+                  func.ts_rank(vector, query).label("rank")) \
+        .where(model.user_id == user_id, vector.op("@@")(query))
+
+
+def _sqlite_hits(kind, model, key, fts, user_id, words):
+    _, _, columns = FTS_TABLES[fts]
+    weights = ", ".join(str(WEIGHT_VALUES[weight]) for _, weight in columns)
+    index = table(fts, column("rowid"))
+    # bm25() is lower for better matches
+    rank = literal_column(f"-bm25({fts}, {weights})")
+    return select(literal(kind).label("kind"), key.label("id"),
+                  rank.label("rank")) \
+        .select_from(index) \
+        .join(model.__table__, key == index.c.rowid) \
+        .where(model.user_id == user_id,
+               literal_column(fts).op("MATCH")(
+                   " ".join(f'"{word}"*' for word in words)))
+
+
+def search(user_id, query, kinds=("internship", "todo"), limit=20,
+           offset=0):
+    """
+    Find a user's internships and todos matching a query, best first.
+
+    Args:
+        user_id (int): The owner of the rows searched.
+        query (str): The query as typed.
+        kinds (Iterable[str]): `internship` and/or `todo`.
+        limit (int): Page size.
+        offset (int): Number of results to skip.
+
+    Returns:
+        tuple: A list of `(kind, id, rank)` rows and whether more results
+        follow.
+    """
+    db, Internship, Todo = _models()
+    words = terms(query)
+    if not words or not kinds:
+        return [], False
+
+    targets = {
+        "internship": (Internship, Internship.internship_id,
+                       INTERNSHIP_COLUMNS, "internship_fts"),
+        "todo": (Todo, Todo.id, TODO_COLUMNS, "todo_fts"),
+    }
+    if db.engine.dialect.name == "sqlite":
+        selects = [_sqlite_hits(kind, model, key, fts, user_id, words)
+                   for kind, (model, key, _, fts) in targets.items()
+                   if kind in kinds]
+    else:
+        selects = [_postgresql_hits(kind, model, key, columns, user_id,
+                                    words)
+                   for kind, (model, key, columns, _) in targets.items()
+                   if kind in kinds]
+
+    hits = union_all(*selects).subquery()
+    rows = db.session.execute(
+        select(hits)
+        .order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id)
+        .limit(limit + 1).offset(offset)).all()
+    return [tuple(row) for row in rows[:limit]], len(rows) > limit
+
+
+def _fts_ddl(fts, source, key, columns):
+    names = [name for name, _ in columns]
+    listed = ", ".join(names)
+    new = ", ".join(f"new.{name}" for name in names)
+    old = ", ".join(f"old.{name}" for name in names)
+    add = (f"INSERT INTO {fts} (rowid, {listed}) "
+           f"VALUES (new.{key}, {new});")
+    remove = (f"INSERT INTO {fts} ({fts}, rowid, {listed}) "
+              f"VALUES ('delete', old.{key}, {old});")
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({listed}, "
+        f"content='{source}', content_rowid='{key}', "
+        f"tokenize='porter unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {source} "
+        f"BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {source} "
+        f"BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {listed} "
+        f"ON {source} BEGIN {remove} {add} END",
+        # Index rows written before the triggers existed
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+def init_db(db):
+    """
+    Create the SQLite FTS5 indexes and their triggers along with the other
+    tables, and drop them with them.
+
+    Args:
+        db (SQLAlchemy): The application's database.
+    """
+    for fts, (source, key, columns) in FTS_TABLES.items():
+        for statement in _fts_ddl(fts, source, key, columns):
+            event.listen(db.metadata, "after_create",
+                         DDL(statement).execute_if(dialect="sqlite"))
+        event.listen(db.metadata, "before_drop",
+                     DDL(f"DROP TABLE IF EXISTS {fts}")
+                     .execute_if(dialect="sqlite"))
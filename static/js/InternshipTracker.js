@@ -23,8 +23,7 @@ document.addEventListener("DOMContentLoaded", () => {
             const result = await response.json();
             if (response.ok) {
                 console.log("Internship added successfully:", result);
-                internshipDataFetch(); // Refresh data after successful addition
-                window.fetchAndRenderDeadlines();
+                refreshAfterWrite();
             } else {
                 console.error("Error adding internship:", result.error);
             }
@@ -62,8 +61,8 @@ document.addEventListener("DOMContentLoaded", () => {
                 e.target.textContent = '▶';
             } else {
                 // Expand row to show details
-                let referral = (item.referral==='true');
-                let offer = (item.offerReceived==='true');
+                let referral = (item.referral === true);
+                let offer = (item.offerReceived === true);
                 const detailRows = [
                     ['Salary', `$${parseFloat(item.salary).toFixed(2)}`],
                     ['Location', item.location],
@@ -106,7 +105,50 @@ document.addEventListener("DOMContentLoaded", () => {
 
             console.log('Received:', data);
             internshipData = data;
+            renderTable();
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    }
+
+    /**
+     * Refetch after this page's own write. The change feed is only relied
+     * on for writes made elsewhere, since its delivery is best-effort.
+     */
+    function refreshAfterWrite() {
+        internshipDataFetch();
+        window.fetchAndRenderDeadlines?.();
+    }
 
+    /**
+     * Apply an internship change pushed by the server and re-render the
+     * table without refetching it.
+     * @param {Object} change - {op, data}, where data is a serialized internship.
+     */
+    function applyInternshipChange(change) {
+        if (change.op === 'reload') {
+            internshipDataFetch();
+            return;
+        }
+
+        const id = change.data.internshipId;
+        const index = internshipData.findIndex((item) => item.internshipId === id);
+        if (change.op === 'deleted') {
+            if (index === -1) return;
+            internshipData.splice(index, 1);
+        } else if (index === -1) {
+            internshipData.push(change.data);
+        } else {
+            internshipData[index] = change.data;
+        }
+        renderTable();
+    }
+
+    /**
+     * Render the table from internshipData
+     */
+    function renderTable() {
+        try {
             // Destroy the existing table if it exists
             if (dataTable) {
                 dataTable.destroy();
@@ -156,6 +198,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     internshipDataFetch();
+    window.changeFeed?.on('internships', applyInternshipChange);
 
     // Modal logic for adding/editing internships
     const modal = document.getElementById("addInternshipModal");
@@ -277,8 +320,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
                 if (response.ok) {
                     console.log("Internship updated successfully.");
-                    internshipDataFetch(); // Refresh the data
-                    window.fetchAndRenderDeadlines();
+                    refreshAfterWrite();
                 } else {
                     const errorData = await response.json();
                     console.error("Error updating internship:", errorData.error);
@@ -307,8 +349,7 @@ document.addEventListener("DOMContentLoaded", () => {
     
             if (response.ok) {
                 console.log(`Internship at ${itemValues.companyName} deleted successfully.`);
-                internshipDataFetch(); // Refresh the table data
-                window.fetchAndRenderDeadlines();
+                refreshAfterWrite();
             } else {
                 const errorData = await response.json();
                 console.error("Error deleting internship:", errorData.error);
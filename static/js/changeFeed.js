@@ -0,0 +1,65 @@
+/**
+ * This file opens a single Server-Sent Events connection to
+ * /api/changes/stream and hands each change to the components listening
+ * for its type, so they can apply the delta instead of refetching.
+ *
+ * Usage: window.changeFeed.on('todos', (change) => { ... });
+ * where change is {id, type, op, data} and op is created, updated,
+ * deleted or reload. The browser reconnects on its own and resumes from
+ * the last change it received.
+ *
+ * Delivery is best-effort, so a page still updates itself from its own
+ * writes and uses the feed for changes made in other tabs or devices.
+ */
+(function () {
+    // Pages that include the tracker load this script twice
+    if (window.changeFeed) {
+        return;
+    }
+
+    const handlers = {};
+    let source = null;
+
+    /**
+     * Pass a change to the handlers of its type; a reload of type "all"
+     * goes to every handler.
+     * @param {Object} change - The change sent by the server.
+     */
+    function dispatch(change) {
+        const types = change.type === 'all' ? Object.keys(handlers) : [change.type];
+        types.forEach((type) => {
+            (handlers[type] || []).forEach((handler) => {
+                try {
+                    handler({ ...change, type });
+                } catch (error) {
+                    console.error(`Error applying ${type} change:`, error);
+                }
+            });
+        });
+    }
+
+    /**
+     * Open the stream unless it is already open or unsupported.
+     */
+    function connect() {
+        if (source || typeof EventSource === 'undefined') {
+            return;
+        }
+        source = new EventSource('/api/changes/stream');
+        source.addEventListener('change', (event) => {
+            dispatch(JSON.parse(event.data));
+        });
+    }
+
+    window.changeFeed = {
+        /**
+         * Listen for changes of one type.
+         * @param {string} type - todos, internships or calendar.
+         * @param {Function} handler - Called with each change.
+         */
+        on(type, handler) {
+            (handlers[type] = handlers[type] || []).push(handler);
+            connect();
+        },
+    };
+})();
@@ -23,6 +23,7 @@ async function loadTodoList() {
             container.innerHTML = todoHTML;
             await loadTasks();
             attachDragAndDropHandlers();
+            window.changeFeed?.on('todos', applyTodoChange);
 
             document.querySelectorAll('.todo-input').forEach((input) => {
                 input.addEventListener('keypress', (e) => {
@@ -40,21 +41,43 @@ async function loadTodoList() {
     }
 }
 
+/**
+ * Fetch the user's todos. The first call on the dashboard reuses the
+ * payload already requested by upcomingDeadlines.js.
+ * @async
+ * @returns {Promise<Array|null>} - The todos, or null on failure.
+ */
+async function fetchTodos() {
+    const initialDashboard = window.initialDashboard;
+    window.initialDashboard = null;
+    if (initialDashboard) {
+        const dashboard = await initialDashboard;
+        if (dashboard && Array.isArray(dashboard.todos)) {
+            return dashboard.todos;
+        }
+    }
+
+    const response = await fetch('/api/todos');
+    if (!response.ok) {
+        console.error('Failed to fetch tasks:', response.statusText);
+        return null;
+    }
+
+    const data = await response.json();
+    return data.todos;
+}
+
 /**
  * Load tasks from the database and populate the respective lists.
  * @async
  */
 async function loadTasks() {
     try {
-        const response = await fetch('/api/todos');
-        if (!response.ok) {
-            console.error('Failed to fetch tasks:', response.statusText);
+        const todos = await fetchTodos();
+        if (!todos) {
             return;
         }
 
-        const data = await response.json();
-        const todos = data.todos;
-
         // Define valid categories and their corresponding list IDs
         const categoryMap = {
             'Today': 'todo-today',
@@ -82,6 +105,35 @@ async function loadTasks() {
     }
 }
 
+/**
+ * Apply a todo change pushed by the server, e.g. from another tab. Tasks
+ * already shown are matched by id, so this tab's own writes are no-ops.
+ * @param {Object} change - {op, data}, where data is {id, category, task}.
+ */
+function applyTodoChange(change) {
+    if (change.op === 'reload') {
+        loadTasks();
+        return;
+    }
+
+    const existing = document.querySelector(`.todo-item[data-id="${change.data.id}"]`);
+    if (change.op === 'deleted') {
+        existing?.remove();
+        return;
+    }
+
+    const listIds = {
+        'Today': 'todo-today',
+        'This Week': 'todo-week',
+        'This Month': 'todo-month',
+        'Next Month': 'todo-next-month',
+    };
+    const list = document.getElementById(listIds[change.data.category]);
+    if (list && existing?.parentElement !== list) {
+        list.appendChild(existing || createTodoElement(change.data.id, change.data.task));
+    }
+}
+
 /**
  * Add a task to a specific todo list (Today, This Week, etc.).
  * @async
@@ -116,9 +168,11 @@ async function addTask(listId, inputId) {
             return;
         }
 
+        // Reconcile from the response rather than waiting for the change
+        // feed, which may already have added it or may never deliver it
         const data = await response.json();
         const taskList = document.getElementById(listId);
-        if (taskList) {
+        if (taskList && !document.querySelector(`.todo-item[data-id="${data.id}"]`)) {
             const li = createTodoElement(data.id, taskText);
             taskList.appendChild(li);
         }
@@ -272,4 +326,4 @@ async function updateTaskCategory(taskId, newCategory) {
 window.addEventListener('load', loadTodoList);
 window.addTask = addTask;
 
-export { loadTodoList, addTask, loadTasks, deleteTask };
+export { loadTodoList, addTask, loadTasks, deleteTask, applyTodoChange };
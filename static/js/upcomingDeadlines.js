@@ -1,48 +1,38 @@
 /**
- * Fetch today's Google Calendar events from the backend.
+ * Fetch the combined dashboard payload from the backend: today's events,
+ * today's internship follow-ups and the user's todos, in one request.
  * @async
- * @function fetchTodaysEvents
- * @returns {Promise<Array>} - A promise that resolves to an array of today's events.
+ * @function fetchDashboard
+ * @returns {Promise<Object|null>} - A promise that resolves to the dashboard payload, or null on failure.
  */
-async function fetchTodaysEvents() {
+async function fetchDashboard() {
     try {
-        console.log("Fetching today's events...");
-        const response = await fetch('/api/calendar/events/today');
+        console.log("Fetching dashboard...");
+        const response = await fetch('/api/dashboard');
         if (!response.ok) {
-            console.error("Failed to fetch today's events:", response.statusText);
-            return [];
+            console.error("Failed to fetch dashboard:", response.statusText);
+            return null;
         }
 
-        const events = await response.json();
-        return Array.isArray(events) ? events : [];
+        const dashboard = await response.json();
+        Object.entries(dashboard.errors || {}).forEach(([section, error]) => {
+            console.error(`Failed to load dashboard section "${section}":`, error);
+        });
+        return dashboard;
     } catch (error) {
-        console.error("Error fetching today's events:", error);
-        return [];
+        console.error("Error fetching dashboard:", error);
+        return null;
     }
 }
 
-/**
- * Fetch today's internship follow-ups from the backend.
- * @async
- * @function fetchTodaysInternships
- * @returns {Promise<Array>} - A promise that resolves to an array of today's internships.
- */
-async function fetchTodaysInternships() {
-    try {
-        console.log("Fetching today's internships...");
-        const response = await fetch('/api/internships/today');
-        if (!response.ok) {
-            console.error("Failed to fetch today's internships:", response.statusText);
-            return [];
-        }
+// Started as soon as the page loads and shared with the to-do list, so the
+// dashboard's first render costs a single request.
+let pendingDashboard = fetchDashboard();
+window.initialDashboard = pendingDashboard;
 
-        const internships = await response.json();
-        return Array.isArray(internships) ? internships : [];
-    } catch (error) {
-        console.error("Error fetching today's internships:", error);
-        return [];
-    }
-}
+// Today's deadlines currently shown, kept so pushed changes can be applied.
+let todaysEvents = [];
+let todaysInternships = [];
 
 /**
  * Converts the event's dateTime to a user's local 12-hour time format.
@@ -72,18 +62,73 @@ async function fetchAndRenderDeadlines() {
     try {
         console.log("Fetching all deadlines...");
 
-        const [events, internships] = await Promise.all([
-            fetchTodaysEvents(),
-            fetchTodaysInternships()
-        ]);
+        const request = pendingDashboard || fetchDashboard();
+        pendingDashboard = null;
+        const dashboard = await request || {};
+        todaysEvents = Array.isArray(dashboard.events) ? dashboard.events : [];
+        todaysInternships = Array.isArray(dashboard.internships) ? dashboard.internships : [];
+        renderTodaysDeadlines();
+    } catch (error) {
+        console.error("Error fetching and rendering deadlines:", error);
+    }
+}
 
+/**
+ * Check whether a "YYYY-MM-DD" date or a dateTime string falls on today.
+ * @function isToday
+ * @param {string} value - The date or dateTime.
+ * @returns {boolean}
+ */
+function isToday(value) {
+    if (!value) return false;
+    const date = value.length === 10 ? new Date(`${value}T00:00:00`) : new Date(value);
+    return date.toDateString() === new Date().toDateString();
+}
+
+/**
+ * Apply a pushed change to today's events or internships and re-render.
+ * Items that no longer fall on today are dropped.
+ * @function applyDeadlineChange
+ * @param {Object} change - {type, op, data} as sent by the change feed.
+ */
+function applyDeadlineChange(change) {
+    if (change.op === 'reload') {
+        fetchAndRenderDeadlines();
+        return;
+    }
+
+    const isEvent = change.type === 'calendar';
+    const key = isEvent ? 'id' : 'internshipId';
+    const items = (isEvent ? todaysEvents : todaysInternships)
+        .filter(item => item[key] !== change.data[key]);
+    const date = isEvent
+        ? change.data.start && (change.data.start.dateTime || change.data.start.date)
+        : change.data.followUpDate;
+    if (change.op !== 'deleted' && isToday(date)) {
+        items.push(change.data);
+    }
+
+    if (isEvent) {
+        todaysEvents = items;
+    } else {
+        todaysInternships = items;
+    }
+    renderTodaysDeadlines();
+}
+
+/**
+ * Render today's events and internships as deadlines.
+ * @function renderTodaysDeadlines
+ */
+function renderTodaysDeadlines() {
+    try {
         const combinedDeadlines = [
-            ...events.map(event => ({
+            ...todaysEvents.map(event => ({
                 type: 'event',
                 summary: event.summary,
                 time: event.start && event.start.dateTime ? formatEventTime(event.start.dateTime, event.start.timeZone) : "Time not specified"
             })),
-            ...internships.map(internship => ({
+            ...todaysInternships.map(internship => ({
                 type: 'internship',
                 summary: `${internship.companyName} (${internship.positionTitle})`
             }))
@@ -91,7 +136,7 @@ async function fetchAndRenderDeadlines() {
 
         renderDeadlines(combinedDeadlines);
     } catch (error) {
-        console.error("Error fetching and rendering deadlines:", error);
+        console.error("Error rendering deadlines:", error);
     }
 }
 
@@ -130,3 +175,5 @@ function renderDeadlines(deadlines) {
 window.fetchAndRenderDeadlines = fetchAndRenderDeadlines;
 
 window.addEventListener('load', fetchAndRenderDeadlines);
+window.changeFeed?.on('internships', applyDeadlineChange);
+window.changeFeed?.on('calendar', applyDeadlineChange);
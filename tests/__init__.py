@@ -0,0 +1,54 @@
+"""
+tests
+
+Shared setup for the test suite.
+
+Tests create and drop every table, so they must never run against the
+database `.env` points at. Every test module imports this package before
+`src.app`, which points the app at an in-memory SQLite database, or at
+`TEST_DATABASE_URL` when it is set, and at no read replicas.
+`load_dotenv` leaves variables that are already set alone.
+
+Attributes:
+    TEST_DATABASE_URL (str): The only database tests create and drop
+        tables in.
+"""
+
+import os
+from sqlalchemy.engine import make_url
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ["DATABASE_REPLICA_URLS"] = ""
+
+
+def _test_database():
+    # The app's database, after checking it is the test database
+    from src.app import db
+
+    if db.engine.url != make_url(TEST_DATABASE_URL):
+        raise RuntimeError(
+            f"Refusing to create or drop tables in {db.engine.url!r}: "
+            f"tests only use {make_url(TEST_DATABASE_URL)!r}. Import "
+            "`tests` before `src.app`.")
+    return db
+
+
+def create_tables():
+    """
+    Create every table in the test database.
+
+    Must be called within an app context.
+    """
+    _test_database().create_all()
+
+
+def drop_tables():
+    """
+    Drop every table in the test database, discarding the session first.
+
+    Must be called within an app context.
+    """
+    db = _test_database()
+    db.session.remove()
+    db.drop_all()
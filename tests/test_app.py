@@ -18,7 +18,11 @@ sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
 )
 
-from src.app import app  # noqa: E402
+import json  # noqa: E402
+import tempfile  # noqa: E402
+import tests  # noqa: E402, F401
+from src import app as app_module  # noqa: E402
+from src.app import app, load_client_config  # noqa: E402
 
 # Set up environment variables needed for testing
 os.environ["FLASK_SECRET_KEY"] = "test_secret_key"
@@ -57,12 +61,13 @@ class FlaskAppTestCase(unittest.TestCase):
         response = self.client.get("/dashboard")
         self.assertEqual(response.status_code, 401)
 
+    @patch("src.app.load_client_config", return_value={})
     @patch("src.app.Flow")
-    def test_login_route(self, mock_flow_class):
+    def test_login_route(self, mock_flow_class, mock_load_config):
         """Test the login route and ensure it redirects correctly."""
         # Mock the OAuth flow
         mock_flow_instance = MagicMock()
-        mock_flow_class.from_client_secrets_file.return_value = (
+        mock_flow_class.from_client_config.return_value = (
             mock_flow_instance
             )
         mock_flow_instance.authorization_url.return_value = (
@@ -78,14 +83,19 @@ class FlaskAppTestCase(unittest.TestCase):
         with self.client.session_transaction() as sess:
             self.assertEqual(sess["state"], "mocked_state")
 
+    @patch("src.app.load_client_config", return_value={})
+    @patch("src.app.credential_manager")
+    @patch("src.app.prime_user_timezone")
     @patch("src.app.Flow")
     @patch("src.app.id_token")
     @patch("src.app.User.query")
     def test_callback_route(self, mock_user_query,
-                            mock_id_token_module, mock_flow_class):
+                            mock_id_token_module, mock_flow_class,
+                            mock_prime_timezone, mock_credential_manager,
+                            mock_load_config):
         """Test the callback route and simulate successful authentication."""
         mock_flow_instance = MagicMock()
-        mock_flow_class.from_client_secrets_file.return_value = (
+        mock_flow_class.from_client_config.return_value = (
             mock_flow_instance
             )
         mock_flow_instance.fetch_token.return_value = None
@@ -119,6 +129,30 @@ class FlaskAppTestCase(unittest.TestCase):
             self.assertEqual(sess["name"], "Mocked User")
             self.assertEqual(sess["access_token"], "mocked_access_token")
             self.assertEqual(sess["refresh_token"], "mocked_refresh_token")
+        mock_prime_timezone.assert_called_once()
+        mock_credential_manager.save.assert_called_once_with(
+            "mocked_sub_id", mock_credentials)
+        self.assertIs(
+            mock_id_token_module.verify_oauth2_token.call_args.kwargs[
+                "request"],
+            app_module.token_request)
+
+    def test_client_config_read_once(self):
+        """Test that client_secret.json is parsed once per process."""
+        with tempfile.NamedTemporaryFile("w", suffix=".json",
+                                         delete=False) as file:
+            json.dump({"web": {"client_id": "test_google_client_id"}}, file)
+        self.addCleanup(os.remove, file.name)
+        self.addCleanup(load_client_config.cache_clear)
+
+        load_client_config.cache_clear()
+        with patch("src.app.CLIENT_SECRETS_FILE", file.name), \
+                patch("builtins.open", wraps=open) as mock_open:
+            first = load_client_config()
+            second = load_client_config()
+
+        self.assertIs(first, second)
+        mock_open.assert_called_once_with(file.name)
 
     def test_logout_route(self):
         """Test that logging out clears the session and redirects to home."""
@@ -10,14 +10,26 @@ deletion through the Google Calendar API.
 
 import unittest
 import os
+import time
+import flask
 import sys
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
     )
 
+from tests import create_tables, drop_tables  # noqa: E402
 from src.app import app  # noqa: E402
+from src.calendarCredentials import credential_manager  # noqa: E402
+from src.calendarGoogle import (  # noqa: E402
+    TIMEZONE_TTL,
+    get_calendar_service,
+    get_discovery_document,
+    get_user_timezone,
+    service_cache,
+)
 
 
 class TestCalendar(unittest.TestCase):
@@ -122,5 +134,132 @@ class TestCalendar(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class TestServiceCache(unittest.TestCase):
+    """
+    Unit tests for the per-user Calendar service cache.
+    """
+
+    def setUp(self):
+        """
+        Set up a test client with an authenticated session and
+        an empty service cache.
+        """
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        service_cache.clear()
+        credential_manager.forget("test_google_id")
+        with app.app_context():
+            create_tables()
+
+    def tearDown(self):
+        service_cache.clear()
+        credential_manager.forget("test_google_id")
+        with app.app_context():
+            drop_tables()
+
+    def test_discovery_document_is_parsed_once(self):
+        """
+        Test that the discovery document is shared across builds.
+        """
+        self.assertIs(get_discovery_document(), get_discovery_document())
+
+    def test_cache_hits_and_misses(self):
+        """
+        Test hit/miss accounting and invalidation on token change.
+        """
+        credentials, service = MagicMock(), MagicMock()
+        self.assertIsNone(service_cache.get("user", "token"))
+        service_cache.put("user", "token", credentials, service)
+        self.assertEqual(service_cache.get("user", "token"),
+                         (credentials, service))
+        self.assertIsNone(service_cache.get("user", "new_token"))
+        self.assertEqual(service_cache.stats()["hits"], 1)
+        self.assertEqual(service_cache.stats()["misses"], 2)
+
+    @patch("src.calendarGoogle.build_service")
+    def test_service_reused_across_requests(self, mock_build):
+        """
+        Test that the service is built once per user and token.
+        """
+        with app.test_request_context():
+            flask.session["id_google"] = "test_google_id"
+            flask.session["access_token"] = "mock_access_token"
+            flask.session["refresh_token"] = "mock_refresh_token"
+            first = get_calendar_service()
+            second = get_calendar_service()
+
+        self.assertIs(first, second)
+        mock_build.assert_called_once()
+
+    @patch("src.calendarGoogle.build_service")
+    def test_service_rebuilt_on_refresh(self, mock_build):
+        """
+        Test that an expiring credential is refreshed and the session and
+        cached service follow the new token.
+        """
+        credentials = credential_manager.build(
+            "mock_access_token", "mock_refresh_token",
+            expiry=datetime.utcnow() - timedelta(minutes=1))
+        credential_manager.remember("test_google_id", credentials)
+
+        def refresh(self, request):
+            self.token = "refreshed_token"
+            self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+        with patch("src.calendarCredentials.Credentials.refresh",
+                   autospec=True, side_effect=refresh) as mock_refresh, \
+                app.test_request_context():
+            flask.session["id_google"] = "test_google_id"
+            flask.session["access_token"] = "mock_access_token"
+            flask.session["refresh_token"] = "mock_refresh_token"
+            get_calendar_service()
+            self.assertEqual(flask.session["access_token"],
+                             "refreshed_token")
+
+        mock_refresh.assert_called_once()
+        self.assertIsNotNone(
+            service_cache.get("test_google_id", "refreshed_token"))
+
+
+class TestUserTimezone(unittest.TestCase):
+    """
+    Unit tests for the session-cached user timezone.
+    """
+
+    def test_timezone_fetched_once(self):
+        """
+        Test that the timezone is fetched from Google only when the
+        session does not already hold it.
+        """
+        service = MagicMock()
+        service.settings.return_value.get.return_value.execute \
+            .return_value = {"value": "America/Los_Angeles"}
+        with app.test_request_context():
+            flask.session["id_google"] = "test_google_id"
+            self.assertEqual(get_user_timezone(service),
+                             "America/Los_Angeles")
+            self.assertEqual(get_user_timezone(service),
+                             "America/Los_Angeles")
+
+        service.settings.return_value.get.assert_called_once()
+
+    @patch("src.calendarGoogle.schedule_timezone_refresh")
+    def test_stale_timezone_refreshed_in_background(self, mock_schedule):
+        """
+        Test that a stale timezone is still served while a background
+        refresh is scheduled.
+        """
+        service = MagicMock()
+        with app.test_request_context():
+            flask.session["id_google"] = "test_google_id"
+            flask.session["timezone"] = "UTC"
+            flask.session["timezone_fetched_at"] = (
+                time.time() - TIMEZONE_TTL - 1)
+            self.assertEqual(get_user_timezone(service), "UTC")
+
+        mock_schedule.assert_called_once()
+        service.settings.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
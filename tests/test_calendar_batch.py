@@ -0,0 +1,193 @@
+"""
+test_calendar_batch.py
+
+Unit tests for the batched calendar write endpoint.
+
+The Calendar service is built from the bundled discovery document on top of
+a fake HTTP transport that answers Google's multipart batch requests
+locally, so the real batch encoding and response parsing are exercised.
+"""
+
+import unittest
+import os
+import sys
+import json
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from unittest.mock import patch
+import httplib2
+from googleapiclient.discovery import build_from_document
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, User  # noqa: E402
+from src import calendarSync  # noqa: E402
+from src.calendarGoogle import get_discovery_document  # noqa: E402
+
+
+class FakeBatchHttp:
+    """
+    An httplib2-compatible transport that answers batch requests.
+
+    Inserts and patches echo the request body back as the event, deletes
+    succeed unless the event id is listed in `missing`.
+    """
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.batches = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if isinstance(body, str):
+            body = body.encode()
+        content_type = headers["content-type"]
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        parts = list(message.iter_parts())
+        self.batches.append(len(parts))
+
+        boundary = uuid.uuid4().hex
+        chunks = []
+        for part in parts:
+            status, payload = self.answer(part.get_payload())
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            chunks.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload)}\r\n")
+        content = "".join(chunks) + f"--{boundary}--"
+        response = httplib2.Response({
+            "status": 200,
+            "content-type": f"multipart/mixed; boundary={boundary}",
+        })
+        return response, content.encode()
+
+    def answer(self, http_request):
+        http_request = http_request.replace("\r\n", "\n")
+        head, _, body = http_request.partition("\n\n")
+        method, path, _ = head.split("\n", 1)[0].split(" ")
+        event_id = path.split("?")[0].rstrip("/").split("/")[-1]
+        if method == "DELETE":
+            if event_id in self.missing:
+                return "404 Not Found", {"error": {"code": 404,
+                                                   "message": "Not Found"}}
+            return "204 No Content", {}
+        event = json.loads(body)
+        event["id"] = f"created-{len(self.batches)}" if method == "POST" \
+            else event_id
+        return "200 OK", event
+
+
+class TestCalendarBatch(unittest.TestCase):
+    """
+    Unit tests for POST /api/calendar/events/batch.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            user = User(google_id="batch_google_id", name="Test User")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        with self.client.session_transaction() as session:
+            session["user_id"] = self.user_id
+            session["id_google"] = "batch_google_id"
+            session["access_token"] = "mock_access_token"
+            session["refresh_token"] = "mock_refresh_token"
+            session["timezone"] = "UTC"
+            session["timezone_fetched_at"] = float("inf")
+
+    def tearDown(self):
+        patch.stopall()
+        with app.app_context():
+            drop_tables()
+
+    def use_transport(self, http):
+        service = build_from_document(get_discovery_document(), http=http)
+        patch("src.calendarGoogle.get_calendar_service",
+              return_value=service).start()
+
+    def create(self, index):
+        return {"op": "create", "summary": f"Follow up {index}",
+                "start": "2030-01-01T10:00:00Z",
+                "end": "2030-01-01T11:00:00Z"}
+
+    def test_mixed_operations_return_per_item_results(self):
+        """
+        Test creates, updates, deletes and invalid operations in one call.
+        """
+        http = FakeBatchHttp(missing={"gone"})
+        self.use_transport(http)
+
+        response = self.client.post("/api/calendar/events/batch", json={
+            "operations": [
+                self.create(0),
+                {"op": "update", "id": "existing", "summary": "Renamed"},
+                {"op": "delete", "id": "gone"},
+                {"op": "delete"},
+                {"op": "move", "id": "existing"},
+            ],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json["results"]
+        self.assertEqual([result["status"] for result in results],
+                         ["ok", "ok", "error", "error", "error"])
+        self.assertEqual(results[0]["event"]["summary"], "Follow up 0")
+        self.assertEqual(results[1]["event"]["summary"], "Renamed")
+        self.assertEqual([result["code"] for result in results[2:]],
+                         [404, 400, 400])
+        self.assertEqual(http.batches, [3])
+
+    def test_large_batches_are_chunked(self):
+        """
+        Test that operations are split into batches of at most 50 calls.
+        """
+        http = FakeBatchHttp()
+        self.use_transport(http)
+
+        response = self.client.post("/api/calendar/events/batch", json={
+            "operations": [self.create(i) for i in range(120)],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json["results"]), 120)
+        self.assertEqual(http.batches, [50, 50, 20])
+
+    def test_results_written_to_mirror(self):
+        """
+        Test that successful writes are applied to the local mirror.
+        """
+        self.use_transport(FakeBatchHttp())
+
+        self.client.post("/api/calendar/events/batch", json={
+            "operations": [self.create(0)],
+        })
+
+        with app.app_context():
+            events = calendarSync.events_between(self.user_id)
+        self.assertEqual([event["summary"] for event in events],
+                         ["Follow up 0"])
+
+    def test_missing_operations_rejected(self):
+        """
+        Test that a request without operations is rejected.
+        """
+        response = self.client.post("/api/calendar/events/batch",
+                                    json={"operations": []})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
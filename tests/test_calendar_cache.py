@@ -0,0 +1,189 @@
+"""
+test_calendar_cache.py
+
+Unit tests for the calendar read-through cache.
+
+This file contains tests for the cache backends, the per-user invalidation
+scheme and the cached calendar read endpoints. Google Calendar is mocked so
+the tests can count how many reads actually reach it.
+"""
+
+import unittest
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, User  # noqa: E402
+from src.calendarCache import (  # noqa: E402
+    EventCache,
+    InProcessBackend,
+    LocalStore,
+    SharedStoreBackend,
+    event_cache,
+)
+
+
+class TestEventCache(unittest.TestCase):
+    """
+    Unit tests for the cache itself, run against every backend.
+    """
+
+    def backends(self):
+        return [InProcessBackend(), SharedStoreBackend(LocalStore())]
+
+    def test_read_through(self):
+        """
+        Test that the loader only runs on a miss.
+        """
+        for backend in self.backends():
+            cache = EventCache(backend, ttl=60)
+            loader = MagicMock(return_value=[{"id": "event"}])
+            self.assertEqual(cache.get_or_load("user", "today", loader),
+                             [{"id": "event"}])
+            self.assertEqual(cache.get_or_load("user", "today", loader),
+                             [{"id": "event"}])
+            loader.assert_called_once()
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_invalidate_is_per_user(self):
+        """
+        Test that invalidating one user leaves other users cached.
+        """
+        for backend in self.backends():
+            cache = EventCache(backend, ttl=60)
+            loader = MagicMock(return_value=[])
+            cache.get_or_load("alice", "today", loader)
+            cache.get_or_load("bob", "today", loader)
+            cache.invalidate("alice")
+            cache.get_or_load("alice", "today", loader)
+            cache.get_or_load("bob", "today", loader)
+            self.assertEqual(loader.call_count, 3)
+
+    def test_entries_expire(self):
+        """
+        Test that entries are reloaded once their TTL has passed.
+        """
+        backend = InProcessBackend()
+        backend.set("key", "value", ttl=60)
+        with patch("src.calendarCache.time.monotonic",
+                   return_value=float("inf")):
+            self.assertIsNone(backend.get("key"))
+
+    def test_expired_entries_swept_on_set(self):
+        """
+        Test that expired keys are dropped even if never read again.
+        """
+        backend = InProcessBackend()
+        backend.set("calendar:user:0:today", "value", ttl=60)
+        backend.set("calendar:user:generation", 1)
+        with patch("src.calendarCache.time.monotonic",
+                   return_value=float("inf")):
+            backend.set("calendar:user:1:today", "value", ttl=60)
+        self.assertEqual(set(backend._values),
+                         {"calendar:user:generation",
+                          "calendar:user:1:today"})
+
+    def test_concurrent_invalidations_all_count(self):
+        """
+        Test that no generation bump is lost to a concurrent one.
+        """
+        for backend in self.backends():
+            cache = EventCache(backend, ttl=60)
+            threads = [threading.Thread(target=cache.invalidate,
+                                        args=("user",))
+                       for _ in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(cache._generation("user"), 20)
+
+
+class TestCachedCalendarRoutes(unittest.TestCase):
+    """
+    Unit tests for the cached calendar read endpoints.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            user = User(google_id="cache_test_google_id", name="Test User")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        with self.client.session_transaction() as session:
+            session["user_id"] = user_id
+            session["id_google"] = "cache_test_google_id"
+            session["access_token"] = "mock_access_token"
+            session["refresh_token"] = "mock_refresh_token"
+            session["timezone"] = "UTC"
+            session["timezone_fetched_at"] = float("inf")
+
+        self.mock_service = MagicMock()
+        self.mock_list = self.mock_service.events.return_value.list
+        now = datetime.now().astimezone()
+        self.mock_list.return_value.execute.return_value = {
+            "items": [{
+                "id": "mock_event_id",
+                "start": {"dateTime": now.isoformat()},
+                "end": {"dateTime": (now + timedelta(minutes=1)).isoformat()},
+            }],
+            "nextSyncToken": "sync_token",
+        }
+        patch("src.calendarGoogle.get_calendar_service",
+              return_value=self.mock_service).start()
+        event_cache.invalidate("cache_test_google_id")
+
+    def tearDown(self):
+        patch.stopall()
+        with app.app_context():
+            drop_tables()
+
+    def test_todays_events_served_from_cache(self):
+        """
+        Test that repeated reads of today's events hit Google once.
+        """
+        first = self.client.get("/api/calendar/events/today")
+        second = self.client.get("/api/calendar/events/today")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([event["id"] for event in second.json],
+                         ["mock_event_id"])
+        self.mock_list.assert_called_once()
+
+    def test_write_invalidates_cache(self):
+        """
+        Test that creating an event invalidates the user's cached reads
+        and is written through to the local mirror.
+        """
+        mock_insert = self.mock_service.events.return_value.insert
+        mock_insert.return_value.execute.return_value = {
+            "id": "new_id",
+            "start": {"dateTime": "2999-01-01T10:00:00+00:00"},
+            "end": {"dateTime": "2999-01-01T11:00:00+00:00"},
+        }
+
+        self.client.get("/api/calendar/events")
+        response = self.client.post("/api/calendar/events", json={
+            "summary": "Test Event",
+            "start": "2024-01-01T10:00:00Z",
+            "end": "2024-01-01T11:00:00Z",
+        })
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get("/api/calendar/events")
+        self.assertEqual([event["id"] for event in response.json],
+                         ["mock_event_id", "new_id"])
+        self.mock_list.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
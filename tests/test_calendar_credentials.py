@@ -0,0 +1,136 @@
+"""
+test_calendar_credentials.py
+
+Unit tests for the Google credential manager.
+
+These tests cover coalescing of concurrent refreshes, sharing refreshed
+tokens between workers through the database and proactive background
+refreshes. Google's token endpoint is mocked by patching
+`Credentials.refresh`.
+"""
+
+import unittest
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app  # noqa: E402
+from src.calendarCredentials import CredentialManager  # noqa: E402
+
+
+def expiring_in(seconds):
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+class TestCredentialManager(unittest.TestCase):
+    """
+    Unit tests for loading, persisting and refreshing credentials.
+    """
+
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        create_tables()
+        self.manager = CredentialManager(MagicMock(), refresh_margin=60,
+                                         proactive_margin=300)
+        self.refreshes = 0
+
+    def tearDown(self):
+        drop_tables()
+        self.context.pop()
+
+    def patch_refresh(self, started=None, release=None):
+        def refresh(credentials, request):
+            self.refreshes += 1
+            if started is not None:
+                started.set()
+                release.wait(5)
+            credentials.token = f"token_{self.refreshes}"
+            credentials.expiry = expiring_in(3600)
+
+        return patch("src.calendarCredentials.Credentials.refresh",
+                     autospec=True, side_effect=refresh)
+
+    def test_concurrent_refreshes_are_coalesced(self):
+        """
+        Test that simultaneous refreshes for one user make one call.
+        """
+        expired = self.manager.build("old", "refresh", expiring_in(-10))
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def refresh():
+            with app.app_context():
+                results.append(self.manager.refresh("user", expired).token)
+
+        with self.patch_refresh(started, release):
+            owner = threading.Thread(target=refresh)
+            owner.start()
+            started.wait(5)
+            waiters = [threading.Thread(target=refresh) for _ in range(4)]
+            for thread in waiters:
+                thread.start()
+            release.set()
+            for thread in [owner] + waiters:
+                thread.join(5)
+
+        self.assertEqual(self.refreshes, 1)
+        self.assertEqual(results, ["token_1"] * 5)
+
+    def test_refreshed_tokens_are_shared_between_workers(self):
+        """
+        Test that another worker picks up a stored token instead of
+        refreshing again.
+        """
+        expired = self.manager.build("old", "refresh", expiring_in(-10))
+        self.manager.save("user", expired)
+        other_worker = CredentialManager(MagicMock())
+
+        with self.patch_refresh():
+            self.manager.refresh("user", expired)
+            self.assertEqual(other_worker.refresh("user", expired).token,
+                             "token_1")
+            self.assertEqual(
+                CredentialManager(MagicMock()).get("user", "old",
+                                                   "refresh").token,
+                "token_1")
+
+        self.assertEqual(self.refreshes, 1)
+
+    def test_expiring_token_refreshed_in_background(self):
+        """
+        Test that a token nearing expiry is served while a background
+        refresh replaces it.
+        """
+        self.manager.save("user", self.manager.build(
+            "current", "refresh", expiring_in(120)))
+        self.manager.forget("user")
+
+        with self.patch_refresh():
+            self.assertEqual(self.manager.get("user", None, None).token,
+                             "current")
+            self.manager._executor.shutdown(wait=True)
+
+        self.assertEqual(self.refreshes, 1)
+        self.assertEqual(self.manager.get("user", None, None).token,
+                         "token_1")
+
+    def test_unknown_expiry_is_not_refreshed(self):
+        """
+        Test that session-only tokens without an expiry are used as-is.
+        """
+        with self.patch_refresh():
+            credentials = self.manager.get("user", "token", "refresh")
+        self.assertEqual(credentials.token, "token")
+        self.assertEqual(self.refreshes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+test_calendar_gateway.py
+
+Unit tests for the outbound Google Calendar gateway.
+
+These tests run the gateway against a small HTTP server on localhost that
+stands in for Google, covering connection reuse, timeouts, retries on
+429/5xx and the concurrency limits.
+"""
+
+import unittest
+import os
+import sys
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+import tests  # noqa: E402, F401
+from src.calendarGateway import (  # noqa: E402
+    GatewayBusy,
+    GatewayHttp,
+    Limiter,
+    RetryingHttpRequest,
+    create_session,
+)
+
+
+class FakeGoogle(BaseHTTPRequestHandler):
+    """
+    Answers every request with the next queued `(status, delay)` pair,
+    or 200 once the queue is empty.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.ports.add(self.client_address[1])
+        status, delay = server.responses.pop(0) if server.responses \
+            else (200, 0)
+        time.sleep(delay)
+        body = json.dumps({"value": "UTC"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCalendarGateway(unittest.TestCase):
+    """
+    Unit tests for the pooled, rate-limited transport.
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGoogle)
+        self.server.responses = []
+        self.server.ports = set()
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/settings"
+        self.http = GatewayHttp("user", create_session(),
+                                Limiter(4, 2, timeout=1),
+                                timeout=(1, 0.5))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def execute(self, num_retries=None, method="GET"):
+        api_request = RetryingHttpRequest(self.http, JsonModel().response,
+                                          self.url, method=method)
+        api_request._sleep = lambda seconds: None
+        return api_request.execute(num_retries=num_retries)
+
+    def test_connections_are_reused(self):
+        """
+        Test that consecutive calls share one keep-alive connection.
+        """
+        for _ in range(3):
+            self.assertEqual(self.execute(), {"value": "UTC"})
+        self.assertEqual(len(self.server.ports), 1)
+
+    def test_retries_rate_limits_and_server_errors(self):
+        """
+        Test that 429 and 5xx responses are retried by default.
+        """
+        self.server.responses = [(429, 0), (503, 0)]
+        self.assertEqual(self.execute(), {"value": "UTC"})
+        self.assertEqual(self.server.responses, [])
+
+    def test_inserts_are_not_retried_by_default(self):
+        """
+        Test that a POST is only retried when the caller opts in, since
+        a retried insert can create a duplicate event.
+        """
+        self.server.responses = [(503, 0)]
+        with self.assertRaises(HttpError):
+            self.execute(method="POST")
+
+        self.server.responses = [(503, 0)]
+        self.assertEqual(self.execute(num_retries=1, method="POST"),
+                         {"value": "UTC"})
+
+    def test_slow_responses_time_out(self):
+        """
+        Test that a response slower than the read timeout is abandoned.
+        """
+        self.server.responses = [(200, 1)]
+        with self.assertRaises(socket.timeout):
+            self.execute(num_retries=0)
+
+    def test_limits_are_per_user_and_global(self):
+        """
+        Test that a busy user is refused a slot while others are not,
+        and that the global limit applies across users.
+        """
+        limiter = Limiter(2, 1, timeout=0.01)
+        held = limiter.acquire("alice")
+        with self.assertRaises(GatewayBusy):
+            limiter.acquire("alice")
+        other = limiter.acquire("bob")
+        with self.assertRaises(GatewayBusy):
+            limiter.acquire("carol")
+        limiter.release(held)
+        limiter.release(other)
+        limiter.release(limiter.acquire("carol"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,211 @@
+"""
+test_calendar_sync.py
+
+Unit tests for the incremental Google Calendar sync engine.
+
+These tests run the sync engine against an in-memory SQLite database and a
+mocked Calendar service, covering the initial full sync, incremental syncs
+with a sync token, cancelled events and the 410 Gone re-sync path.
+"""
+
+import unittest
+import os
+import sys
+import threading
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import httplib2
+from googleapiclient.errors import HttpError
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, CalendarEvent, CalendarSyncState  # noqa: E402
+from src import calendarSync  # noqa: E402
+
+
+def make_event(event_id, start, end, **fields):
+    return {"id": event_id, "start": {"dateTime": start},
+            "end": {"dateTime": end}, **fields}
+
+
+class TestCalendarSync(unittest.TestCase):
+    """
+    Unit tests for the local calendar mirror.
+    """
+
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        create_tables()
+        self.service = MagicMock()
+        self.execute = self.service.events.return_value.list.return_value \
+            .execute
+
+    def tearDown(self):
+        drop_tables()
+        self.context.pop()
+
+    def list_calls(self):
+        return [call.kwargs
+                for call in self.service.events.return_value.list.mock_calls
+                if call.kwargs]
+
+    def test_full_sync_pages_and_stores_token(self):
+        """
+        Test that the first sync pages through every event and stores
+        the final sync token.
+        """
+        self.execute.side_effect = [
+            {"items": [make_event("a", "2030-01-01T10:00:00Z",
+                                  "2030-01-01T11:00:00Z")],
+             "nextPageToken": "page_2"},
+            {"items": [make_event("b", "2030-01-02T10:00:00Z",
+                                  "2030-01-02T11:00:00Z")],
+             "nextSyncToken": "token_1"},
+        ]
+
+        self.assertEqual(calendarSync.sync_events(self.service, 1), 2)
+
+        self.assertEqual(CalendarEvent.query.count(), 2)
+        self.assertEqual(db.session.get(CalendarSyncState, 1).sync_token,
+                         "token_1")
+        self.assertNotIn("syncToken", self.list_calls()[0])
+        self.assertEqual(self.list_calls()[1]["pageToken"], "page_2")
+
+    def test_incremental_sync_applies_changes(self):
+        """
+        Test that an incremental sync sends the token, updates changed
+        events and removes cancelled ones.
+        """
+        self.execute.side_effect = [
+            {"items": [make_event("a", "2030-01-01T10:00:00Z",
+                                  "2030-01-01T11:00:00Z"),
+                       make_event("b", "2030-01-02T10:00:00Z",
+                                  "2030-01-02T11:00:00Z")],
+             "nextSyncToken": "token_1"},
+            {"items": [make_event("a", "2030-01-03T10:00:00Z",
+                                  "2030-01-03T11:00:00Z",
+                                  summary="Moved"),
+                       {"id": "b", "status": "cancelled"}],
+             "nextSyncToken": "token_2"},
+        ]
+
+        calendarSync.sync_events(self.service, 1)
+        calendarSync.sync_events(self.service, 1)
+
+        self.assertEqual(self.list_calls()[1]["syncToken"], "token_1")
+        events = calendarSync.events_between(1)
+        self.assertEqual([event["summary"] for event in events], ["Moved"])
+        self.assertEqual(db.session.get(CalendarSyncState, 1).sync_token,
+                         "token_2")
+
+    def test_expired_token_triggers_full_resync(self):
+        """
+        Test that a 410 Gone response clears the mirror and re-syncs.
+        """
+        db.session.add(CalendarSyncState(user_id=1, sync_token="expired"))
+        db.session.add(CalendarEvent(user_id=1, event_id="stale",
+                                     data={"id": "stale"}))
+        db.session.commit()
+        self.execute.side_effect = [
+            HttpError(httplib2.Response({"status": 410}), b"Gone"),
+            {"items": [make_event("fresh", "2030-01-01T10:00:00Z",
+                                  "2030-01-01T11:00:00Z")],
+             "nextSyncToken": "token_1"},
+        ]
+
+        calendarSync.sync_events(self.service, 1)
+
+        self.assertEqual([event["id"]
+                          for event in calendarSync.events_between(1)],
+                         ["fresh"])
+        self.assertNotIn("syncToken", self.list_calls()[1])
+
+    def test_sync_if_stale_skips_fresh_mirror(self):
+        """
+        Test that a recently synced mirror is served without calling
+        Google.
+        """
+        self.execute.return_value = {"items": [], "nextSyncToken": "t"}
+        get_service = MagicMock(return_value=self.service)
+
+        calendarSync.sync_if_stale(get_service, 1, lambda service: "UTC")
+        calendarSync.sync_if_stale(get_service, 1, lambda service: "UTC")
+
+        get_service.assert_called_once()
+
+    def test_sync_waits_for_concurrent_sync(self):
+        """
+        Test that a request finding its mirror stale waits for a sync of
+        the same user already running elsewhere instead of racing it, and
+        that the user's lock is dropped once nobody holds it.
+        """
+        get_service = MagicMock(return_value=self.service)
+        holding, release = threading.Event(), threading.Event()
+        results = []
+
+        def background_sync():
+            with calendarSync.sync_locks.hold(1):
+                holding.set()
+                release.wait(5)
+
+        def request_sync():
+            with app.app_context():
+                results.append(calendarSync.sync_if_stale(
+                    get_service, 1, lambda service: "UTC"))
+
+        background = threading.Thread(target=background_sync)
+        background.start()
+        holding.wait(5)
+        request = threading.Thread(target=request_sync)
+        request.start()
+        request.join(0.2)
+        self.assertTrue(request.is_alive())
+
+        # The background sync refreshes the mirror before releasing
+        db.session.add(CalendarSyncState(
+            user_id=1, sync_token="t", last_synced_at=calendarSync._utcnow()))
+        db.session.commit()
+        release.set()
+        background.join(5)
+        request.join(5)
+
+        self.assertEqual(results, [0])
+        get_service.assert_not_called()
+        self.assertEqual(len(calendarSync.sync_locks), 0)
+
+    def test_first_sync_loses_race_to_another_process(self):
+        """
+        Test that a first sync whose state row was created by another
+        process meanwhile uses that row instead of failing.
+        """
+        db.session.add(CalendarSyncState(user_id=1, sync_token="theirs"))
+        db.session.commit()
+        db.session.expunge_all()
+        self.execute.return_value = {"items": [], "nextSyncToken": "ours"}
+
+        # The other process's row is not visible when first looked up
+        with patch("sqlalchemy.orm.Query.one_or_none", return_value=None):
+            calendarSync.sync_events(self.service, 1)
+
+        self.assertEqual(self.list_calls()[0]["syncToken"], "theirs")
+        self.assertEqual(CalendarSyncState.query.one().sync_token, "ours")
+
+    def test_unknown_all_day_timezone_falls_back(self):
+        """
+        Test that an all-day event in an unknown timezone is anchored to
+        the user's timezone, or to UTC if that is unknown too.
+        """
+        when = {"date": "2030-01-01", "timeZone": "Not/AZone"}
+        self.assertEqual(
+            calendarSync.parse_event_time(when, "America/New_York"),
+            datetime(2030, 1, 1, 5))
+        self.assertEqual(calendarSync.parse_event_time(when, "Nowhere"),
+                         datetime(2030, 1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
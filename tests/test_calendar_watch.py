@@ -0,0 +1,244 @@
+"""
+test_calendar_watch.py
+
+Unit tests for Google Calendar push-notification ingestion.
+
+These tests drive the watch channel lifecycle against a mocked Calendar
+service and a local stand-in for Google that posts notifications to the
+webhook, checking that only genuine notifications trigger a sync and that
+bursts of them are coalesced.
+"""
+
+import unittest
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import (  # noqa: E402
+    app, db, CalendarEvent, CalendarSyncState, CalendarWatchChannel, User)
+from src import calendarGoogle, calendarWatch  # noqa: E402
+from src.dataVersions import get_versions  # noqa: E402
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class FakeGoogle:
+    """
+    Local stand-in for Google Calendar: accepts watch requests, serves
+    incremental syncs and posts notifications to the webhook.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.service = MagicMock()
+        self.service.events.return_value.watch.side_effect = self.watch
+        self.list = self.service.events.return_value.list
+        self.list.return_value.execute.return_value = {
+            "items": [], "nextSyncToken": "token"}
+        self.stopped = []
+        self.service.channels.return_value.stop.side_effect = \
+            lambda body: self.stopped.append(body["id"]) or MagicMock()
+        self.messages = 0
+
+    def watch(self, calendarId, body):
+        self.channel = body
+        expiration = utcnow() + timedelta(seconds=int(body["params"]["ttl"]))
+        result = MagicMock()
+        result.execute.return_value = {
+            "id": body["id"],
+            "resourceId": "resource-" + body["id"],
+            "expiration": str(int(expiration.replace(
+                tzinfo=timezone.utc).timestamp() * 1000)),
+        }
+        return result
+
+    def notify(self, state="exists", **overrides):
+        """
+        Post a notification for the last opened channel to the webhook.
+        """
+        self.messages += 1
+        headers = {
+            "X-Goog-Channel-ID": self.channel["id"],
+            "X-Goog-Resource-ID": "resource-" + self.channel["id"],
+            "X-Goog-Channel-Token": self.channel["token"],
+            "X-Goog-Resource-State": state,
+            "X-Goog-Message-Number": str(self.messages),
+        }
+        headers.update(overrides)
+        return self.client.post("/api/calendar/notifications",
+                                headers=headers)
+
+
+class TestCalendarWatch(unittest.TestCase):
+    """
+    Unit tests for watch channels and the notification webhook.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        create_tables()
+        user = User(google_id="watch_google_id", name="Test User")
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+        self.google = FakeGoogle(self.client)
+        patch("src.calendarWatch.WEBHOOK_URL",
+              "https://example.com/api/calendar/notifications").start()
+        patch("src.calendarGoogle.stored_calendar_service",
+              return_value=self.google.service).start()
+        self.queue = calendarWatch.SyncQueue(max_workers=1)
+        patch("src.calendarWatch.sync_queue", self.queue).start()
+
+    def tearDown(self):
+        patch.stopall()
+        self.queue._executor.shutdown(wait=True)
+        drop_tables()
+        self.context.pop()
+
+    def watch(self):
+        return calendarWatch.watch_events(self.google.service, self.user_id,
+                                          "America/Los_Angeles")
+
+    def test_watch_stores_channel(self):
+        """
+        Test that opening a channel records what Google returned.
+        """
+        channel = self.watch()
+        self.assertEqual(self.google.channel["address"],
+                         calendarWatch.WEBHOOK_URL)
+        self.assertEqual(self.google.channel["token"], channel.token)
+        self.assertEqual(channel.resource_id, "resource-" + channel.channel_id)
+        self.assertTrue(calendarWatch.is_active(channel))
+        self.assertFalse(calendarWatch.needs_renewal(channel))
+
+    def test_renewal_replaces_and_stops_old_channel(self):
+        """
+        Test that a channel near expiry is replaced and the old one
+        stopped.
+        """
+        old = self.watch()
+        old_id = old.channel_id
+        old.expiration = utcnow() + timedelta(hours=1)
+        db.session.commit()
+        get_service = MagicMock(return_value=self.google.service)
+
+        channel = calendarWatch.ensure_watch(get_service, self.user_id)
+
+        self.assertNotEqual(channel.channel_id, old_id)
+        self.assertEqual(self.google.stopped, [old_id])
+        self.assertEqual(CalendarWatchChannel.query.count(), 1)
+        self.assertEqual(calendarWatch.channels_to_renew(), [])
+
+        calendarWatch.ensure_watch(get_service, self.user_id)
+        self.assertEqual(get_service.call_count, 1)
+
+    def test_disabled_without_webhook_url(self):
+        """
+        Test that no channel is opened when no webhook is configured.
+        """
+        get_service = MagicMock()
+        with patch("src.calendarWatch.WEBHOOK_URL", None):
+            self.assertIsNone(
+                calendarWatch.ensure_watch(get_service, self.user_id))
+        get_service.assert_not_called()
+
+    def test_notification_triggers_incremental_sync(self):
+        """
+        Test that a notification syncs the mirror and bumps the version.
+        """
+        self.watch()
+        self.google.list.return_value.execute.return_value = {
+            "items": [{"id": "a", "summary": "Interview",
+                       "start": {"dateTime": "2030-01-01T10:00:00Z"},
+                       "end": {"dateTime": "2030-01-01T11:00:00Z"}}],
+            "nextSyncToken": "token_2",
+        }
+
+        response = self.google.notify()
+        self.queue._executor.shutdown(wait=True)
+
+        self.assertEqual(response.status_code, 204)
+        db.session.expire_all()
+        self.assertEqual(CalendarEvent.query.count(), 1)
+        self.assertEqual(db.session.get(CalendarSyncState,
+                                        self.user_id).sync_token, "token_2")
+        self.assertEqual(get_versions(self.user_id, ["calendar"]),
+                         {"calendar": 1})
+        self.assertEqual(
+            self.google.list.call_args.kwargs["timeZone"],
+            "America/Los_Angeles")
+
+    def test_forged_notifications_rejected(self):
+        """
+        Test that notifications with a wrong token or channel are ignored.
+        """
+        self.watch()
+        wrong_token = self.google.notify(**{"X-Goog-Channel-Token": "nope"})
+        unknown = self.google.notify(**{"X-Goog-Channel-ID": "unknown"})
+        self.queue._executor.shutdown(wait=True)
+
+        self.assertEqual(wrong_token.status_code, 404)
+        self.assertEqual(unknown.status_code, 404)
+        self.google.list.assert_not_called()
+
+    def test_notification_burst_is_coalesced(self):
+        """
+        Test that notifications arriving while a sync is queued do not
+        queue more syncs.
+        """
+        self.watch()
+        release = threading.Event()
+        self.queue.schedule(0, lambda user_id: release.wait(5))
+
+        for _ in range(5):
+            self.google.notify()
+        release.set()
+        self.queue._executor.shutdown(wait=True)
+
+        self.assertEqual(self.google.list.call_count, 1)
+
+    def test_watched_mirror_polls_less(self):
+        """
+        Test that an actively watched mirror is not re-synced on the
+        normal polling interval.
+        """
+        self.watch()
+        db.session.add(CalendarSyncState(
+            user_id=self.user_id, sync_token="token",
+            last_synced_at=utcnow() - timedelta(minutes=5)))
+        db.session.commit()
+
+        with app.test_request_context(), \
+                patch("src.calendarGoogle.get_calendar_service",
+                      return_value=self.google.service) as get:
+            from flask import session
+
+            session["user_id"] = self.user_id
+            session["id_google"] = "watch_google_id"
+            calendarGoogle.sync_user_events()
+            get.assert_not_called()
+
+            db.session.delete(calendarWatch.get_channel(self.user_id))
+            db.session.commit()
+            with patch("src.calendarWatch.WEBHOOK_URL", None), \
+                    patch("src.calendarGoogle.get_user_timezone",
+                          return_value="UTC"):
+                calendarGoogle.sync_user_events()
+            get.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
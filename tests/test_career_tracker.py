@@ -1,14 +1,20 @@
 import unittest
+import json
 import os
 import sys
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from unittest.mock import patch, MagicMock
 
 sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
 )
 
-from src.app import app  # noqa: E402
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import (  # noqa: E402
+    app, db, Internship, InternshipStatusCount, serialize_rows,
+)
+from src import internshipStats  # noqa: E402
 
 
 class TestInternshipAPI(unittest.TestCase):
@@ -51,6 +57,23 @@ class TestInternshipAPI(unittest.TestCase):
             "salary": None,
             "internshipDuration": None,
         }
+        # The same internship as returned by a column-projected query
+        self.mock_row = (1, "Test Company", "Software Engineer Intern",
+                         "Applied", date(2024, 1, 1), None, None, None,
+                         None, None, False, None, None, None, None,
+                         Decimal("5000.00"), None)
+        self.expected_row = {
+            **self.mock_internship.to_dict.return_value,
+            "internshipId": 1,
+            "dateApplied": "2024-01-01",
+            "referral": False,
+            "salary": "5000.00",
+            # Optional text and dates are serialized empty, not null
+            **{name: "" for name in (
+                "followUpDate", "applicationLink", "startDate",
+                "contactPerson", "contactEmail", "offerDeadline", "notes",
+                "location", "internshipDuration")},
+        }
 
     def tearDown(self):
         """
@@ -79,7 +102,7 @@ class TestInternshipAPI(unittest.TestCase):
 
         # Mock the user's internships
         mock_query.return_value.filter_by.return_value.all.return_value = [
-            self.mock_internship
+            self.mock_row
         ]
 
         mock_render_template.return_value = (
@@ -92,7 +115,7 @@ class TestInternshipAPI(unittest.TestCase):
         # Verify render_template was called with the correct data
         mock_render_template.assert_called_with(
             "InternshipTracker.html",
-            internship_data=[self.mock_internship.to_dict()]
+            internship_data=[self.expected_row]
         )
 
     @patch("src.app.db.session.query")
@@ -107,14 +130,14 @@ class TestInternshipAPI(unittest.TestCase):
 
         # Mock the user's internships
         mock_query.return_value.filter_by.return_value.all.return_value = [
-            self.mock_internship
+            self.mock_row
         ]
 
         response = self.client.get("/internshipData")
         self.assertEqual(response.status_code, 200)
 
         # Verify the JSON response contains the expected data
-        self.assertEqual(response.json, [self.mock_internship.to_dict()])
+        self.assertEqual(response.json, [self.expected_row])
 
     @patch("src.app.db.session.add")
     @patch("src.app.db.session.commit")
@@ -196,12 +219,407 @@ class TestInternshipAPI(unittest.TestCase):
         self.mock_internship.follow_up_date = str(today)
         mock_filter_by = mock_query.return_value.filter_by.return_value
         mock_filter = mock_filter_by.filter.return_value
-        mock_filter.all.return_value = [self.mock_internship]
+        mock_filter.all.return_value = [self.mock_row]
 
         response = self.client.get("/api/internships/today")
         self.assertEqual(response.status_code, 200)
         self.assertIn("Test Company", response.json[0]["companyName"])
 
 
+class TestInternshipListing(unittest.TestCase):
+    """
+    Tests for the paginated internship listing, run against an in-memory
+    SQLite database.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            start = date(2024, 1, 1)
+            db.session.add_all([
+                Internship(user_id=1, company_name=f"Company {i}",
+                           position_title="Intern",
+                           application_status="Offer" if i % 3 == 0
+                           else "Applied",
+                           date_applied=start + timedelta(days=i // 2)
+                           if i < 8 else None)
+                for i in range(10)
+            ] + [
+                Internship(user_id=2, company_name="Other User",
+                           position_title="Intern",
+                           application_status="Applied"),
+            ])
+            db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["id_google"] = "mock_google_id"
+
+    def tearDown(self):
+        with app.app_context():
+            drop_tables()
+
+    def test_pages_cover_every_row_once(self):
+        """
+        Test that following cursors visits each internship exactly once,
+        newest application first with undated ones last.
+        """
+        seen = []
+        url = "/api/internships?limit=3&fields=internshipId,dateApplied"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += response.json["data"]
+            cursor = response.json["nextCursor"]
+            url = cursor and ("/api/internships?limit=3&fields=internshipId,"
+                              f"dateApplied&cursor={cursor}")
+
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(len({row["internshipId"] for row in seen}), 10)
+        dated = [row["dateApplied"] for row in seen if row["dateApplied"]]
+        self.assertEqual(dated, sorted(dated, reverse=True))
+        self.assertEqual([row["dateApplied"] for row in seen[-2:]],
+                         ["", ""])
+
+    def test_filters_and_projection(self):
+        """
+        Test status and company-prefix filters and the fields projection.
+        """
+        response = self.client.get(
+            "/api/internships?status=Offer&company=Company&fields=companyName")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(row["companyName"] for row in response.json["data"]),
+            ["Company 0", "Company 3", "Company 6", "Company 9"])
+        self.assertEqual(set(response.json["data"][0]), {"companyName"})
+
+    def test_date_range_filter(self):
+        """
+        Test filtering by application date range.
+        """
+        response = self.client.get(
+            "/api/internships?applied_after=2024-01-02"
+            "&applied_before=2024-01-03&fields=internshipId")
+        self.assertEqual(len(response.json["data"]), 4)
+
+    def test_serialize_rows_handles_nulls_dates_and_decimals(self):
+        """
+        Test that dates and decimals become strings, and that nulls become
+        empty strings for text and dates and stay null otherwise.
+        """
+        row = ("prefix", 1, date(2024, 1, 1), None, None, None,
+               Decimal("12.50"))
+        self.assertEqual(
+            serialize_rows([row], ["internshipId", "dateApplied",
+                                   "followUpDate", "notes", "referral",
+                                   "salary"], offset=1),
+            [{"internshipId": 1, "dateApplied": "2024-01-01",
+              "followUpDate": "", "notes": "", "referral": None,
+              "salary": "12.50"}])
+
+    def test_to_dict_matches_projected_rows(self):
+        """
+        Test that Internship.to_dict uses the same representation.
+        """
+        internship = Internship(internship_id=1, company_name="Company",
+                                date_applied=date(2024, 1, 1))
+        self.assertEqual(internship.to_dict()["internshipId"], 1)
+        self.assertEqual(internship.to_dict()["dateApplied"], "2024-01-01")
+        self.assertEqual(internship.to_dict()["notes"], "")
+
+    def test_invalid_parameters(self):
+        """
+        Test that unknown fields and malformed cursors are rejected.
+        """
+        self.assertEqual(
+            self.client.get("/api/internships?fields=password").status_code,
+            400)
+        self.assertEqual(
+            self.client.get("/api/internships?cursor=bogus").status_code,
+            400)
+
+
+class TestInternshipImportExport(unittest.TestCase):
+    """
+    Tests for bulk internship import and streaming export, run against an
+    in-memory SQLite database.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["id_google"] = "mock_google_id"
+
+    def tearDown(self):
+        with app.app_context():
+            drop_tables()
+
+    def count(self):
+        with app.app_context():
+            return Internship.query.filter_by(user_id=1).count()
+
+    def test_csv_import_reports_row_errors(self):
+        """
+        Test that valid CSV rows are imported and invalid ones reported
+        with their line numbers.
+        """
+        body = (
+            "company_name,position_title,date_applied,referral,salary\n"
+            "Acme,Intern,2024-01-01,yes,5000\n"
+            ",Intern,2024-01-02,no,\n"
+            "Globex,Intern,not-a-date,no,\n"
+            "Initech,Intern,,,\n"
+        )
+        with patch("src.app.IMPORT_BATCH_SIZE", 1):
+            response = self.client.post("/api/internships/import",
+                                        data=body,
+                                        content_type="text/csv")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["imported"], 2)
+        self.assertEqual([error["line"] for error in response.json["errors"]],
+                         [3, 4])
+        self.assertEqual(self.count(), 2)
+
+    def test_ndjson_round_trip(self):
+        """
+        Test that an NDJSON export can be imported again unchanged.
+        """
+        body = "\n".join([
+            json.dumps({"companyName": f"Company {i}",
+                        "positionTitle": "Intern",
+                        "applicationStatus": "Offer",
+                        "offerReceived": True,
+                        "salary": "12.50"})
+            for i in range(5)
+        ] + ["{not json"])
+        response = self.client.post("/api/internships/import?format=ndjson",
+                                    data=body)
+        self.assertEqual(response.json["imported"], 5)
+        self.assertEqual(response.json["failed"], 1)
+
+        with patch("src.app.EXPORT_BATCH_SIZE", 2):
+            export = self.client.get("/api/internships/export?format=ndjson")
+        records = [json.loads(line)
+                   for line in export.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertTrue(all(record["offerReceived"] for record in records))
+        self.assertEqual(records[0]["salary"], "12.50")
+
+        response = self.client.post("/api/internships/import?format=ndjson",
+                                    data=export.get_data())
+        self.assertEqual(response.json["imported"], 5)
+        self.assertEqual(self.count(), 10)
+
+    def test_csv_export(self):
+        """
+        Test that the CSV export has a header and one line per row.
+        """
+        self.client.post("/api/internships/import",
+                         data="company_name,position_title\nAcme,Intern\n",
+                         content_type="text/csv")
+        export = self.client.get("/api/internships/export")
+        self.assertEqual(export.mimetype, "text/csv")
+        lines = export.get_data(as_text=True).splitlines()
+        self.assertTrue(lines[0].startswith("internshipId,companyName"))
+        self.assertEqual(len(lines), 2)
+
+    def test_import_requires_known_format(self):
+        """
+        Test that bodies which are neither CSV nor NDJSON are rejected.
+        """
+        response = self.client.post("/api/internships/import", data="x",
+                                    content_type="text/plain")
+        self.assertEqual(response.status_code, 415)
+
+
+class TestInternshipStats(unittest.TestCase):
+    """
+    Tests for the pipeline statistics and the status counts behind them,
+    run against an in-memory SQLite database.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["id_google"] = "mock_google_id"
+
+    def tearDown(self):
+        with app.app_context():
+            drop_tables()
+
+    def add(self, **fields):
+        response = self.client.post("/api/internships", json={
+            "company_name": "Acme", "position_title": "Intern", **fields})
+        self.assertEqual(response.status_code, 201)
+        return response.json["internship_id"]
+
+    def stored_counts(self):
+        with app.app_context():
+            return {
+                row.application_status: (row.applications, row.offers)
+                for row in InternshipStatusCount.query.filter_by(user_id=1)
+            }
+
+    def recounted(self):
+        with app.app_context():
+            internshipStats.rebuild(1)
+            counts = self.stored_counts()
+            db.session.rollback()
+        return counts
+
+    def test_writes_keep_counts_current(self):
+        """
+        Test that adding, updating, deleting and importing internships
+        keep the stored counts equal to a recount.
+        """
+        first = self.add()
+        second = self.add(application_status="Interview")
+        self.add(application_status="Offered")
+        self.client.put(f"/api/internships/{second}",
+                        json={"application_status": "Rejected"})
+        self.client.put(f"/api/internships/{first}",
+                        json={"offer_received": True})
+        self.client.delete(f"/api/internships/{first}")
+        self.client.post(
+            "/api/internships/import",
+            data="company_name,position_title,application_status\n"
+                 "Globex,Intern,Interview\nInitech,Intern,Offered\n",
+            content_type="text/csv")
+
+        counts = {status: counts for status, counts
+                  in self.stored_counts().items() if counts[0]}
+        self.assertEqual(counts, {"Interview": (1, 0), "Offered": (2, 2),
+                                  "Rejected": (1, 0)})
+        self.assertEqual(self.stored_counts(), {
+            **{status: (0, 0) for status in self.stored_counts()},
+            **self.recounted()})
+
+    def seed_untracked(self):
+        # Internships written before their statuses were counted
+        with app.app_context():
+            db.session.add_all(
+                Internship(user_id=1, company_name=f"Company {i}",
+                           position_title="Intern",
+                           application_status=status)
+                for i, status in enumerate(
+                    ["Applied", "Applied", "Applied", "Interview"]))
+            db.session.commit()
+
+    def test_missing_counts_are_recounted(self):
+        """
+        Test that a user's first write counts every status, including
+        internships written before the counts existed.
+        """
+        self.seed_untracked()
+        self.add()
+        self.assertEqual(self.stored_counts(),
+                         {"Applied": (4, 0), "Interview": (1, 0)})
+        self.add(application_status="Offered")
+        self.assertEqual(self.stored_counts(), self.recounted())
+
+    def test_stats_counted_on_read_before_first_write(self):
+        """
+        Test that users without stored counts get complete stats.
+        """
+        self.seed_untracked()
+        response = self.client.get("/api/internships/stats")
+        self.assertEqual(response.json["total"], 4)
+        self.assertEqual(response.json["byStatus"],
+                         {"Applied": 3, "Interview": 1})
+        self.assertEqual(self.stored_counts(), {})
+
+    def test_offer_status_matches_tracker_form(self):
+        """
+        Test that the offer status is one the tracker form submits.
+        """
+        with open(os.path.join(os.path.dirname(__file__), "..",
+                               "templates", "InternshipTracker.html")) as f:
+            self.assertIn(f'<option value="{internshipStats.OFFER_STATUS}">',
+                          f.read())
+
+    def test_stats(self):
+        """
+        Test counts by status, the offer rate, applications per week and
+        upcoming deadlines.
+        """
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+        records = [
+            {"dateApplied": today},
+            {"dateApplied": monday,
+             "followUpDate": today + timedelta(days=3)},
+            {"applicationStatus": "Offered",
+             "dateApplied": monday - timedelta(days=7),
+             "offerDeadline": today + timedelta(days=1)},
+            {"dateApplied": monday - timedelta(weeks=20),
+             "followUpDate": today + timedelta(days=30)},
+        ]
+        # The import parses dates, which SQLite needs as date objects
+        body = "\n".join(
+            json.dumps({"companyName": "Acme", "positionTitle": "Intern",
+                        **record}, default=date.isoformat)
+            for record in records)
+        self.client.post("/api/internships/import?format=ndjson", data=body)
+
+        response = self.client.get("/api/internships/stats?weeks=4")
+        self.assertEqual(response.status_code, 200)
+        stats = response.json
+        self.assertEqual(stats["total"], 4)
+        self.assertEqual(stats["byStatus"], {"Applied": 3, "Offered": 1})
+        self.assertEqual(stats["offerRate"], 0.25)
+        self.assertEqual(
+            [week["count"] for week in stats["applicationsPerWeek"]],
+            [0, 0, 1, 2])
+        self.assertEqual(stats["applicationsPerWeek"][-1]["weekStart"],
+                         monday.isoformat())
+        self.assertEqual(
+            [(deadline["kind"], deadline["date"])
+             for deadline in stats["upcomingDeadlines"]],
+            [("offerDeadline", (today + timedelta(days=1)).isoformat()),
+             ("followUp", (today + timedelta(days=3)).isoformat())])
+
+    def test_stats_without_internships(self):
+        """
+        Test that a user without internships has no offer rate.
+        """
+        response = self.client.get("/api/internships/stats")
+        self.assertEqual(response.json["total"], 0)
+        self.assertIsNone(response.json["offerRate"])
+        self.assertEqual(len(response.json["applicationsPerWeek"]), 12)
+        self.assertEqual(
+            self.client.get("/api/internships/stats?weeks=x").status_code,
+            400)
+
+    def test_rebuild_command(self):
+        """
+        Test that the rebuild command recounts every user.
+        """
+        with app.app_context():
+            db.session.add_all([
+                Internship(user_id=1, company_name="Acme",
+                           position_title="Intern",
+                           application_status="Applied",
+                           offer_received=True),
+                Internship(user_id=2, company_name="Globex",
+                           position_title="Intern",
+                           application_status="Interview"),
+            ])
+            db.session.commit()
+        result = app.test_cli_runner().invoke(
+            args=["rebuild-internship-stats"])
+        self.assertIn("Rebuilt 2 internship status counts", result.output)
+        self.assertEqual(self.stored_counts(), {"Applied": (1, 1)})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,220 @@
+"""
+test_change_feed.py
+
+Unit tests for the per-user change feed.
+
+This file contains tests for publishing and replaying changes through the
+broker, and for the Server-Sent Events stream the frontend listens to.
+"""
+
+import unittest
+import json
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, User  # noqa: E402
+from src.changeFeed import Broker, LocalPubSub  # noqa: E402
+
+
+def parse_event(message):
+    """
+    Parse one Server-Sent Events message into its fields.
+    """
+    fields = {}
+    for line in message.decode().strip().split("\n"):
+        name, _, value = line.partition(": ")
+        fields[name] = value
+    if "data" in fields:
+        fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+class TestBroker(unittest.TestCase):
+    """
+    Unit tests for publishing, replaying and listening to changes.
+    """
+
+    def setUp(self):
+        self.broker = Broker(LocalPubSub(), history=3)
+
+    def publish(self, user_id, op="created"):
+        return self.broker.publish(user_id, {"type": "todos", "op": op})
+
+    def test_ids_are_per_user(self):
+        """
+        Test that each user's changes are numbered separately.
+        """
+        self.assertEqual(self.publish(1)["id"], 1)
+        self.assertEqual(self.publish(1)["id"], 2)
+        self.assertEqual(self.publish(2)["id"], 1)
+
+    def test_replay_missed_changes(self):
+        """
+        Test that only changes after the last seen id are replayed.
+        """
+        for _ in range(3):
+            self.publish(1)
+        self.assertEqual([c["id"] for c in self.broker.replay(1, 1)], [2, 3])
+        self.assertEqual(self.broker.replay(1, 3), [])
+
+    def test_replay_gap_requires_reload(self):
+        """
+        Test that a client that missed more than the history must reload.
+        """
+        for _ in range(5):
+            self.publish(1)
+        self.assertIsNone(self.broker.replay(1, 1))
+        self.assertEqual(len(self.broker.replay(1, 2)), 3)
+
+    def test_replay_after_reset_requires_reload(self):
+        """
+        Test that ids ahead of the broker, as after a restart, reload.
+        """
+        self.assertIsNone(self.broker.replay(1, 7))
+        self.publish(1)
+        self.assertIsNone(self.broker.replay(1, 7))
+        self.assertEqual(self.broker.replay(2, 0), [])
+
+    def test_listen_replays_then_streams(self):
+        """
+        Test that a listener first gets missed changes, then live ones.
+        """
+        self.publish(1)
+        self.publish(1)
+        changes = self.broker.listen(1, last_id=1, heartbeat=0.01)
+        self.assertEqual(next(changes)["id"], 2)
+        self.assertIsNone(next(changes))
+        self.publish(1, op="deleted")
+        self.publish(2)
+        self.assertEqual(next(changes)["op"], "deleted")
+        changes.close()
+        self.assertEqual(self.broker.client.publish("changes:1", "{}"), 0)
+
+    def test_listen_sends_reload_on_gap(self):
+        """
+        Test that a listener too far behind is told to reload.
+        """
+        for _ in range(5):
+            self.publish(1)
+        changes = self.broker.listen(1, last_id=0, heartbeat=0.01)
+        self.assertEqual(next(changes)["op"], "reload")
+        self.publish(1)
+        self.assertEqual(next(changes)["id"], 6)
+        changes.close()
+
+
+class TestChangeStream(unittest.TestCase):
+    """
+    Unit tests for GET /api/changes/stream and the changes writes publish.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            user = User(google_id="changes_google_id", name="Test User")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        with self.client.session_transaction() as session:
+            session["user_id"] = self.user_id
+            session["id_google"] = "changes_google_id"
+
+        self.broker = Broker(LocalPubSub())
+        patch("src.changeFeed.broker", self.broker).start()
+
+    def tearDown(self):
+        patch.stopall()
+        with app.app_context():
+            drop_tables()
+
+    def test_writes_publish_changes(self):
+        """
+        Test that todo and internship writes publish their deltas.
+        """
+        todo = self.client.post("/api/todos", json={"category": "Today",
+                                                    "task": "Apply"}).json
+        self.client.delete(f"/api/todos/{todo['id']}")
+        self.client.post("/api/internships", json={
+            "company_name": "Company", "position_title": "Intern"})
+
+        changes = self.broker.replay(self.user_id, 0)
+        self.assertEqual([(c["type"], c["op"]) for c in changes], [
+            ("todos", "created"), ("todos", "deleted"),
+            ("internships", "created")])
+        self.assertEqual(changes[0]["data"], todo)
+        self.assertEqual(changes[1]["data"], {"id": todo["id"]})
+        self.assertEqual(changes[2]["data"]["companyName"], "Company")
+
+    def test_rejected_write_publishes_nothing(self):
+        """
+        Test that an invalid write does not notify clients.
+        """
+        self.client.post("/api/todos", json={})
+        self.assertEqual(self.broker.replay(self.user_id, 0), [])
+
+    def test_publish_failure_keeps_the_write(self):
+        """
+        Test that a broker failure does not fail a committed write.
+        """
+        with patch.object(self.broker, "publish",
+                          side_effect=ConnectionError("broker down")), \
+                self.assertLogs("src.changeFeed", level="ERROR"):
+            response = self.client.post("/api/todos", json={
+                "category": "Today", "task": "Apply"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.client.get("/api/todos").json["todos"]), 1)
+
+    def test_stream_resumes_from_last_event_id(self):
+        """
+        Test that the stream replays changes after Last-Event-ID.
+        """
+        self.client.post("/api/todos", json={"category": "Today",
+                                             "task": "First"})
+        self.client.post("/api/todos", json={"category": "Today",
+                                             "task": "Second"})
+
+        response = self.client.get("/api/changes/stream",
+                                   headers={"Last-Event-ID": "1"},
+                                   buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        messages = response.response
+        event = parse_event(next(messages))
+        response.close()
+
+        self.assertEqual(event["id"], "2")
+        self.assertEqual(event["event"], "change")
+        self.assertEqual(event["data"]["data"]["task"], "Second")
+
+    def test_stream_keep_alive(self):
+        """
+        Test that an idle stream sends keep-alive comments.
+        """
+        with patch("src.changeFeed.CHANGE_FEED_HEARTBEAT", 0.01):
+            response = self.client.get("/api/changes/stream",
+                                       buffered=False)
+            message = next(response.response)
+            response.close()
+        self.assertEqual(message, b": keep-alive\n\n")
+
+    def test_stream_requires_login(self):
+        """
+        Test that the stream is not served without a session.
+        """
+        with self.client.session_transaction() as session:
+            session.clear()
+        response = self.client.get("/api/changes/stream")
+        self.assertNotEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+test_dashboard.py
+
+Unit tests for the aggregated dashboard endpoint.
+
+This file contains tests checking that `/api/dashboard` combines today's
+events, today's internships and the user's todos, loads them in parallel
+and still answers when one section fails or is slow.
+"""
+
+import unittest
+import os
+import sys
+import time
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from flask import session  # noqa: E402
+from src.app import app, db, Internship, Todo, User  # noqa: E402
+from src.calendarCache import event_cache  # noqa: E402
+from src.calendarGoogle import todays_events_loader  # noqa: E402
+
+
+def slow(result, delay=0.3):
+    def loader(*args):
+        time.sleep(delay)
+        return result
+
+    return loader
+
+
+class TestDashboard(unittest.TestCase):
+    """
+    Unit tests for GET /api/dashboard.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            user = User(google_id="dashboard_google_id", name="Test User")
+            db.session.add(user)
+            db.session.commit()
+            db.session.add_all([
+                Internship(user_id=user.id, company_name="Company",
+                           position_title="Intern",
+                           application_status="Applied",
+                           date_applied=date.today(),
+                           follow_up_date=date.today()),
+                Todo(user_id=user.id, task_text="Send thank-you note",
+                     category="Today"),
+            ])
+            db.session.commit()
+            user_id = self.user_id = user.id
+
+        with self.client.session_transaction() as session:
+            session["user_id"] = user_id
+            session["id_google"] = "dashboard_google_id"
+
+        self.events = MagicMock(return_value=[{"id": "event"}])
+        patch("src.app.todays_events_loader",
+              return_value=self.events).start()
+
+    def tearDown(self):
+        patch.stopall()
+        with app.app_context():
+            drop_tables()
+
+    def test_sections_combined(self):
+        """
+        Test that all three sections are returned with their timings.
+        """
+        response = self.client.get("/api/dashboard")
+        self.assertEqual(response.status_code, 200)
+        data = response.json
+        self.assertEqual(data["events"], [{"id": "event"}])
+        self.assertEqual([i["companyName"] for i in data["internships"]],
+                         ["Company"])
+        self.assertEqual([todo["task"] for todo in data["todos"]],
+                         ["Send thank-you note"])
+        self.assertEqual(set(data["timings"]),
+                         {"events", "internships", "todos"})
+        self.assertEqual(data["errors"], {})
+
+    def test_partial_failure(self):
+        """
+        Test that a failing section is reported without hiding the rest.
+        """
+        self.events.side_effect = Exception("Google unavailable")
+        data = self.client.get("/api/dashboard").json
+        self.assertIsNone(data["events"])
+        self.assertEqual(data["errors"], {"events": "Google unavailable"})
+        self.assertEqual(len(data["todos"]), 1)
+
+    def test_sections_load_in_parallel(self):
+        """
+        Test that latency is the slowest section, not the sum.
+        """
+        self.events.side_effect = slow([])
+        patch("src.app.todays_internships", side_effect=slow([])).start()
+        patch("src.app.user_todos", side_effect=slow([])).start()
+
+        start = time.perf_counter()
+        response = self.client.get("/api/dashboard")
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 0.6)
+
+    def test_slow_section_times_out(self):
+        """
+        Test that a section slower than the timeout is dropped.
+        """
+        self.events.side_effect = slow([], delay=0.5)
+        with patch("src.app.DASHBOARD_TIMEOUT", 0.1):
+            data = self.client.get("/api/dashboard").json
+        self.assertEqual(data["errors"], {"events": "Timed out"})
+        self.assertEqual(len(data["internships"]), 1)
+
+    def test_events_loader_runs_without_the_session(self):
+        """
+        Test that the events loader reads the session up front, so it
+        never touches it from a dashboard thread.
+        """
+        service = MagicMock()
+        service.events.return_value.list.return_value.execute \
+            .return_value = {"items": [], "nextSyncToken": "token"}
+        event_cache.invalidate("dashboard_google_id")
+        with app.test_request_context():
+            session.update(user_id=self.user_id,
+                           id_google="dashboard_google_id",
+                           access_token="access", refresh_token="refresh",
+                           timezone="UTC", timezone_fetched_at=time.time())
+            loader = todays_events_loader()
+
+        with app.app_context(), \
+                patch("src.calendarGoogle.service_for",
+                      return_value=(None, service)):
+            self.assertEqual(loader(), [])
+        service.events.return_value.list.assert_called_once()
+        self.assertEqual(
+            service.events.return_value.list.call_args.kwargs["timeZone"],
+            "UTC")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+test_data_versions.py
+
+Unit tests for conditional GET support on the JSON read endpoints.
+
+This file contains tests for the per-user version numbers, the ETags built
+from them and the 304 responses served without running the endpoint.
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+from sqlalchemy import event
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, User  # noqa: E402
+from src.dataVersions import bump_version, get_versions  # noqa: E402
+
+
+class TestDataVersions(unittest.TestCase):
+    """
+    Unit tests for ETags and version bumps.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            user = User(google_id="versions_google_id", name="Test User")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+
+        with self.client.session_transaction() as session:
+            session["user_id"] = self.user_id
+            session["id_google"] = "versions_google_id"
+
+    def tearDown(self):
+        with app.app_context():
+            drop_tables()
+
+    def test_versions_are_per_user_and_scope(self):
+        """
+        Test that bumping one scope leaves the others untouched.
+        """
+        with app.app_context():
+            bump_version(self.user_id, "todos")
+            bump_version(self.user_id, "todos")
+            db.session.commit()
+            self.assertEqual(
+                get_versions(self.user_id, ("todos", "internships")),
+                {"todos": 2, "internships": 0})
+            self.assertEqual(get_versions(self.user_id + 1, ("todos",)),
+                             {"todos": 0})
+
+    def test_matching_etag_skips_the_query(self):
+        """
+        Test that a matching If-None-Match gets a 304 without the
+        endpoint running.
+        """
+        first = self.client.get("/api/todos")
+        self.assertEqual(first.status_code, 200)
+        self.assertIsNotNone(first.headers.get("ETag"))
+
+        with patch("src.app.user_todos") as mock_todos:
+            second = self.client.get("/api/todos", headers={
+                "If-None-Match": first.headers["ETag"]})
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b"")
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+        mock_todos.assert_not_called()
+
+    def test_write_changes_the_etag(self):
+        """
+        Test that a successful write invalidates the previous ETag.
+        """
+        etag = self.client.get("/api/todos").headers["ETag"]
+        self.client.post("/api/todos", json={"category": "Today",
+                                             "task": "Apply"})
+
+        response = self.client.get("/api/todos",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(response.json["todos"]), 1)
+
+    def test_bump_commits_with_the_write(self):
+        """
+        Test that a write and its version bump share one transaction.
+        """
+        with app.app_context():
+            engine = db.engine
+        commits = []
+
+        def record_commit(connection):
+            commits.append(connection)
+
+        event.listen(engine, "commit", record_commit)
+        try:
+            self.client.post("/api/todos", json={"category": "Today",
+                                                 "task": "Apply"})
+        finally:
+            event.remove(engine, "commit", record_commit)
+
+        self.assertEqual(len(commits), 1)
+        with app.app_context():
+            self.assertEqual(get_versions(self.user_id, ("todos",)),
+                             {"todos": 1})
+
+    def test_rejected_write_keeps_the_etag(self):
+        """
+        Test that a write rejected with a 4xx does not bump the version.
+        """
+        etag = self.client.get("/api/todos").headers["ETag"]
+        response = self.client.post("/api/todos", json={})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get("/api/todos",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_scopes_are_independent(self):
+        """
+        Test that a todo write does not invalidate internship ETags.
+        """
+        etag = self.client.get("/internshipData").headers["ETag"]
+        self.client.post("/api/todos", json={"category": "Today",
+                                             "task": "Apply"})
+
+        response = self.client.get("/internshipData",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_user_resolved_like_the_routes(self):
+        """
+        Test that sessions without a stored user id get ETags and version
+        bumps for the user the routes resolve from the Google id.
+        """
+        with self.client.session_transaction() as session:
+            del session["user_id"]
+
+        etag = self.client.get("/api/todos").headers.get("ETag")
+        self.assertIsNotNone(etag)
+        self.client.post("/api/todos", json={"category": "Today",
+                                             "task": "Apply"})
+
+        with app.app_context():
+            self.assertEqual(get_versions(self.user_id, ("todos",)),
+                             {"todos": 1})
+        response = self.client.get("/api/todos",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+test_db_pool.py
+
+Unit tests for the database connection pool configuration.
+
+This file contains tests for reading pool settings from the environment
+and for the pool metrics recorded when checkouts overflow, wait for a
+connection or time out.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, exc, text
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+import tests  # noqa: E402, F401
+from src.dbPool import (  # noqa: E402
+    InstrumentedQueuePool, engine_options, pool_stats)
+
+
+class TestEngineOptions(unittest.TestCase):
+    """
+    Unit tests for `engine_options`.
+    """
+
+    def test_defaults(self):
+        """
+        Test the defaults applied to a PostgreSQL database.
+        """
+        options = engine_options("postgresql://user@localhost/firestack", {})
+        self.assertIs(options["poolclass"], InstrumentedQueuePool)
+        self.assertEqual(options["pool_size"], 5)
+        self.assertEqual(options["max_overflow"], 10)
+        self.assertEqual(options["pool_timeout"], 10)
+        self.assertEqual(options["pool_recycle"], 1800)
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual(options["connect_args"],
+                         {"options": "-c statement_timeout=30000"})
+
+    def test_environment_overrides(self):
+        """
+        Test that every setting can be overridden from the environment.
+        """
+        options = engine_options("postgresql://user@localhost/firestack", {
+            "DB_POOL_SIZE": "20",
+            "DB_MAX_OVERFLOW": "0",
+            "DB_POOL_TIMEOUT": "2.5",
+            "DB_POOL_RECYCLE": "300",
+            "DB_POOL_PRE_PING": "false",
+            "DB_STATEMENT_TIMEOUT_MS": "0",
+        })
+        self.assertEqual(options["pool_size"], 20)
+        self.assertEqual(options["max_overflow"], 0)
+        self.assertEqual(options["pool_timeout"], 2.5)
+        self.assertEqual(options["pool_recycle"], 300)
+        self.assertFalse(options["pool_pre_ping"])
+        self.assertNotIn("connect_args", options)
+
+    def test_in_memory_sqlite_untouched(self):
+        """
+        Test that in-memory SQLite keeps its single shared connection.
+        """
+        self.assertEqual(engine_options("sqlite://", {}), {})
+        self.assertEqual(engine_options(None, {}), {})
+        self.assertNotIn("connect_args",
+                         engine_options("sqlite:////tmp/firestack.db", {}))
+
+
+class TestPoolMetrics(unittest.TestCase):
+    """
+    Unit tests for the metrics of an exhausted pool.
+    """
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def make_engine(self, **settings):
+        url = f"sqlite:///{self.path}"
+        environ = {name: str(value) for name, value in settings.items()}
+        return create_engine(url, **engine_options(url, environ))
+
+    def test_overflow_recorded(self):
+        """
+        Test that connections opened beyond the pool size are counted.
+        """
+        engine = self.make_engine(DB_POOL_SIZE=1, DB_MAX_OVERFLOW=2)
+        connections = [engine.connect() for _ in range(3)]
+        stats = pool_stats(engine)
+        for connection in connections:
+            connection.close()
+
+        self.assertEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["checked_out"], 3)
+        self.assertEqual(stats["overflow"], 2)
+        self.assertEqual(stats["peak_overflow"], 2)
+        self.assertEqual(stats["waits"], 0)
+
+    def test_wait_and_timeout_recorded(self):
+        """
+        Test that checkouts from an exhausted pool wait, then time out.
+        """
+        engine = self.make_engine(DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0,
+                                  DB_POOL_TIMEOUT=0.2)
+        held = engine.connect()
+
+        with self.assertRaises(exc.TimeoutError), \
+                self.assertLogs("src.dbPool", level="ERROR"):
+            engine.connect()
+
+        def release():
+            time.sleep(0.05)
+            held.close()
+
+        threading.Thread(target=release).start()
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        stats = pool_stats(engine)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["waits"], 2)
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertGreaterEqual(stats["max_wait_seconds"], 0.2)
+
+    def test_metrics_survive_dispose(self):
+        """
+        Test that recreating the pool keeps counting in the same metrics.
+        """
+        engine = self.make_engine()
+        engine.connect().close()
+        engine.dispose()
+        engine.connect().close()
+        self.assertEqual(pool_stats(engine)["checkouts"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+test_db_routing.py
+
+Unit tests for routing read-only endpoints to read replicas.
+
+Two in-memory SQLite databases stand in for the primary and a replica.
+Rows written to only one of them show which database served a request.
+"""
+
+import unittest
+import os
+import sys
+from unittest.mock import patch
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, Todo, User  # noqa: E402
+from src import dbRouting  # noqa: E402
+
+
+class TestReplicaBinds(unittest.TestCase):
+    """
+    Unit tests for reading replica binds from the environment.
+    """
+
+    def test_replica_binds(self):
+        """
+        Test that each replica URL becomes a numbered bind.
+        """
+        binds = dbRouting.replica_binds({
+            "DATABASE_REPLICA_URLS":
+                "postgresql://r0/firestack, postgresql://r1/firestack",
+            "DB_POOL_SIZE": "3",
+        })
+        self.assertEqual(sorted(binds), ["replica_0", "replica_1"])
+        self.assertEqual(binds["replica_1"]["url"],
+                         "postgresql://r1/firestack")
+        self.assertEqual(binds["replica_0"]["pool_size"], 3)
+        self.assertEqual(dbRouting.replica_binds({}), {})
+
+
+class TestReadReplicaRouting(unittest.TestCase):
+    """
+    Unit tests for `RoutingSession` and the read-your-writes window.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        self.replica = create_engine("sqlite://", poolclass=StaticPool)
+        db.metadata.create_all(self.replica)
+
+        # Requests push their own app context, and so get their own
+        # session, as they do outside of tests
+        with app.app_context():
+            db.engines["replica_0"] = self.replica
+            create_tables()
+            for engine in (db.engine, self.replica):
+                with engine.begin() as connection:
+                    connection.execute(User.__table__.insert().values(
+                        id=1, google_id="replica_google_id",
+                        name="Test User"))
+        with self.replica.begin() as connection:
+            connection.execute(Todo.__table__.insert().values(
+                user_id=1, task_text="Replicated", category="Today"))
+
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+            session["id_google"] = "replica_google_id"
+
+    def tearDown(self):
+        with app.app_context():
+            del db.engines["replica_0"]
+            drop_tables()
+        self.replica.dispose()
+
+    def tasks(self):
+        response = self.client.get("/api/todos")
+        self.assertEqual(response.status_code, 200)
+        return [todo["task"] for todo in response.get_json()["todos"]]
+
+    def test_read_only_endpoint_uses_replica(self):
+        """
+        Test that a marked GET endpoint is served by the replica.
+        """
+        self.assertEqual(self.tasks(), ["Replicated"])
+
+    def test_reads_after_write_use_primary(self):
+        """
+        Test that a user's reads stick to the primary right after they
+        write, and return to the replica once the window has passed.
+        """
+        response = self.client.post("/api/todos", json={
+            "task": "Written", "category": "Today"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.tasks(), ["Written"])
+
+        with patch("src.dbRouting.time.time",
+                   return_value=dbRouting.time.time() + 3600):
+            self.assertEqual(self.tasks(), ["Replicated"])
+
+    def test_failed_write_keeps_replica(self):
+        """
+        Test that a rejected write does not start the window.
+        """
+        response = self.client.post("/api/todos", json={})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.tasks(), ["Replicated"])
+
+    def test_writes_pin_session_to_primary(self):
+        """
+        Test that once a session writes, its reads stay on the primary.
+        """
+        with app.test_request_context("/api/todos", method="GET"):
+            query = select(Todo.task_text)
+            self.assertEqual(db.session.scalars(query).all(), ["Replicated"])
+
+            db.session.add(Todo(user_id=1, task_text="Pending",
+                                category="Today"))
+            self.assertEqual(db.session.scalars(query).all(), ["Pending"])
+            db.session.rollback()
+            self.assertEqual(db.session.scalars(query).all(), [])
+
+    def test_unmarked_endpoint_uses_primary(self):
+        """
+        Test that views not marked as read-only never use the replica.
+        """
+        with app.test_request_context("/api/dashboard", method="GET"):
+            self.assertEqual(db.session.scalars(select(Todo)).all(), [])
+        with app.test_request_context("/api/todos", method="POST"):
+            self.assertEqual(db.session.scalars(select(Todo)).all(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+test_instrumentation.py
+
+Unit tests for per-request instrumentation.
+
+This file contains tests for the SQL and Google API counters, the
+`Server-Timing` header, the structured request log and the Prometheus
+`/metrics` endpoint.
+"""
+
+import unittest
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+from googleapiclient.http import HttpMockSequence
+from sqlalchemy import create_engine
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, Todo, User  # noqa: E402
+from src import instrumentation  # noqa: E402
+from src.calendarGateway import RetryingHttpRequest  # noqa: E402
+from src.dbPool import engine_options  # noqa: E402
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Unit tests for request instrumentation.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        create_tables()
+        user = User(google_id="metrics_google_id", name="Test User")
+        db.session.add(user)
+        db.session.commit()
+        self.todo = Todo(user_id=user.id, task_text="Task", category="Today")
+        db.session.add(self.todo)
+        db.session.commit()
+        with self.client.session_transaction() as session:
+            session["user_id"] = user.id
+            session["id_google"] = "metrics_google_id"
+
+    def tearDown(self):
+        drop_tables()
+        self.context.pop()
+
+    def test_server_timing_header(self):
+        """
+        Test that responses report their SQL time and statement count.
+        """
+        response = self.client.get("/api/todos")
+        timing = response.headers["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r"total;dur=[\d.]+$")
+        self.assertNotIn("google", timing)
+
+    def test_request_log(self):
+        """
+        Test that each request logs its route and counters as JSON.
+        """
+        with self.assertLogs("src.instrumentation", level="INFO") as logs:
+            self.client.patch(f"/api/todos/{self.todo.id}/category",
+                              json={"category": "This Week"})
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["route"], "/api/todos/<int:todo_id>/category")
+        self.assertEqual(record["method"], "PATCH")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["db_count"], 0)
+        self.assertEqual(record["google_count"], 0)
+
+    def test_google_calls_timed(self):
+        """
+        Test that Google API calls are counted per method.
+        """
+        http = HttpMockSequence([({"status": "200"}, '{"value": "UTC"}')])
+        with app.test_request_context("/api/calendar/events"):
+            from flask import request
+
+            stats = instrumentation.RequestStats()
+            request.environ[instrumentation.ENVIRON_KEY] = stats
+            api_request = RetryingHttpRequest(
+                http, lambda response, content: json.loads(content),
+                "https://example.com/settings/timezone",
+                methodId="calendar.settings.get")
+            self.assertEqual(api_request.execute(), {"value": "UTC"})
+
+        self.assertEqual(stats.counts["google"], 1)
+        self.assertEqual(stats.google_methods["calendar.settings.get"][0], 1)
+
+    def test_metrics_endpoint(self):
+        """
+        Test that `/metrics` exposes per-route counters and histograms.
+        """
+        labels = ("/api/todos", "GET")
+        before = instrumentation.REQUEST_SECONDS.count(*labels)
+        self.client.get("/api/todos")
+        self.assertEqual(instrumentation.REQUEST_SECONDS.count(*labels),
+                         before + 1)
+
+        response = self.client.get("/metrics")
+        body = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE firestack_request_duration_seconds histogram",
+                      body)
+        self.assertIn('firestack_request_db_queries_bucket{route="/api/todos"'
+                      ',method="GET",le="+Inf"}', body)
+        self.assertIn('firestack_requests_total{route="/api/todos",'
+                      'method="GET",status="200"}', body)
+
+    def test_pool_metrics(self):
+        """
+        Test that each bind's pool is described with counters and gauges.
+        """
+        handle, path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        url = f"sqlite:///{path}"
+        engine = create_engine(url, **engine_options(url, {}))
+        try:
+            engine.connect().close()
+            lines = instrumentation.pool_metrics({None: engine})
+        finally:
+            engine.dispose()
+            os.remove(path)
+
+        self.assertIn("# TYPE firestack_db_pool_checkouts_total counter",
+                      lines)
+        self.assertIn('firestack_db_pool_checkouts_total{bind="primary"} 1',
+                      lines)
+        self.assertIn('firestack_db_pool_size{bind="primary"} 5', lines)
+
+    def test_metrics_token(self):
+        """
+        Test that a configured token is required to scrape metrics.
+        """
+        with patch("src.app.METRICS_TOKEN", "secret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            response = self.client.get(
+                "/metrics", headers={"Authorization": "Bearer secret"})
+            self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
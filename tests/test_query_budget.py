@@ -0,0 +1,187 @@
+"""
+test_query_budget.py
+
+Unit tests for per-route SQL statement budgets.
+
+This file checks that every route declares a budget, that routes stay
+within it however many rows a user has, and that going over a budget is
+reported.
+"""
+
+import unittest
+import os
+import sys
+from datetime import date
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, Internship, Todo, User  # noqa: E402
+from src.queryBudget import (  # noqa: E402
+    QueryBudgetExceeded,
+    assert_max_queries,
+    duplicates,
+    within_budget,
+)
+
+ROWS = 50
+
+
+class TestQueryBudget(unittest.TestCase):
+    """
+    Unit tests for query budgets.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["QUERY_BUDGET_ENFORCE"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            user = User(google_id="budget_google_id", name="Test User")
+            db.session.add(user)
+            db.session.commit()
+            self.user_id = user.id
+            db.session.add_all(
+                Internship(user_id=user.id, company_name=f"Company {i}",
+                           position_title="Engineer",
+                           application_status="Applied",
+                           follow_up_date=date.today())
+                for i in range(ROWS))
+            db.session.add_all(
+                Todo(user_id=user.id, task_text=f"Task {i}",
+                     category="Today")
+                for i in range(ROWS))
+            db.session.commit()
+        with self.client.session_transaction() as session:
+            session["user_id"] = self.user_id
+            session["id_google"] = "budget_google_id"
+
+    def tearDown(self):
+        app.config.pop("QUERY_BUDGET_ENFORCE", None)
+        app.debug = False
+        with app.app_context():
+            drop_tables()
+
+    def test_every_route_has_a_budget(self):
+        """
+        Test that every route declares how many statements it may run.
+        """
+        for rule in app.url_map.iter_rules():
+            if rule.endpoint == "static":
+                continue
+            view = app.view_functions[rule.endpoint]
+            self.assertIsInstance(getattr(view, "query_budget", None), int,
+                                  rule.rule)
+
+    def test_reads_within_budget(self):
+        """
+        Test that listing many rows does not run a query per row.
+        """
+        for path in ("/internshipTracker", "/internshipData",
+                     "/api/internships", "/api/internships/today",
+                     "/api/internships/export", "/api/internships/stats",
+                     "/api/search?q=company", "/api/todos"):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+
+    def test_writes_within_budget(self):
+        """
+        Test that writes stay within budget, including the first write
+        that creates the user's version row.
+        """
+        response = self.client.post("/api/internships", json={
+            "company_name": "New", "position_title": "Engineer"})
+        self.assertEqual(response.status_code, 201)
+        internship_id = response.get_json()["internship_id"]
+        self.assertEqual(self.client.put(
+            f"/api/internships/{internship_id}",
+            json={"company_name": "Renamed"}).status_code, 200)
+        self.assertEqual(self.client.delete(
+            f"/api/internships/{internship_id}").status_code, 200)
+
+        response = self.client.post("/api/todos", json={
+            "task": "New", "category": "Today"})
+        todo_id = response.get_json()["id"]
+        self.assertEqual(self.client.patch(
+            f"/api/todos/{todo_id}/category",
+            json={"category": "This Week"}).status_code, 200)
+        self.assertEqual(
+            self.client.delete(f"/api/todos/{todo_id}").status_code, 200)
+
+    def test_batches_raise_the_budget(self):
+        """
+        Test that batch endpoints may run a statement per operation or
+        per import batch.
+        """
+        operations = [{"op": "move", "ids": [i], "category": "This Week"}
+                      for i in range(1, ROWS)]
+        operations += [{"op": "create", "task": f"New {i}",
+                        "category": "Today"} for i in range(ROWS)]
+        response = self.client.post("/api/todos/batch",
+                                    json={"operations": operations})
+        self.assertEqual(response.status_code, 200)
+
+        body = "".join(f"{{\"company_name\": \"C{i}\", "
+                       f"\"position_title\": \"P\"}}\n" for i in range(1200))
+        with patch("src.app.IMPORT_BATCH_SIZE", 100):
+            response = self.client.post(
+                "/api/internships/import?format=ndjson", data=body)
+        self.assertEqual(response.get_json()["imported"], 1200)
+
+    def test_over_budget(self):
+        """
+        Test that going over a budget raises when enforced and logs a
+        warning otherwise.
+        """
+        view = app.view_functions["get_todos"]
+        with patch.object(view, "query_budget", 1):
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                self.client.get("/api/todos")
+            self.assertIn("GET /api/todos executed 2 SQL statements",
+                          str(raised.exception))
+
+            app.config["QUERY_BUDGET_ENFORCE"] = False
+            with self.assertLogs("src.queryBudget", level="WARNING"):
+                response = self.client.get("/api/todos")
+            self.assertEqual(response.status_code, 200)
+
+    def test_duplicates_logged_in_debug(self):
+        """
+        Test that statements repeated within a request are logged in debug
+        mode.
+        """
+        app.debug = True
+        operations = [{"op": "delete", "ids": [1]},
+                      {"op": "delete", "ids": [2]}]
+        with self.assertLogs("src.queryBudget", level="WARNING") as logs:
+            self.client.post("/api/todos/batch",
+                             json={"operations": operations})
+        self.assertIn("executed the same statement 2 times",
+                      logs.output[0])
+
+    def test_assert_max_queries(self):
+        """
+        Test that blocks and functions can be held to a budget.
+        """
+        with app.app_context():
+            with assert_max_queries(1) as statements:
+                db.session.get(User, self.user_id)
+            self.assertEqual(sum(statements.values()), 1)
+
+            @within_budget(1)
+            def todos_one_by_one():
+                for todo_id in range(1, 4):
+                    db.session.get(Todo, todo_id)
+
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                todos_one_by_one()
+            self.assertEqual(
+                list(duplicates(raised.exception.statements).values()), [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+test_query_plans.py
+
+Query-plan tests for the per-user composite indexes.
+
+The schema is created on a separate database, seeded with a realistic
+number of rows (100k per table by default, `QUERY_PLAN_ROWS` to override)
+and the planner is asked how it would run the queries the routes issue.
+SQLite is used unless `QUERY_PLAN_DATABASE_URL` points at another database,
+e.g. a local PostgreSQL instance.
+"""
+
+import unittest
+import os
+import sys
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, insert, select, text
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+import tests  # noqa: E402, F401
+from src.app import (  # noqa: E402
+    db, Internship, Todo, User, internship_segments,
+)
+
+ROWS = int(os.environ.get("QUERY_PLAN_ROWS", 100_000))
+USERS = 100
+STATUSES = ["Applied", "Interview", "Offer", "Rejected"]
+CATEGORIES = ["Today", "This Week", "This Month", "Next Month"]
+
+
+def explain(connection, statement):
+    """
+    Return the planner's description of `statement` as a single string.
+    """
+    compiled = statement.compile(connection,
+                                 compile_kwargs={"literal_binds": True})
+    if connection.dialect.name == "sqlite":
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        return "\n".join(str(row[-1]) for row in rows)
+    rows = connection.execute(text(f"EXPLAIN {compiled}"))
+    return "\n".join(str(row[0]) for row in rows)
+
+
+class TestQueryPlans(unittest.TestCase):
+    """
+    Assert that per-user queries are answered from the composite indexes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine(
+            os.environ.get("QUERY_PLAN_DATABASE_URL", "sqlite://"))
+        db.metadata.drop_all(cls.engine)
+        db.metadata.create_all(cls.engine)
+
+        today = date.today()
+        with cls.engine.begin() as connection:
+            connection.execute(insert(User), [
+                {"id": i, "google_id": f"user-{i}", "name": f"User {i}"}
+                for i in range(1, USERS + 1)
+            ])
+            connection.execute(insert(Internship), [
+                {"user_id": i % USERS + 1,
+                 "company_name": f"Company {i}",
+                 "position_title": "Software Engineer Intern",
+                 "application_status": STATUSES[i % len(STATUSES)],
+                 "date_applied": today - timedelta(days=i % 365),
+                 "follow_up_date": today + timedelta(days=i % 90)}
+                for i in range(ROWS)
+            ])
+            connection.execute(insert(Todo), [
+                {"user_id": i % USERS + 1,
+                 "task_text": f"Task {i}",
+                 "category": CATEGORIES[i % len(CATEGORIES)],
+                 "created_at": datetime(2024, 1, 1) + timedelta(minutes=i)}
+                for i in range(ROWS)
+            ])
+            connection.execute(text("ANALYZE"))
+
+    @classmethod
+    def tearDownClass(cls):
+        db.metadata.drop_all(cls.engine)
+        cls.engine.dispose()
+
+    def plan(self, statement):
+        with self.engine.connect() as connection:
+            return explain(connection, statement)
+
+    def assertUsesIndex(self, statement, index_name):
+        self.assertIn(index_name, self.plan(statement))
+
+    def test_todays_internships_use_follow_up_index(self):
+        """
+        Test the query behind /api/internships/today.
+        """
+        self.assertUsesIndex(
+            select(Internship).where(Internship.user_id == 7,
+                                     Internship.follow_up_date
+                                     == date.today()),
+            "ix_internship_user_follow_up")
+
+    def test_status_filter_uses_status_index(self):
+        """
+        Test filtering a user's internships by application status.
+        """
+        self.assertUsesIndex(
+            select(Internship).where(Internship.user_id == 7,
+                                     Internship.application_status
+                                     == "Interview"),
+            "ix_internship_user_status")
+
+    def test_internship_listing_uses_keyset_index(self):
+        """
+        Test that pages of GET /api/internships after a cursor seek the
+        keyset index to the cursor instead of sorting or walking the
+        user's earlier rows.
+        """
+        internships = select(Internship.date_applied,
+                             Internship.internship_id) \
+            .where(Internship.user_id == 7)
+        last_applied = date.today() - timedelta(days=30)
+        for cursor, seek in (((last_applied, 5000), "date_applied<?"),
+                             ((None, 5000), "internship_id<?")):
+            segments = internship_segments(internships, cursor)
+            for segment in segments:
+                plan = self.plan(segment.limit(51))
+                self.assertIn("ix_internship_user_applied", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+                self.assertNotRegex(plan, r"\bSort\b")
+            if self.engine.dialect.name == "sqlite":
+                # The segment the cursor is in is entered at the cursor
+                self.assertIn(seek, self.plan(segments[0].limit(51)))
+
+    def test_todos_by_category_use_todo_index(self):
+        """
+        Test reading a user's todos in category and creation order.
+        """
+        self.assertUsesIndex(
+            select(Todo).where(Todo.user_id == 7)
+            .order_by(Todo.category, Todo.created_at),
+            "ix_todo_user_category_created")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+test_search.py
+
+Unit tests for full-text search over internships and todos.
+
+Searches run against SQLite's FTS5 tables; the PostgreSQL indexes are
+checked against the migration that creates them.
+"""
+
+import unittest
+import importlib.util
+import os
+import sys
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+)
+
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, Internship, Todo  # noqa: E402
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), "../migrations/versions/"
+    "c4e8d2f1a9b3_add_full_text_search_indexes.py")
+
+
+class TestSearch(unittest.TestCase):
+    """
+    Unit tests for the search endpoint and its indexes.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            db.session.add_all([
+                Internship(user_id=1, company_name="Acme Robotics",
+                           position_title="Software Engineer Intern",
+                           application_status="Applied"),
+                Internship(user_id=1, company_name="Globex",
+                           position_title="Data Analyst Intern",
+                           application_status="Applied",
+                           notes="Met an engineer from Acme at the fair"),
+                Internship(user_id=2, company_name="Acme",
+                           position_title="Intern",
+                           application_status="Applied"),
+                Todo(user_id=1, task_text="Email the Acme recruiter",
+                     category="Today"),
+            ])
+            db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess["user_id"] = 1
+            sess["id_google"] = "mock_google_id"
+
+    def tearDown(self):
+        with app.app_context():
+            drop_tables()
+
+    def search(self, query, **params):
+        response = self.client.get("/api/search", query_string={
+            "q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json
+
+    def hits(self, query, **params):
+        return [(result["kind"], result["id"])
+                for result in self.search(query, **params)["results"]]
+
+    def test_ranked_prefix_matches(self):
+        """
+        Test that word prefixes and stems match, that company and title
+        matches rank above notes, and that other users' rows are hidden.
+        """
+        self.assertEqual(self.hits("engin"),
+                         [("internship", 1), ("internship", 2)])
+        results = self.search("acme robot")["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["item"]["companyName"], "Acme Robotics")
+        self.assertEqual(self.hits("recruit"), [("todo", 1)])
+        self.assertEqual(self.search("recruit")["results"][0]["item"],
+                         {"id": 1, "category": "Today",
+                          "task": "Email the Acme recruiter"})
+
+    def test_index_follows_writes(self):
+        """
+        Test that updates, deletes, imports and batch operations are
+        searchable right away.
+        """
+        self.client.put("/api/internships/2", json={"notes": "Referral"})
+        self.assertEqual(self.hits("acme", type="internship"),
+                         [("internship", 1)])
+
+        self.client.delete("/api/internships/1")
+        self.client.post("/api/internships/import",
+                         data="company_name,position_title,location\n"
+                              "Initech,Intern,Austin\n",
+                         content_type="text/csv")
+        self.assertEqual(self.hits("austin"), [("internship", 4)])
+        self.assertEqual(self.hits("acme", type="internship"), [])
+
+        self.client.post("/api/todos/batch", json={"operations": [
+            {"op": "create", "task": "Prepare Initech interview",
+             "category": "Today"},
+            {"op": "delete", "ids": [1]},
+        ]})
+        self.assertEqual(self.hits("initech"),
+                         [("internship", 4), ("todo", 2)])
+        self.assertEqual(self.hits("recruiter"), [])
+
+    def test_pagination(self):
+        """
+        Test that pages follow each other without gaps or repeats.
+        """
+        first = self.search("acme", limit=2)
+        self.assertEqual(len(first["results"]), 2)
+        self.assertEqual(first["nextOffset"], 2)
+        second = self.search("acme", limit=2, offset=2)
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["nextOffset"])
+        seen = {(result["kind"], result["id"])
+                for result in first["results"] + second["results"]}
+        self.assertEqual(seen, {("internship", 1), ("internship", 2),
+                                ("todo", 1)})
+
+    def test_invalid_parameters(self):
+        """
+        Test that empty queries, unknown types and bad numbers are
+        rejected, and that query syntax is not interpreted.
+        """
+        for query_string in ("q=", "q=%22%22", "q=acme&type=user",
+                             "q=acme&limit=x"):
+            response = self.client.get(f"/api/search?{query_string}")
+            self.assertEqual(response.status_code, 400, query_string)
+        self.assertEqual(self.hits('acme" OR NOT ('), [])
+
+    def test_postgresql_indexes_match_migration(self):
+        """
+        Test that the declared GIN indexes are the ones the migration
+        creates, so queries can use them on upgraded databases.
+        """
+        spec = importlib.util.spec_from_file_location("migration",
+                                                      MIGRATION)
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        indexes = {index.name: index
+                   for model in (Internship, Todo)
+                   for index in model.__table__.indexes}
+        for name, document in (
+                ("ix_internship_search", migration.INTERNSHIP_DOCUMENT),
+                ("ix_todo_search", migration.TODO_DOCUMENT)):
+            ddl = str(CreateIndex(indexes[name]).compile(
+                dialect=postgresql.dialect()))
+            self.assertIn("USING gin", ddl)
+            self.assertIn(document, ddl)
+
+
+if __name__ == "__main__":
+    unittest.main()
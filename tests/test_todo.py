@@ -17,7 +17,8 @@ sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
 )
 
-from src.app import app  # noqa: E402
+from tests import create_tables, drop_tables  # noqa: E402
+from src.app import app, db, Todo  # noqa: E402
 
 
 class TestTodoList(unittest.TestCase):
@@ -112,6 +113,112 @@ class TestTodoList(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("message", response.json)
 
+    @patch("src.app.Todo.query")
+    @patch("src.app.User.query")
+    def test_session_user_id_skips_user_lookup(self, mock_user_query,
+                                               mock_todo_query):
+        """
+        Test that a user id stored in the session avoids the user lookup.
+        """
+        with self.client.session_transaction() as sess:
+            sess["id_google"] = "test_google_id"
+            sess["user_id"] = 1
+        mock_todo_query.filter_by.return_value.all.return_value = [
+            self.mock_todo
+        ]
+
+        response = self.client.get("/api/todos")
+        self.assertEqual(response.status_code, 200)
+        mock_user_query.filter_by.assert_not_called()
+        mock_todo_query.filter_by.assert_called_once_with(user_id=1)
+
+    @patch("src.app.Todo.query")
+    @patch("src.app.User.query")
+    def test_user_lookup_fallback(self, mock_user_query, mock_todo_query):
+        """
+        Test that a session without a user id falls back to a single
+        lookup by Google id.
+        """
+        self.login()
+        mock_user_query.filter_by.return_value.first.return_value = (
+            self.mock_user
+        )
+        mock_todo_query.filter_by.return_value.first.return_value = (
+            self.mock_todo
+        )
+
+        response = self.client.patch(
+            f"/api/todos/{self.mock_todo.id}/category",
+            json={"category": "This Week"}
+        )
+        self.assertEqual(response.status_code, 200)
+        mock_user_query.filter_by.assert_called_once_with(
+            google_id="test_google_id"
+        )
+
+
+class TestTodoBatch(unittest.TestCase):
+    """
+    Tests for the batch todo endpoint, run against an in-memory SQLite
+    database.
+    """
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        with app.app_context():
+            create_tables()
+            db.session.add_all([
+                Todo(user_id=1, category="This Week", task_text="Mine 1"),
+                Todo(user_id=1, category="This Week", task_text="Mine 2"),
+                Todo(user_id=2, category="This Week", task_text="Theirs"),
+            ])
+            db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess["id_google"] = "test_google_id"
+            sess["user_id"] = 1
+
+    def tearDown(self):
+        with app.app_context():
+            drop_tables()
+
+    def categories(self):
+        with app.app_context():
+            return {todo.task_text: todo.category for todo in Todo.query}
+
+    def test_batch_applies_all_operations(self):
+        """
+        Test create, move and delete in one request, scoped to the user.
+        """
+        response = self.client.post("/api/todos/batch", json={
+            "operations": [
+                {"op": "create", "category": "Today", "task": "New"},
+                {"op": "move", "ids": [1, 3], "category": "Today"},
+                {"op": "delete", "id": 2},
+            ]
+        })
+        self.assertEqual(response.status_code, 200)
+        results = response.json["results"]
+        self.assertEqual(results[0]["task"], "New")
+        self.assertEqual(results[1], {"op": "move", "count": 1})
+        self.assertEqual(results[2], {"op": "delete", "count": 1})
+        self.assertEqual(self.categories(), {
+            "Mine 1": "Today", "Theirs": "This Week", "New": "Today"})
+
+    def test_invalid_operation_applies_nothing(self):
+        """
+        Test that one invalid operation rejects the whole batch.
+        """
+        response = self.client.post("/api/todos/batch", json={
+            "operations": [
+                {"op": "delete", "ids": [1]},
+                {"op": "move", "ids": [2], "category": "Someday"},
+            ]
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["results"][0]["index"], 1)
+        self.assertIn("Mine 1", self.categories())
+
 
 if __name__ == "__main__":
     unittest.main()
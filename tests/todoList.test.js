@@ -7,12 +7,13 @@
  * - Handling invalid inputs during task addition.
  * - Deleting tasks from the list.
  * - Enter key functionality for adding tasks.
+ * - Applying changes pushed by the server.
  * 
  */
 
 import '@testing-library/jest-dom';
 import { jest } from '@jest/globals';
-import { loadTodoList, addTask, loadTasks, deleteTask } from '../static/js/todoList.js';
+import { loadTodoList, addTask, loadTasks, deleteTask, applyTodoChange } from '../static/js/todoList.js';
 
 describe('TodoList Functionality', () => {
     /**
@@ -136,6 +137,29 @@ describe('TodoList Functionality', () => {
         expect(document.getElementById('todo-next-month').children.length).toBe(1);
     });
 
+    /**
+     * Test that the first load reuses the dashboard payload instead of fetching.
+     */
+    test('reuses the dashboard payload on first load', async () => {
+        window.initialDashboard = Promise.resolve({
+            todos: [{ id: 1, category: 'Today', task: 'Task 1' }],
+        });
+
+        document.body.innerHTML = `
+            <div id="todo-container">
+                <div class="to-do-column">
+                    <ul id="todo-today" class="todo-list"></ul>
+                </div>
+            </div>
+        `;
+
+        await loadTasks();
+
+        expect(fetch).not.toHaveBeenCalled();
+        expect(document.getElementById('todo-today').children.length).toBe(1);
+        expect(window.initialDashboard).toBeNull();
+    });
+
     /**
      * Test adding a new task to the specified list.
      */
@@ -249,4 +273,30 @@ describe('TodoList Functionality', () => {
         expect(todayList.children.length).toBe(1);
         expect(todayList.children[0].textContent).toContain('Task via Enter');
     });
+
+    /**
+     * Test applying pushed changes without refetching the list.
+     */
+    test('applies pushed todo changes', () => {
+        document.body.innerHTML = `
+            <ul id="todo-today" class="todo-list"></ul>
+            <ul id="todo-week" class="todo-list"></ul>
+        `;
+        const todayList = document.getElementById('todo-today');
+        const weekList = document.getElementById('todo-week');
+        const todo = { id: 4, category: 'Today', task: 'Pushed task' };
+
+        applyTodoChange({ op: 'created', data: todo });
+        applyTodoChange({ op: 'created', data: todo });
+        expect(todayList.children.length).toBe(1);
+        expect(todayList.children[0].textContent).toContain('Pushed task');
+
+        applyTodoChange({ op: 'updated', data: { ...todo, category: 'This Week' } });
+        expect(todayList.children.length).toBe(0);
+        expect(weekList.children.length).toBe(1);
+
+        applyTodoChange({ op: 'deleted', data: { id: 4 } });
+        expect(weekList.children.length).toBe(0);
+        expect(fetch).not.toHaveBeenCalled();
+    });
 });